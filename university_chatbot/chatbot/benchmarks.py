@@ -0,0 +1,483 @@
+# chatbot/benchmarks.py
+
+# Synthetic corpora and timing helpers for the benchmark commands
+import random
+import re
+import time
+import tracemalloc
+
+import numpy as np
+
+# Subjects taught in the timetable, with the words students use for them
+SUBJECTS = {
+    'Design and Analysis of Algorithms': ['daa', 'algorithm', 'sorting', 'greedy', 'dynamic', 'programming', 'graph', 'complexity', 'knapsack', 'recursion'],
+    'Software Engineering': ['se', 'software', 'engineering', 'agile', 'scrum', 'requirements', 'testing', 'uml', 'waterfall', 'maintenance'],
+    'Data Visualization & Data Analytics': ['dvd', 'visualization', 'analytics', 'chart', 'dashboard', 'pandas', 'regression', 'cleaning', 'plot', 'statistics'],
+    'Enterprise Programming': ['ep', 'enterprise', 'java', 'servlet', 'spring', 'hibernate', 'jsp', 'bean', 'deployment', 'transaction'],
+    'Theory of Computation': ['toc', 'automata', 'grammar', 'turing', 'machine', 'language', 'regular', 'pushdown', 'decidability', 'dfa'],
+    'AWS Fundamentals': ['aws', 'cloud', 'ec2', 's3', 'lambda', 'vpc', 'iam', 'region', 'instance', 'storage'],
+    'Professionalism & Corporate Ethics': ['pce', 'ethics', 'corporate', 'professionalism', 'governance', 'integrity', 'communication', 'workplace', 'responsibility', 'values'],
+}
+
+DOC_TYPES = ['notes', 'ppt', 'syllabus', 'circular', 'assignment', 'question_paper']
+
+QUERY_TEMPLATES = [
+    'send {abbr} unit {unit} {doc_type}',
+    'i need {abbr} {doc_type}',
+    '{term} {term2} notes',
+    'give me unit {unit} {doc_type} of {abbr}',
+    'what is {term} in {abbr}',
+    '{abbr} {term} ppt',
+]
+
+FAQ_TOPICS = [
+    ('admission', ['admission', 'eligibility', 'documents', 'deadline', 'counselling', 'merit', 'list']),
+    ('examination', ['exam', 'form', 'result', 'revaluation', 'hall', 'ticket', 'backlog', 'timetable']),
+    ('scholarship', ['scholarship', 'apply', 'income', 'certificate', 'renewal', 'stipend', 'portal']),
+    ('hostel', ['hostel', 'fees', 'mess', 'warden', 'room', 'allotment', 'curfew']),
+    ('general', ['library', 'canteen', 'wifi', 'transport', 'id', 'card', 'sports', 'clubs']),
+]
+
+
+def _filler_vocabulary(size=5000):
+    """Pseudo-words for the long tail of a lecture's vocabulary"""
+    syllables = ['ka', 'ri', 'to', 'ne', 'mu', 'sa', 'lo', 'pe', 'di', 'va', 'tor', 'ion', 'ent', 'al', 'ic']
+    rng = random.Random(7)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+class SyntheticCorpus:
+    """
+    Generates documents, FAQs and chat queries that look like the real ones.
+
+    Body text mixes subject terms with a Zipf-distributed filler vocabulary,
+    so term statistics resemble lecture notes, and text lengths follow a
+    log-normal distribution around the requested mean.
+    """
+
+    def __init__(self, seed=0, mean_text_chars=8000):
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.mean_text_chars = mean_text_chars
+        self.filler = np.array(_filler_vocabulary())
+        ranks = np.arange(1, len(self.filler) + 1)
+        self.filler_p = (1 / ranks) / (1 / ranks).sum()
+
+    def _text(self, terms, chars):
+        # Roughly 7 characters per word including the space
+        words = max(1, chars // 7)
+        subject_words = self.rng.choices(terms, k=max(1, words // 10))
+        filler_words = self.np_rng.choice(self.filler, size=words - len(subject_words), p=self.filler_p)
+        text = list(filler_words) + subject_words
+        self.rng.shuffle(text)
+        return ' '.join(text)
+
+    def text_length(self):
+        sigma = 0.8
+        mu = np.log(self.mean_text_chars) - sigma ** 2 / 2
+        return int(min(self.np_rng.lognormal(mu, sigma), self.mean_text_chars * 20))
+
+    def documents(self, count):
+        """Yield unsaved Document objects"""
+        from .models import Document
+        subjects = list(SUBJECTS.items())
+        for i in range(count):
+            subject, terms = subjects[i % len(subjects)]
+            unit = self.rng.randint(1, 6)
+            doc_type = self.rng.choice(DOC_TYPES)
+            yield Document(
+                title=f"{terms[0].upper()} Unit {unit} {doc_type.replace('_', ' ').title()} {i}",
+                description=f"{subject} {' '.join(self.rng.sample(terms[1:], 3))}",
+                file=f"documents/synthetic/{i}.pdf",
+                semester=self.rng.randint(1, 8),
+                subject=terms[0].upper(),
+                unit=unit,
+                doc_type=doc_type,
+                extracted_text=self._text(terms, self.text_length()),
+                extraction_status=Document.EXTRACTION_DONE,
+            )
+
+    def faqs(self, count):
+        """Yield unsaved FAQ objects"""
+        from .models import FAQ
+        for i in range(count):
+            category, terms = self.rng.choice(FAQ_TOPICS)
+            words = self.rng.sample(terms, 3)
+            yield FAQ(
+                question=f"What is the {words[0]} {words[1]} {words[2]} process {i}?",
+                answer=f"Please contact the {category} office about {words[0]}.",
+                category=category,
+            )
+
+    def queries(self, count):
+        """Return chat messages in the style of document requests"""
+        queries = []
+        for _ in range(count):
+            terms = self.rng.choice(list(SUBJECTS.values()))
+            queries.append(self.rng.choice(QUERY_TEMPLATES).format(
+                abbr=terms[0],
+                term=self.rng.choice(terms[1:]),
+                term2=self.rng.choice(terms[1:]),
+                unit=self.rng.randint(1, 6),
+                doc_type=self.rng.choice(['notes', 'ppt', 'syllabus', 'assignment']),
+            ))
+        return queries
+
+    def faq_queries(self, count):
+        queries = []
+        for _ in range(count):
+            _, terms = self.rng.choice(FAQ_TOPICS)
+            queries.append(f"how do i get {' '.join(self.rng.sample(terms, 2))}")
+        return queries
+
+
+def measure_latencies(func, inputs):
+    """Call func(x) for every input and return the latencies in seconds"""
+    latencies = []
+    for value in inputs:
+        start = time.perf_counter()
+        func(value)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def measure_peak_memory(func, inputs):
+    """Peak Python heap allocation in bytes while calling func(x) for the inputs"""
+    tracemalloc.start()
+    try:
+        for value in inputs:
+            func(value)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def latency_summary(latencies):
+    """p50/p95/p99/mean latency in milliseconds"""
+    if not latencies:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None}
+    values = np.array(latencies) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'mean_ms': round(float(values.mean()), 3),
+    }
+
+
+def run_benchmark(name, func, inputs, memory_samples=5, **extra):
+    """
+    Time func over the inputs, then measure peak memory on a few of them
+    (tracing is kept out of the timed run because it slows Python down).
+    """
+    result = {'benchmark': name, 'calls': len(inputs)}
+    result.update(extra)
+    result.update(latency_summary(measure_latencies(func, inputs)))
+    peak = measure_peak_memory(func, inputs[:memory_samples])
+    result['peak_memory_mb'] = round(peak / (1024 * 1024), 3)
+    return result
+
+
+def word_by_word_translate(text, phrases):
+    """
+    The dictionary fallback as it was before PhraseTranslator: a lookup of
+    the whole text, then one of each space-separated word. Kept as the
+    baseline for benchmark_translation.
+    """
+    if text in phrases:
+        return phrases[text]
+    return ' '.join(phrases.get(word, word) for word in text.split())
+
+
+def translation_inputs(phrases, count, seed=0):
+    """
+    Response-like texts for the offline translator: dictionary phrases,
+    some lower-cased, joined with names, numbers and unknown words
+    """
+    rng = random.Random(seed)
+    keys = sorted(phrases)
+    fillers = ['Dr. Mehta', '85.5%', '(12/14 classes)', 'Room 204', 'DAA', 'unit 3', 'notes', 'tomorrow', '10:30-11:30']
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(2, 8)):
+            if rng.random() < 0.6:
+                phrase = rng.choice(keys)
+                parts.append(phrase.lower() if rng.random() < 0.3 else phrase)
+            else:
+                parts.append(rng.choice(fillers))
+        texts.append(' '.join(parts))
+    return texts
+
+
+def script_share_language(text):
+    """
+    The character-share detector views.process_message used before
+    chatbot.language, kept as a baseline for benchmark_language_detection
+    """
+    if not text or not isinstance(text, str):
+        return 'en'
+    text = text.lower()
+    hindi_chars = sum(1 for char in text if '\u0900' <= char <= '\u097F')
+    gujarati_chars = sum(1 for char in text if '\u0A80' <= char <= '\u0AFF')
+    total_chars = len(text)
+    if hindi_chars > 0 and (hindi_chars / total_chars > 0.1 or hindi_chars >= 2):
+        return 'hi'
+    elif gujarati_chars > 0 and (gujarati_chars / total_chars > 0.1 or gujarati_chars >= 2):
+        return 'gu'
+    return 'en'
+
+
+def langdetect_language(text):
+    """
+    The langdetect-first detector utils.detect_language used before
+    chatbot.language, kept as a baseline for benchmark_language_detection
+    """
+    from langdetect import detect
+    if not text or not isinstance(text, str):
+        return 'en'
+    try:
+        lang_code = detect(text)
+        if lang_code in ['en', 'hi', 'gu']:
+            return lang_code
+    except Exception:
+        pass
+    return script_share_language(text)
+
+
+def regex_intent(query):
+    """
+    The regex scan utils.understand_query used before chatbot.intent: the
+    first pattern to match wins. Kept as the baseline for
+    train_intent_classifier
+    """
+    query = query.lower()
+    
+    # Define patterns for different types of queries
+    patterns = {
+        'document_request': [
+            r'(send|give|provide|get|need|want|chahiye|joiye).*(ppt|notes|pdf|document|file|syllabus|assignment)',
+            r'(ppt|notes|pdf|document|file|syllabus|assignment).*(send|give|provide|get|need|want|chahiye|joiye)',
+            r'(unit|chapter).*\d+',
+        ],
+        'attendance_query': [
+            r'attendance|haziri|upasthiti|kitna|percentage|%',
+            r'how many.*class|kitni.*class',
+        ],
+        'timetable_query': [
+            r'(timetable|schedule|time table|samay|vartaman)',
+            r'(current|now|abhi|aj).*(class|lecture|period)',
+        ],
+        'faculty_query': [
+            r'(faculty|teacher|professor|sir|maam|madam)',
+            r'(email|contact|phone|number)',
+            r'(schedule|timing|office hours)',
+        ],
+        'current_lecture': [
+            r'(current|now|abhi).*(lecture|class|period)',
+            r'which.*(lecture|class).*now',
+        ],
+        'academic_calendar': [
+            r'(calendar|academic calendar|holiday|vacation|exam)',
+        ]
+    }
+    
+    # Check which pattern matches
+    for query_type, pattern_list in patterns.items():
+        for pattern in pattern_list:
+            try:
+                if re.search(pattern, query, re.IGNORECASE):
+                    return query_type
+            except:
+                continue
+                
+    return 'general'
+
+
+def search_documents_logical(query, documents):
+    """
+    Logical document search that follows subject -> unit -> type hierarchy.
+    Formerly in views, with its own query parsing; kept as a baseline for
+    benchmark_search
+    """
+    from .models import Document
+    query = query.lower()
+    query_words = query.split()
+    
+    # Get all available subjects from the database (dynamic)
+    available_subjects = list(Document.objects.values_list('subject', flat=True).distinct())
+    available_subjects_lower = [subject.lower() for subject in available_subjects]
+    
+    # Extract requested subject (check against available subjects)
+    requested_subject = None
+    for word in query_words:
+        if word in available_subjects_lower:
+            requested_subject = available_subjects[available_subjects_lower.index(word)]
+            break
+    
+    # If no exact subject match, try partial matches
+    if not requested_subject:
+        for subject in available_subjects:
+            subject_lower = subject.lower()
+            # Check if any query word is in the subject name
+            if any(word in subject_lower for word in query_words if len(word) > 3):
+                requested_subject = subject
+                break
+    
+    # Extract requested unit
+    requested_unit = None
+    for word in query_words:
+        if word.isdigit():
+            requested_unit = int(word)
+            break
+    
+    # Extract requested document type
+    requested_type = None
+    doc_types = {
+        'ppt': 'ppt', 'powerpoint': 'ppt', 'presentation': 'ppt',
+        'notes': 'notes', 'note': 'notes',
+        'syllabus': 'syllabus', 'syllabi': 'syllabus',
+        'assignment': 'assignment', 'assignments': 'assignment',
+        'circular': 'circular', 'circulars': 'circular',
+        'question': 'question_paper', 'paper': 'question_paper', 'exam': 'question_paper'
+    }
+    
+    for word in query_words:
+        if word in doc_types:
+            requested_type = doc_types[word]
+            break
+    
+    # Filter documents step by step
+    filtered_docs = documents
+    
+    # Step 1: Filter by subject (if requested)
+    if requested_subject:
+        subject_docs = [doc for doc in filtered_docs if doc.subject.lower() == requested_subject.lower()]
+        if not subject_docs:
+            return []  # No documents for this subject
+        filtered_docs = subject_docs
+    else:
+        # If subject was requested but not found, return empty
+        # Check if user was trying to ask for a specific subject
+        subject_keywords = ['se', 'daa', 'dvd', 'ep', 'toc', 'aws', 'pce', 'software', 'engineering', 
+                           'design', 'algorithm', 'data', 'visualization', 'analytics', 
+                           'enterprise', 'programming', 'theory', 'computation', 'professionalism', 'corporate', 'ethics']
+        
+        if any(keyword in query for keyword in subject_keywords):
+            # User was asking for a subject but we couldn't match it exactly
+            return []
+    
+    # Step 2: Filter by unit (if requested)
+    if requested_unit is not None:
+        unit_docs = [doc for doc in filtered_docs if doc.unit == requested_unit]
+        if not unit_docs:
+            return []  # No documents for this unit
+        filtered_docs = unit_docs
+    
+    # Step 3: Filter by document type (if requested)
+    if requested_type:
+        type_docs = [doc for doc in filtered_docs if doc.doc_type == requested_type]
+        if not type_docs:
+            return []  # No documents of this type
+        filtered_docs = type_docs
+    
+    return filtered_docs
+
+
+LEGACY_UNIT_RE = re.compile(r'\b(?:unit|chapter|u)\s*-?\s*(\d{1,2})\b')
+LEGACY_SEMESTER_RE = re.compile(r'\b(?:sem|semester)\s*-?\s*(\d)\b|\b(\d)(?:st|nd|rd|th)?\s*(?:sem|semester)\b')
+LEGACY_NUMBER_RE = re.compile(r'\b(\d{1,2})\b')
+
+
+def legacy_document_filters(query, subjects):
+    """
+    search.extract_document_filters as it was before chatbot.entities, kept
+    as a baseline for benchmark_query_parsing
+    """
+    from .entities import DOC_TYPE_WORDS, SUBJECT_ABBREVIATIONS
+    query = query.lower()
+    words = re.findall(r'\w+', query)
+    filters = {}
+
+    semester_match = LEGACY_SEMESTER_RE.search(query)
+    if semester_match:
+        filters['semester'] = int(semester_match.group(1) or semester_match.group(2))
+        query = query[:semester_match.start()] + ' ' + query[semester_match.end():]
+
+    unit_match = LEGACY_UNIT_RE.search(query)
+    if unit_match:
+        filters['unit'] = int(unit_match.group(1))
+    else:
+        number_match = LEGACY_NUMBER_RE.search(query)
+        if number_match:
+            filters['unit'] = int(number_match.group(1))
+
+    for subject in subjects:
+        subject_lower = subject.lower()
+        full_name = SUBJECT_ABBREVIATIONS.get(subject_lower, '').lower()
+        abbreviations = [abbr for abbr, name in SUBJECT_ABBREVIATIONS.items() if name.lower() == subject_lower]
+        if (subject_lower in words
+                or any(abbr in words for abbr in abbreviations)
+                or (' ' in subject_lower and subject_lower in query)
+                or (full_name and full_name in query)):
+            filters['subject'] = subject
+            break
+
+    for word in words:
+        if word in DOC_TYPE_WORDS:
+            filters['doc_type'] = DOC_TYPE_WORDS[word]
+            break
+
+    return filters
+
+
+def legacy_target_percentage(search_query):
+    """The target-percentage scan process_message repeated in both attendance branches"""
+    if any(word in search_query for word in ['target', 'reach', 'achieve', 'kitne', 'kaise', 'how many', 'percentage', '%']):
+        for word in search_query.split():
+            if word.isdigit():
+                num = int(word)
+                if 0 <= num <= 100:
+                    return num
+            elif '%' in word and word.replace('%', '').isdigit():
+                num = int(word.replace('%', ''))
+                if 0 <= num <= 100:
+                    return num
+    return None
+
+
+def legacy_query_parsing(query, subjects, faculty_names):
+    """
+    Every scan process_message and document search made of one query
+    before chatbot.entities: document filters (twice, for documents and
+    passages), subject by word and abbreviation, target percentage,
+    faculty name, and the cue and date word checks
+    """
+    from .entities import SUBJECT_ABBREVIATIONS
+    search_query = query.lower()
+    filters = legacy_document_filters(query, subjects)
+    legacy_document_filters(query, subjects)
+    subject = None
+    for name in subjects:
+        if any(len(word) > 3 and word in search_query for word in name.lower().split()):
+            subject = name
+            break
+    if subject is None:
+        for abbr, full_name in SUBJECT_ABBREVIATIONS.items():
+            if abbr in search_query:
+                subject = full_name
+                break
+    faculty = next((name for name in faculty_names if name.lower() in search_query), None)
+    return {
+        'filters': filters,
+        'subject': subject,
+        'target_percentage': legacy_target_percentage(search_query),
+        'faculty': faculty,
+        'contact': any(word in search_query for word in ['email', 'mail', 'contact', 'id']),
+        'schedule': any(word in search_query for word in ['schedule', 'lecture', 'time', 'when', 'day']),
+        'today': any(word in search_query for word in ['today', 'aj', 'aaj']),
+        'event': any(word in search_query for word in ['exam', 'midterm', 'end sem', 'diwali', 'vacation']),
+    }
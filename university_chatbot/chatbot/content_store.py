@@ -0,0 +1,115 @@
+# chatbot/content_store.py
+
+# Content-addressed storage for uploaded files and the extraction cache
+import hashlib
+import json
+import os
+import zlib
+
+from django.core.files.storage import default_storage
+
+from .extraction import EXTRACTOR_VERSION, ExtractionLimits, extract_passages
+
+CONTENT_ROOT = 'documents/sha256'
+
+
+def hash_file(f):
+    """SHA-256 hex digest of a Django File, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in f.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_path(digest, filename):
+    """Storage name for content with the given hash, e.g. documents/sha256/ab/cd/abcd....pdf"""
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{CONTENT_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def store_file(f, filename, storage=default_storage):
+    """
+    Store a file under its content hash and return (name, digest). When the
+    same content is already stored, the existing file is reused.
+    """
+    digest = hash_file(f)
+    name = content_path(digest, filename)
+    if not storage.exists(name):
+        f.seek(0)
+        name = storage.save(name, f)
+    return name, digest
+
+
+def restore_file(f, name, storage=default_storage):
+    """
+    Store a file again when it went missing after store_file() reused it: a
+    release_file() for another document sharing the content can delete it
+    before the new row is saved. Call once that row is saved, from then on
+    release_file() sees the reference. Returns the stored name.
+    """
+    if storage.exists(name):
+        return name
+    f.seek(0)
+    return storage.save(name, f)
+
+
+def release_file(name, storage=default_storage):
+    """
+    Delete a stored file once no document refers to it any more, together
+    with the extraction results cached for its content
+    """
+    from .models import Document, ExtractionCache
+    if not name or Document.objects.filter(file=name).exists():
+        return False
+    if name.startswith(CONTENT_ROOT + '/'):
+        digest = os.path.splitext(os.path.basename(name))[0]
+        ExtractionCache.objects.filter(content_hash=digest).delete()
+    storage.delete(name)
+    return True
+
+
+def extractor_key(limits):
+    """
+    Identifies what produced cached passages: the extractor version and the
+    budgets that shape its output. Results are reused only for the same key.
+    """
+    return f"v{EXTRACTOR_VERSION}:{limits.max_pages or 0}:{limits.max_chars or 0}"
+
+
+def get_cached_passages(digest, limits):
+    from .models import ExtractionCache
+    data = (
+        ExtractionCache.objects
+        .filter(content_hash=digest, extractor=extractor_key(limits))
+        .values_list('data', flat=True)
+        .first()
+    )
+    if data is None:
+        return None
+    return [tuple(passage) for passage in json.loads(zlib.decompress(data).decode('utf-8'))]
+
+
+def cache_passages(digest, limits, passages):
+    from .models import ExtractionCache
+    ExtractionCache.objects.update_or_create(
+        content_hash=digest,
+        extractor=extractor_key(limits),
+        defaults={'data': zlib.compress(json.dumps(passages).encode('utf-8'))},
+    )
+
+
+def read_passages_cached(path, digest, limits=None):
+    """
+    Passages of a stored file, parsed only when nothing is cached for its
+    hash. Results cut short by the time budget depend on the machine's load,
+    so they are not cached.
+    """
+    limits = limits or ExtractionLimits.from_settings()
+    if digest:
+        passages = get_cached_passages(digest, limits)
+        if passages is not None:
+            return passages
+    passages, stopped_by = extract_passages(path, limits)
+    if digest and stopped_by != 'time limit':
+        cache_passages(digest, limits, passages)
+    return passages
@@ -0,0 +1,115 @@
+# chatbot/content_translation.py
+
+# Stored translations of the FAQ and Document fields registered in
+# translation.py. The _hi/_gu columns are filled by the translate_content
+# background job, so chat responses read them instead of translating.
+from django.apps import apps
+from django.conf import settings
+
+from .utils import machine_translate, translate_text
+
+
+def source_language():
+    """Language the fields are written in; searched and translated from"""
+    return getattr(settings, 'MODELTRANSLATION_DEFAULT_LANGUAGE', 'en')
+
+
+def target_languages():
+    return [language for language in settings.MODELTRANSLATION_LANGUAGES if language != source_language()]
+
+
+def translated_fields(model):
+    from modeltranslation.translator import translator
+    return list(translator.get_options_for_model(model).fields)
+
+
+def stored_translation(instance, field, language):
+    """The stored translation of a field, or None when it is not filled in yet"""
+    if language == source_language():
+        return getattr(instance, f"{field}_{language}")
+    return getattr(instance, f"{field}_{language}", None) or None
+
+
+def missing_translations(instance):
+    """(field, language) pairs whose source text has no stored translation"""
+    return [
+        (field, language)
+        for field in translated_fields(type(instance))
+        if getattr(instance, f"{field}_{source_language()}")
+        for language in target_languages()
+        if not getattr(instance, f"{field}_{language}")
+    ]
+
+
+def clear_stale_translations(instance, update_fields=None):
+    """
+    Blank the translations of fields whose source text is being changed, so
+    an outdated translation is never served. Called before saving.
+    """
+    fields = translated_fields(type(instance))
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields or f"{field}_{source_language()}" in update_fields]
+    if instance.pk is None or not fields:
+        return
+    source_names = [f"{field}_{source_language()}" for field in fields]
+    old = type(instance).objects.filter(pk=instance.pk).values(*source_names).first()
+    if old is None:
+        return
+    for field, name in zip(fields, source_names):
+        if old[name] != getattr(instance, name):
+            for language in target_languages():
+                setattr(instance, f"{field}_{language}", None)
+
+
+def translate_object(instance, overwrite=False):
+    """
+    Fill in the missing translations of an object (all of them with
+    overwrite) and store them. Returns the number of fields translated.
+    Translation API errors are raised, so nothing partial is stored.
+    """
+    if overwrite:
+        pairs = [
+            (field, language)
+            for field in translated_fields(type(instance))
+            if getattr(instance, f"{field}_{source_language()}")
+            for language in target_languages()
+        ]
+    else:
+        pairs = missing_translations(instance)
+    values = {
+        f"{field}_{language}": machine_translate(getattr(instance, f"{field}_{source_language()}"), language)
+        for field, language in pairs
+    }
+    if values:
+        # update() keeps the search index signals out of it: only the
+        # source language is indexed
+        type(instance).objects.filter(pk=instance.pk).update(**values)
+    return len(values)
+
+
+def translate_objects(model, object_ids=None, overwrite=False):
+    """Translate the given objects of a model (all of them by default); returns the field count"""
+    if isinstance(model, str):
+        model = apps.get_model(model)
+    objects = model.objects.order_by('pk')
+    if object_ids is not None:
+        objects = objects.filter(pk__in=object_ids)
+    return sum(translate_object(instance, overwrite) for instance in objects.iterator())
+
+
+def queue_translation(model, object_ids, overwrite=False):
+    """Queue a translate_content job for objects created or changed"""
+    from .jobs import enqueue_job
+    if object_ids:
+        enqueue_job('translate_content', model=model._meta.label, object_ids=list(object_ids), overwrite=overwrite)
+
+
+def localized_text(instance, field, language):
+    """
+    A field in the given language: the stored translation, or a runtime
+    translation until the background job has stored one
+    """
+    text = stored_translation(instance, field, language)
+    if text is None:
+        text = translate_text(stored_translation(instance, field, source_language()), language)
+    return text
@@ -0,0 +1,197 @@
+# chatbot/downloads.py
+
+# Serving stored document files: streamed, cacheable and resumable
+import mimetypes
+import re
+import threading
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Bytes read per chunk when streaming part of a file
+CHUNK_SIZE = 64 * 1024
+
+DOWNLOAD_TOKEN_SALT = 'chatbot.downloads'
+
+# Only PDFs are shown in the browser; any other upload (e.g. .html or .svg)
+# is sent as an attachment so it cannot run as a page of this site
+INLINE_CONTENT_TYPES = {'application/pdf'}
+
+# Ids of the active documents, reloaded every DOWNLOAD_ACTIVE_IDS_MAX_AGE seconds
+_active_ids = {'ids': frozenset(), 'loaded_at': None}
+_active_ids_lock = threading.Lock()
+
+
+def file_etag(size, modified, content_hash=''):
+    """Strong ETag from the content hash, or one derived from size and mtime"""
+    if content_hash:
+        return quote_etag(content_hash)
+    return quote_etag(f"{size:x}-{int(modified.timestamp()):x}")
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) of a single 'bytes=' range, inclusive, or None when
+    the header should be ignored (absent, malformed or several ranges).
+    Raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    """A Range is only honoured if If-Range (when sent) still names this file"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _stream_range(f, start, length):
+    try:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _accel_response(storage, name):
+    """
+    Hand the file to the front proxy (DOWNLOAD_ACCEL = 'nginx' or 'sendfile'),
+    or return None to serve it from Python
+    """
+    mode = getattr(settings, 'DOWNLOAD_ACCEL', None)
+    if mode == 'nginx':
+        response = HttpResponse()
+        prefix = getattr(settings, 'DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(name)
+        return response
+    if mode == 'sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = storage.path(name)
+        return response
+    return None
+
+
+def serve_file(request, storage, name, filename, inline=False, content_hash=''):
+    """
+    Response for a stored file with ETag/Last-Modified validators, 304 and
+    412 handling and single byte ranges. The body is streamed from storage
+    in chunks, or sent by the front proxy when DOWNLOAD_ACCEL is set.
+    """
+    size = storage.size(name)
+    modified = storage.get_modified_time(name)
+    last_modified = int(modified.timestamp())
+    etag = file_etag(size, modified, content_hash)
+
+    content_type = mimetypes.guess_type(filename)[0]
+    inline = inline and content_type in INLINE_CONTENT_TYPES
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if not inline:
+            content_type = 'application/octet-stream'
+
+        response = _accel_response(storage, name)
+        if response is None:
+            try:
+                byte_range = None
+                if request.method == 'GET' and _if_range_matches(request, etag, last_modified):
+                    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{size}"
+                return response
+
+            if byte_range is None:
+                response = FileResponse(storage.open(name, 'rb'))
+            else:
+                start, end = byte_range
+                response = StreamingHttpResponse(
+                    _stream_range(storage.open(name, 'rb'), start, end - start + 1), status=206,
+                )
+                response['Content-Range'] = f"bytes {start}-{end}/{size}"
+                response['Content-Length'] = str(end - start + 1)
+            response['Accept-Ranges'] = 'bytes'
+
+        response['Content-Type'] = content_type
+        response['Content-Disposition'] = content_disposition_header(not inline, filename)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'DOWNLOAD_CACHE_MAX_AGE', 3600))
+    return response
+
+
+def make_download_token(document, inline=False):
+    """
+    Signed, timestamped token naming a document, its stored file and
+    whether it opens in the browser. It carries everything needed to serve
+    the file, so checking it needs no database.
+    """
+    payload = {'d': document.id, 'f': document.file.name, 'n': document.filename(), 'h': document.content_hash}
+    if inline:
+        payload['i'] = 1
+    return signing.dumps(payload, salt=DOWNLOAD_TOKEN_SALT, compress=True)
+
+
+def read_download_token(token):
+    """
+    Payload of a download token; raises signing.SignatureExpired once it is
+    older than DOWNLOAD_URL_MAX_AGE and signing.BadSignature if tampered with
+    """
+    return signing.loads(token, salt=DOWNLOAD_TOKEN_SALT, max_age=getattr(settings, 'DOWNLOAD_URL_MAX_AGE', 86400))
+
+
+def signed_download_url(document, inline=False, page=None):
+    """Expiring download link for a document, optionally opening a PDF at a page"""
+    url = reverse('signed_download', args=[make_download_token(document, inline)])
+    if page:
+        url += f'#page={page}'
+    return url
+
+
+def is_document_active(document_id):
+    """
+    Whether a document may still be downloaded. The ids of active documents
+    are loaded at most once every DOWNLOAD_ACTIVE_IDS_MAX_AGE seconds per
+    worker, so serving a download does not query the database; a document
+    deactivated or deleted in between stays downloadable for that long.
+    An id missing from the list (a document uploaded since) reloads it.
+    """
+    from .models import Document
+    max_age = getattr(settings, 'DOWNLOAD_ACTIVE_IDS_MAX_AGE', 60)
+    with _active_ids_lock:
+        loaded_at = _active_ids['loaded_at']
+        if (loaded_at is None or time.monotonic() - loaded_at >= max_age
+                or document_id not in _active_ids['ids']):
+            _active_ids['ids'] = frozenset(Document.objects.filter(is_active=True).values_list('id', flat=True))
+            _active_ids['loaded_at'] = time.monotonic()
+        return document_id in _active_ids['ids']
@@ -0,0 +1,271 @@
+# chatbot/entities.py
+
+# Entities of a chat query (subject, semester, unit, document type, target
+# percentage, faculty, date words), extracted once per message and shared
+# by every intent handler and by document search
+import json
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+
+def _by_first_word(phrases):
+    """{first token: [(tokens, value), ...]} of a {tokens: value} dict"""
+    index = {}
+    for phrase, value in phrases.items():
+        index.setdefault(phrase[0], []).append((phrase, value))
+    return index
+
+
+# Subject abbreviations students use, mapped to the full subject names
+SUBJECT_ABBREVIATIONS = {
+    'daa': 'Design and Analysis of Algorithms',
+    'se': 'Software Engineering',
+    'dvd': 'Data Visualization & Data Analytics',
+    'ep': 'Enterprise Programming',
+    'toc': 'Theory of Computation',
+    'aws': 'AWS Fundamentals',
+    'pce': 'Professionalism & Corporate Ethics'
+}
+
+# Words used for each document type
+DOC_TYPE_WORDS = {
+    'ppt': 'ppt', 'powerpoint': 'ppt', 'presentation': 'ppt', 'slides': 'ppt',
+    'notes': 'notes', 'note': 'notes',
+    'syllabus': 'syllabus', 'syllabi': 'syllabus',
+    'assignment': 'assignment', 'assignments': 'assignment',
+    'circular': 'circular', 'circulars': 'circular',
+    'question': 'question_paper', 'paper': 'question_paper', 'papers': 'question_paper'
+}
+
+# Words in front of a unit or semester number
+UNIT_WORDS = {'unit', 'chapter', 'u'}
+SEMESTER_WORDS = {'sem', 'semester'}
+ORDINAL_SUFFIXES = {'st', 'nd', 'rd', 'th'}
+PERCENT_WORDS = {'%', 'percent', 'percentage'}
+
+# Dates and calendar events, as the academic calendar handler names them
+DATE_WORDS = {
+    'today': 'today', 'aj': 'today', 'aaj': 'today', 'aaje': 'today',
+    'exam': 'exam', 'exams': 'exam', 'examination': 'exam', 'pariksha': 'exam',
+    'midterm': 'midterm', 'diwali': 'diwali', 'vacation': 'vacation',
+}
+DATE_PHRASES = _by_first_word({('end', 'sem'): 'end sem', ('mid', 'sem'): 'midterm'})
+
+# Words that say what is being asked about
+CUE_WORDS = {
+    # A target attendance
+    'target': 'target', 'reach': 'target', 'achieve': 'target', 'kitne': 'target', 'kaise': 'target',
+    'percentage': 'target',
+    # Contact details
+    'email': 'contact', 'mail': 'contact', 'contact': 'contact', 'id': 'contact',
+    # A schedule
+    'schedule': 'schedule', 'lecture': 'schedule', 'time': 'schedule', 'when': 'schedule', 'day': 'schedule',
+}
+CUE_PHRASES = _by_first_word({('how', 'many'): 'target'})
+
+# Words of a document request that say nothing about the content wanted
+REQUEST_WORDS = frozenset([
+    'need', 'want', 'send', 'show', 'give', 'get', 'find', 'share', 'download', 'please', 'pls', 'plz',
+    'document', 'documents', 'file', 'files', 'pdf', 'material', 'materials', 'study',
+])
+
+# Titles that are not part of a faculty member's name
+NAME_TITLES = {'dr', 'prof', 'mr', 'mrs', 'ms', 'sir', 'maam', 'madam'}
+
+# Letters and numbers apart ('unit2' -> 'unit', '2'; '75%' -> '75', '%')
+TOKEN_RE = re.compile(r'[^\W\d_]+|\d+|%')
+
+# Full subject names as token sequences
+SUBJECT_PHRASES = _by_first_word({
+    tuple(TOKEN_RE.findall(name.lower())): name for name in SUBJECT_ABBREVIATIONS.values()
+})
+
+TIMETABLE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'timetable.json')
+
+Entities = namedtuple('Entities', [
+    'text',               # lower-cased query
+    'words',              # set of its tokens
+    'subject',            # full subject name, from an abbreviation or the name itself
+    'semester',
+    'unit',
+    'doc_type',
+    'target_percentage',  # for attendance projections
+    'faculty',            # faculty name as in the timetable
+    'date_words',         # 'today', 'exam', 'midterm', 'end sem', 'diwali', 'vacation'
+    'cues',               # 'target', 'contact', 'schedule'
+])
+
+
+@lru_cache(maxsize=1)
+def faculty_names():
+    """Faculty names in the timetable"""
+    try:
+        with open(TIMETABLE_PATH, encoding='utf-8') as f:
+            timetable = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Timetable load error: {e}")
+        return ()
+    names = []
+    for slots in timetable.get('Timetable', {}).values():
+        if not isinstance(slots, dict):
+            continue
+        for details in slots.values():
+            if isinstance(details, dict) and details.get('faculty') and details['faculty'] not in names:
+                names.append(details['faculty'])
+    return tuple(names)
+
+
+@lru_cache(maxsize=1)
+def _faculty_words():
+    """Faculty name for each word of a name ('gaurav', 'soni' -> 'Gaurav Soni')"""
+    words = {}
+    for name in faculty_names():
+        for word in TOKEN_RE.findall(name.lower()):
+            if len(word) > 2 and word not in NAME_TITLES:
+                words.setdefault(word, name)
+    return words
+
+
+def _phrase_at(tokens, i, phrases):
+    """Value of a phrase starting at tokens[i], or None"""
+    for phrase, value in phrases.get(tokens[i], ()):
+        if tuple(tokens[i:i + len(phrase)]) == phrase:
+            return value
+    return None
+
+
+@lru_cache(maxsize=getattr(settings, 'ENTITY_CACHE_SIZE', 4096))
+def extract_entities(query):
+    """
+    Entities of a query, from one pass over its tokens.
+
+    A number after 'unit'/'chapter' is the unit, one next to 'sem' the
+    semester and one before '%' or 'percent' the target percentage. Numbers
+    left over are taken as the unit (for document search) and, when the
+    query asks about a target, as the target percentage.
+    """
+    text = (query or '').lower()
+    tokens = TOKEN_RE.findall(text)
+    subject = semester = unit = doc_type = percentage = faculty = None
+    numbers = []
+    date_words = []
+    cues = set()
+    faculty_words = _faculty_words()
+
+    for i, token in enumerate(tokens):
+        previous = tokens[i - 1] if i else ''
+        following = tokens[i + 1] if i + 1 < len(tokens) else ''
+        if token.isdigit():
+            number = int(token)
+            if previous in UNIT_WORDS and unit is None:
+                unit = number
+            elif semester is None and (previous in SEMESTER_WORDS or following in SEMESTER_WORDS or (
+                    following in ORDINAL_SUFFIXES and i + 2 < len(tokens) and tokens[i + 2] in SEMESTER_WORDS)):
+                semester = number
+            elif following in PERCENT_WORDS and percentage is None and 0 <= number <= 100:
+                percentage = number
+            else:
+                numbers.append(number)
+            continue
+
+        if doc_type is None and token in DOC_TYPE_WORDS:
+            doc_type = DOC_TYPE_WORDS[token]
+        if subject is None:
+            subject = SUBJECT_ABBREVIATIONS.get(token) or _phrase_at(tokens, i, SUBJECT_PHRASES)
+        if faculty is None and token in faculty_words:
+            faculty = faculty_words[token]
+        date_word = DATE_WORDS.get(token) or _phrase_at(tokens, i, DATE_PHRASES)
+        if date_word and date_word not in date_words:
+            date_words.append(date_word)
+        cue = CUE_WORDS.get(token) or _phrase_at(tokens, i, CUE_PHRASES)
+        if cue:
+            cues.add(cue)
+
+    if unit is None:
+        # A bare number left over after the semester is taken as the unit
+        unit = next((number for number in numbers if number < 100), None)
+    if percentage is None and 'target' in cues:
+        percentage = next((number for number in numbers if 0 <= number <= 100), None)
+
+    return Entities(
+        text=text,
+        words=frozenset(tokens),
+        subject=subject,
+        semester=semester,
+        unit=unit,
+        doc_type=doc_type,
+        target_percentage=percentage,
+        faculty=faculty,
+        date_words=tuple(date_words),
+        cues=frozenset(cues),
+    )
+
+
+def match_subject(entities, subjects, partial=False):
+    """
+    The one of `subjects` (as stored, e.g. 'DAA' or 'Software Engineering')
+    a query is about. With `partial`, a longer word of a subject name in
+    the query is enough ('software' -> 'Software Engineering').
+    """
+    wanted = entities.subject.lower() if entities.subject else None
+    for subject in subjects:
+        subject_lower = subject.lower()
+        if (subject_lower in entities.words
+                or (wanted and wanted in (subject_lower, SUBJECT_ABBREVIATIONS.get(subject_lower, '').lower()))
+                or (' ' in subject_lower and subject_lower in entities.text)):
+            return subject
+    if partial:
+        for subject in subjects:
+            if any(len(word) > 3 and word in entities.words for word in subject.lower().split()):
+                return subject
+    return None
+
+
+def extract_document_filters(query, subjects):
+    """
+    Semester, subject, unit and document type of a query, to be applied as
+    database filters before any text is scored.
+    """
+    entities = extract_entities(query)
+    filters = {}
+    if entities.semester is not None:
+        filters['semester'] = entities.semester
+    if entities.unit is not None:
+        filters['unit'] = entities.unit
+    subject = match_subject(entities, subjects)
+    if subject:
+        filters['subject'] = subject
+    if entities.doc_type:
+        filters['doc_type'] = entities.doc_type
+    return filters
+
+
+def text_terms(query, subject=None):
+    """
+    Words of a query the document text itself has to match: what is left
+    once stop words, request words and the metadata applied as filters
+    (numbers, unit/semester words, document type, subject) are taken out
+    """
+    entities = extract_entities(query)
+    metadata = set()
+    for name in [entities.subject, subject]:
+        if name:
+            metadata.update(TOKEN_RE.findall(name.lower()))
+    return [
+        token for token in TOKEN_RE.findall(entities.text)
+        if not token.isdigit()
+        and token not in metadata
+        and token not in ENGLISH_STOP_WORDS
+        and token not in REQUEST_WORDS
+        and token not in UNIT_WORDS
+        and token not in SEMESTER_WORDS
+        and token not in ORDINAL_SUFFIXES
+        and token not in PERCENT_WORDS
+        and token not in DOC_TYPE_WORDS
+        and token not in SUBJECT_ABBREVIATIONS
+    ]
@@ -0,0 +1,150 @@
+# chatbot/extraction.py
+
+# Text extraction from document files, independent of Django so it can run
+# in worker processes. Readers are generators yielding one page or slide at
+# a time, and read_passages() stops pulling from them once a budget is spent.
+import os
+import time
+
+import PyPDF2
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+# Bump whenever the readers change what they extract, so results cached
+# by an older version are not reused
+EXTRACTOR_VERSION = 2
+
+
+class ExtractionLimits:
+    """
+    Budgets for extracting a single file; None means unlimited.
+
+    max_pages and max_chars bound the pages/slides kept, max_seconds bounds
+    the time spent parsing and max_stored_bytes caps the joined text stored
+    for the document.
+    """
+
+    def __init__(self, max_pages=None, max_chars=None, max_seconds=None, max_stored_bytes=None):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.max_seconds = max_seconds
+        self.max_stored_bytes = max_stored_bytes
+
+    @classmethod
+    def from_settings(cls):
+        from django.conf import settings
+        return cls(
+            max_pages=getattr(settings, 'EXTRACTION_MAX_PAGES', None),
+            max_chars=getattr(settings, 'EXTRACTION_MAX_CHARS', None),
+            max_seconds=getattr(settings, 'EXTRACTION_MAX_SECONDS', None),
+            max_stored_bytes=getattr(settings, 'EXTRACTION_MAX_STORED_BYTES', None),
+        )
+
+
+def iter_pdf_pages(path):
+    """Yield (page number, text) for each page of a PDF file"""
+    with open(path, 'rb') as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        for number, page in enumerate(pdf_reader.pages, start=1):
+            yield number, page.extract_text() or ""
+
+
+def _shape_texts(shapes):
+    """Text of the shapes on a slide, looking inside groups and tables"""
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from _shape_texts(shape.shapes)
+        elif getattr(shape, 'has_table', False):
+            for row in shape.table.rows:
+                yield " | ".join(cell.text for cell in row.cells)
+        elif shape.has_text_frame:
+            yield shape.text_frame.text
+
+
+def iter_ppt_slides(path):
+    """Yield (slide number, text) for each slide, including speaker notes"""
+    presentation = Presentation(path)
+    for number, slide in enumerate(presentation.slides, start=1):
+        texts = list(_shape_texts(slide.shapes))
+        if slide.has_notes_slide and slide.notes_slide.notes_text_frame is not None:
+            texts.append(slide.notes_slide.notes_text_frame.text)
+        yield number, "\n".join(text for text in texts if text)
+
+
+def iter_passages(path):
+    """
+    Yield (page or slide number, text) pairs for a supported file; other
+    file types yield nothing. Errors reading the file are raised.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        return iter_pdf_pages(path)
+    elif extension in ['.ppt', '.pptx']:
+        return iter_ppt_slides(path)
+    return iter([])
+
+
+def read_passages(path, limits=None, reader=iter_passages):
+    """
+    Return the (number, text) pairs of a file that fit within the limits.
+    Pages are pulled from the reader one at a time, so parsing stops as
+    soon as a budget is used up instead of after the whole file.
+    """
+    return extract_passages(path, limits, reader)[0]
+
+
+def extract_passages(path, limits=None, reader=iter_passages):
+    """
+    Like read_passages(), but returns (passages, stopped_by) where
+    stopped_by names the budget that cut extraction short, or is None
+    """
+    limits = limits or ExtractionLimits()
+    passages = []
+    chars = 0
+    stopped_by = None
+    start = time.monotonic()
+    source = reader(path)
+    try:
+        for pages, (number, text) in enumerate(source, start=1):
+            if limits.max_pages and pages > limits.max_pages:
+                stopped_by = 'page limit'
+                break
+            if limits.max_chars and chars + len(text) > limits.max_chars:
+                passages.append((number, text[:limits.max_chars - chars]))
+                stopped_by = 'character limit'
+                break
+            chars += len(text)
+            passages.append((number, text))
+            if limits.max_seconds and time.monotonic() - start > limits.max_seconds:
+                stopped_by = 'time limit'
+                break
+    finally:
+        # Closes the file (and the parser) behind a generator we stopped early
+        if hasattr(source, 'close'):
+            source.close()
+
+    if stopped_by:
+        print(f"Extraction of {os.path.basename(path)} stopped at the {stopped_by} after {len(passages)} pages")
+    return passages, stopped_by
+
+
+def join_passages(passages, max_bytes=None):
+    """The document text stored for search, cut to max_bytes of UTF-8"""
+    text = "\n".join(text for _, text in passages)
+    if max_bytes and len(text) > max_bytes // 4:
+        encoded = text.encode('utf-8')
+        if len(encoded) > max_bytes:
+            text = encoded[:max_bytes].decode('utf-8', errors='ignore')
+    return text
+
+
+def extract_file(path, limits=None):
+    """
+    Return (passages, stopped_by, error) for a file; error is None on
+    success. Meant to be mapped over files in a process pool, so nothing
+    is raised.
+    """
+    try:
+        return extract_passages(path, limits) + (None,)
+    except Exception as e:
+        return [], None, f"{type(e).__name__}: {e}"
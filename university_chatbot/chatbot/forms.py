@@ -1,4 +1,6 @@
 # chatbot/forms.py
+import zipfile
+
 from django import forms
 from .models import Document, FAQ
 
@@ -16,6 +18,26 @@ class DocumentForm(forms.ModelForm):
         for field in self.fields:
             self.fields[field].widget.attrs.update({'class': 'form-control'})
 
+class BulkUploadForm(forms.Form):
+    archive = forms.FileField(help_text='Zip archive of PDF/PPT files')
+    manifest = forms.FileField(
+        required=False,
+        help_text='CSV or JSON with file, title, subject, semester, unit, doc_type and description '
+                  '(optional if the archive contains manifest.csv)',
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields:
+            self.fields[field].widget.attrs.update({'class': 'form-control'})
+    
+    def clean_archive(self):
+        archive = self.cleaned_data['archive']
+        if not zipfile.is_zipfile(archive):
+            raise forms.ValidationError('Please upload a zip archive.')
+        archive.seek(0)
+        return archive
+
 class FAQForm(forms.ModelForm):
     class Meta:
         model = FAQ
@@ -0,0 +1,211 @@
+# chatbot/fts.py
+
+# SQLite FTS5 full-text search backend for documents.
+#
+# The document table is contentless (content=''): it holds only the index,
+# not a copy of the text, which stays compressed in DocumentText. A
+# contentless row can only be removed by passing the values it was indexed
+# with, so they are read back from the database before a document changes.
+import re
+
+from django.db import connection, DatabaseError
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+FTS_TABLE = 'chatbot_document_fts'
+PASSAGE_FTS_TABLE = 'chatbot_documentpassage_fts'
+
+# Column weights for bm25(): title, subject, description, extracted_text
+BM25_WEIGHTS = (10.0, 8.0, 3.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_available():
+    """FTS5 is only used on SQLite"""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_expression(query):
+    """
+    Turn a free-text chat query into an FTS5 MATCH expression.
+
+    Every meaningful word is quoted (so FTS5 operators typed by users are
+    taken literally) and the words are OR-ed together; bm25 then ranks the
+    documents that contain more and rarer query words first.
+    """
+    words = []
+    for word in TOKEN_RE.findall(query.lower()):
+        if word in ENGLISH_STOP_WORDS or word in words:
+            continue
+        words.append(word)
+    return ' OR '.join(f'"{word}"' for word in words)
+
+
+INSERT_SQL = (
+    f"INSERT INTO {FTS_TABLE} (rowid, title, subject, description, extracted_text) "
+    "VALUES (%s, %s, %s, %s, %s)"
+)
+DELETE_SQL = (
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, subject, description, extracted_text) "
+    "VALUES ('delete', %s, %s, %s, %s, %s)"
+)
+
+
+def indexed_values(doc):
+    """[title, subject, description, extracted_text] of a document as indexed (source language)"""
+    from .content_translation import source_language
+    language = source_language()
+    return [
+        getattr(doc, f'title_{language}', None) or '',
+        doc.subject or '',
+        getattr(doc, f'description_{language}', None) or '',
+        doc.extracted_text or '',
+    ]
+
+
+def stored_values(doc_id):
+    """
+    The values a document's row was indexed with, read from the database
+    before the document is changed or deleted; None if it is not stored yet
+    """
+    from .models import Document
+    if doc_id is None or not fts_available():
+        return None
+    doc = Document.objects.select_related('text_content').filter(id=doc_id).first()
+    return indexed_values(doc) if doc else None
+
+
+def sync_document(doc, old_values=None):
+    """Replace a document's row in the FTS table; old_values are from stored_values()"""
+    if not fts_available():
+        return
+    values = indexed_values(doc)
+    if values == old_values:
+        return
+    try:
+        with connection.cursor() as cursor:
+            if old_values is not None:
+                cursor.execute(DELETE_SQL, [doc.id] + old_values)
+            cursor.execute(INSERT_SQL, [doc.id] + values)
+    except DatabaseError as e:
+        print(f"FTS sync error: {e}")
+
+
+def remove_document(doc_id, old_values):
+    if not fts_available() or old_values is None:
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(DELETE_SQL, [doc_id] + old_values)
+    except DatabaseError as e:
+        print(f"FTS sync error: {e}")
+
+
+def sync_passages(old_ids, passages):
+    """Replace a document's pages/slides in the passage FTS table"""
+    if not fts_available():
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {PASSAGE_FTS_TABLE} WHERE rowid = %s",
+                [[passage_id] for passage_id in old_ids],
+            )
+            cursor.executemany(
+                f"INSERT INTO {PASSAGE_FTS_TABLE} (rowid, text) VALUES (%s, %s)",
+                [[passage.id, passage.text] for passage in passages],
+            )
+    except DatabaseError as e:
+        print(f"FTS sync error: {e}")
+
+
+def rebuild():
+    """Repopulate the FTS tables from the document and passage tables"""
+    from .models import Document
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('delete-all')")
+        # The extracted text is stored compressed, so it is decompressed
+        # here rather than copied over in SQL
+        rows = []
+        for doc in Document.objects.select_related('text_content').iterator(chunk_size=500):
+            rows.append([doc.id] + indexed_values(doc))
+            if len(rows) == 500:
+                cursor.executemany(INSERT_SQL, rows)
+                rows = []
+        cursor.executemany(INSERT_SQL, rows)
+        cursor.execute(f"DELETE FROM {PASSAGE_FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {PASSAGE_FTS_TABLE} (rowid, text) "
+            "SELECT id, text FROM chatbot_documentpassage"
+        )
+
+
+def _filter_conditions(filters):
+    """SQL conditions on the document table (alias d) for metadata filters"""
+    conditions = []
+    params = []
+    for field in ['semester', 'unit', 'doc_type']:
+        if field in filters:
+            conditions.append(f"AND d.{field} = %s")
+            params.append(filters[field])
+    if 'subject' in filters:
+        conditions.append("AND d.subject = %s COLLATE NOCASE")
+        params.append(filters['subject'])
+    return ' '.join(conditions), params
+
+
+def search_document_ids(query, limit=5, filters=None):
+    """
+    Rank active documents with BM25 inside SQLite and return their ids.
+    Metadata filters (semester, subject, unit, doc_type) are applied in the
+    same query.
+    """
+    match = build_match_expression(query)
+    if not match or not fts_available():
+        return []
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    conditions, params = _filter_conditions(filters or {})
+    sql = (
+        f"SELECT d.id FROM {FTS_TABLE} "
+        f"JOIN chatbot_document d ON d.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND d.is_active {conditions} "
+        f"ORDER BY bm25({FTS_TABLE}, {weights}) "
+        "LIMIT %s"
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [match] + params + [limit])
+            return [row[0] for row in cursor.fetchall()]
+    except DatabaseError as e:
+        print(f"FTS search error: {e}")
+        return []
+
+
+def search_passage_ids(query, limit=3, filters=None):
+    """
+    Rank pages/slides of active documents with BM25 and return their ids
+    """
+    match = build_match_expression(query)
+    if not match or not fts_available():
+        return []
+
+    conditions, params = _filter_conditions(filters or {})
+    sql = (
+        f"SELECT p.id FROM {PASSAGE_FTS_TABLE} "
+        f"JOIN chatbot_documentpassage p ON p.id = {PASSAGE_FTS_TABLE}.rowid "
+        "JOIN chatbot_document d ON d.id = p.document_id "
+        f"WHERE {PASSAGE_FTS_TABLE} MATCH %s AND d.is_active {conditions} "
+        f"ORDER BY bm25({PASSAGE_FTS_TABLE}) "
+        "LIMIT %s"
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [match] + params + [limit])
+            return [row[0] for row in cursor.fetchall()]
+    except DatabaseError as e:
+        print(f"FTS search error: {e}")
+        return []
+
@@ -0,0 +1,197 @@
+# chatbot/ingest.py
+
+# Bulk loading of documents from a directory or zip archive plus a manifest
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import fts
+from .content_store import cache_passages, get_cached_passages, store_file
+from .content_translation import queue_translation
+from .extraction import ExtractionLimits, extract_file, join_passages
+from .search_cache import bump_corpus_version
+
+# Manifests may also be shipped inside the archive or directory
+MANIFEST_NAMES = ['manifest.csv', 'manifest.json']
+
+
+class IngestSource:
+    """Files of a directory or zip archive, opened by their relative name"""
+
+    def __init__(self, path):
+        self.path = path
+        self.archive = zipfile.ZipFile(path) if zipfile.is_zipfile(path) else None
+        if self.archive is None and not os.path.isdir(path):
+            raise ValueError(f"{path} is neither a directory nor a zip archive")
+
+    def open(self, name):
+        if self.archive is not None:
+            return self.archive.open(name)
+        root = os.path.realpath(self.path)
+        path = os.path.realpath(os.path.join(root, name))
+        if not path.startswith(root + os.sep):
+            raise ValueError(f"{name} is outside {self.path}")
+        return open(path, 'rb')
+
+    def exists(self, name):
+        if self.archive is not None:
+            return name in self.archive.namelist()
+        return os.path.isfile(os.path.join(self.path, name))
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+
+def read_manifest(f, name):
+    """
+    Rows of a CSV or JSON manifest, as dicts with the keys file, title,
+    subject, semester, unit, doc_type and description. The name picks the
+    format.
+    """
+    if name.lower().endswith('.json'):
+        return json.loads(f.read())
+    return list(csv.DictReader(io.TextIOWrapper(f, encoding='utf-8-sig')))
+
+
+def find_manifest(source):
+    """Read the manifest bundled with a source, or return None"""
+    for name in MANIFEST_NAMES:
+        if source.exists(name):
+            with source.open(name) as f:
+                return read_manifest(f, name)
+    return None
+
+
+def _extract_all(paths, limits, workers):
+    """(passages, error) per path, spread over a process pool"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        return [extract_file(path, limits) for path in paths]
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(extract_file, paths, repeat(limits), chunksize=chunksize))
+
+
+def ingest(source_path, rows=None, uploaded_by=None, workers=None):
+    """
+    Store and index every file listed in the manifest rows (or the manifest
+    bundled with the source). Files are stored once per content hash, text
+    not already cached is extracted in parallel, the rows are written with
+    bulk_create and the search index is rebuilt once.
+
+    Returns a summary with the counts, bytes, elapsed seconds and the
+    errors of rows that were skipped or failed to extract.
+    """
+    from .models import Document, DocumentPassage, DocumentText
+
+    start = time.perf_counter()
+    source = IngestSource(source_path)
+    documents = []
+    errors = []
+    total_bytes = 0
+    try:
+        if rows is None:
+            rows = find_manifest(source)
+            if rows is None:
+                raise ValueError(f"No manifest given and none of {', '.join(MANIFEST_NAMES)} found in {source_path}")
+
+        for number, row in enumerate(rows, start=1):
+            name = (row.get('file') or '').strip()
+            try:
+                if not name:
+                    raise ValueError("No file given")
+                document = Document(
+                    title=row.get('title') or os.path.splitext(os.path.basename(name))[0],
+                    description=row.get('description') or '',
+                    semester=row.get('semester'),
+                    subject=row.get('subject'),
+                    unit=row.get('unit') or None,
+                    doc_type=row.get('doc_type'),
+                    uploaded_by=uploaded_by,
+                    extraction_status=Document.EXTRACTION_DONE,
+                )
+                document.full_clean(exclude=['file', 'uploaded_by'])
+                with source.open(name) as f:
+                    document.file.name, document.content_hash = store_file(File(f), name)
+                document.original_filename = os.path.basename(name)
+            except (ValidationError, ValueError, KeyError, OSError) as e:
+                errors.append(f"Row {number} ({name}): {e}")
+                continue
+            total_bytes += default_storage.size(document.file.name)
+            documents.append(document)
+    finally:
+        source.close()
+
+    # Only content that was never extracted before goes to the pool
+    limits = ExtractionLimits.from_settings()
+    extracted = {}
+    for document in documents:
+        if document.content_hash not in extracted:
+            extracted[document.content_hash] = get_cached_passages(document.content_hash, limits)
+    # One document per content hash that is not cached yet
+    misses = list({
+        document.content_hash: document
+        for document in documents if extracted[document.content_hash] is None
+    }.values())
+    results = _extract_all([default_storage.path(document.file.name) for document in misses], limits, workers)
+    failed = set()
+    for document, (passages, stopped_by, error) in zip(misses, results):
+        if error:
+            errors.append(f"{document.original_filename}: {error}")
+            failed.add(document.content_hash)
+        elif stopped_by != 'time limit':
+            cache_passages(document.content_hash, limits, passages)
+        extracted[document.content_hash] = passages
+
+    passages_by_document = []
+    for document in documents:
+        passages = extracted[document.content_hash]
+        if document.content_hash in failed:
+            document.extraction_status = Document.EXTRACTION_FAILED
+        document.extracted_text = join_passages(passages, limits.max_stored_bytes)
+        passages_by_document.append(passages)
+
+    # bulk_create skips the signals that keep the indexes in step, so the
+    # indexes are rebuilt once below instead of once per document
+    with transaction.atomic():
+        Document.objects.bulk_create(documents, batch_size=500)
+        DocumentText.bulk_save(documents)
+        DocumentPassage.objects.bulk_create([
+            DocumentPassage(document=document, number=number, text=text)
+            for document, passages in zip(documents, passages_by_document)
+            for number, text in passages
+            if text.strip()
+        ], batch_size=1000)
+    fts.rebuild()
+    queue_translation(Document, [document.pk for document in documents])
+    # Workers rebuild their in-process indexes when they see the new version
+    bump_corpus_version()
+
+    return {
+        'documents': len(documents),
+        'failed': sum(1 for document in documents if document.extraction_status == Document.EXTRACTION_FAILED),
+        'bytes': total_bytes,
+        'seconds': time.perf_counter() - start,
+        'errors': errors,
+    }
+
+
+def throughput_summary(summary):
+    """One-line files/s and MB/s report of an ingest() summary"""
+    seconds = max(summary['seconds'], 1e-9)
+    megabytes = summary['bytes'] / (1024 * 1024)
+    return (
+        f"{summary['documents']} files ({megabytes:.1f} MB) in {summary['seconds']:.1f}s: "
+        f"{summary['documents'] / seconds:.1f} files/s, {megabytes / seconds:.2f} MB/s"
+    )
@@ -0,0 +1,168 @@
+# chatbot/intent.py
+
+# Intent classification of chat messages: a linear model over character
+# n-grams, trained on the labelled queries in data/intent_samples.json
+import json
+import math
+import os
+import threading
+from collections import Counter, namedtuple
+from functools import lru_cache
+
+import joblib
+import numpy as np
+from django.conf import settings
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'intent_samples.json')
+
+# Returned when no intent is likely enough; handled by the FAQ search
+FALLBACK_INTENT = 'general'
+
+Intent = namedtuple('Intent', ['intent', 'confidence'])
+
+
+def load_samples(path=SAMPLES_PATH):
+    """(texts, intents) of a JSON list of {"text", "intent"} samples"""
+    with open(path, encoding='utf-8') as f:
+        samples = json.load(f)
+    return [sample['text'] for sample in samples], [sample['intent'] for sample in samples]
+
+
+def make_vectorizer():
+    # Character n-grams inside word boundaries match inflected and
+    # misspelled words ('chahiye'/'chaiye', 'lecture'/'lectures') and work
+    # the same for romanized and native-script text
+    return TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), lowercase=True, sublinear_tf=True)
+
+
+def fit_model(texts, intents):
+    """Fit the vectorizer and a multinomial logistic regression on the samples"""
+    vectorizer = make_vectorizer()
+    features = vectorizer.fit_transform(texts)
+    model = LogisticRegression(C=10, max_iter=1000)
+    model.fit(features, intents)
+    return {
+        'vectorizer': vectorizer,
+        # One row of intent weights per n-gram, with its IDF folded in
+        'weights': np.ascontiguousarray(model.coef_.T * vectorizer.idf_[:, None]),
+        'intercept': model.intercept_.astype(np.float64),
+        'intents': [str(intent) for intent in model.classes_],
+        'samples': len(texts),
+    }
+
+
+class IntentClassifier:
+    """
+    Predicts the intent of a message, with a confidence between 0 and 1.
+
+    The model is fitted by `train_intent_classifier` and saved to
+    INTENT_MODEL_PATH. It is loaded once per process; when nothing has been
+    saved (or the file cannot be read) it is fitted in memory from the
+    samples, which takes well under a second.
+    """
+
+    def __init__(self, path=None, min_confidence=None):
+        self.path = path or getattr(settings, 'INTENT_MODEL_PATH', None)
+        self.min_confidence = (min_confidence if min_confidence is not None
+                               else getattr(settings, 'INTENT_MIN_CONFIDENCE', 0.25))
+        self._lock = threading.Lock()
+        self._model = None
+        self._analyzer = None
+        self.source = None   # 'saved' or 'trained'
+
+    def _load_saved(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            return joblib.load(self.path)
+        except Exception as e:
+            print(f"Intent model load error: {e}")
+            return None
+
+    def load(self):
+        """Load the saved model, or train one from the samples"""
+        model = self._load_saved()
+        source = 'saved'
+        if model is None:
+            model = fit_model(*load_samples())
+            source = 'trained'
+        self._use(model, source)
+        return model
+
+    def train(self, texts, intents):
+        model = fit_model(texts, intents)
+        self._use(model, 'trained')
+        return model
+
+    def _use(self, model, source):
+        with self._lock:
+            self._analyzer = model['vectorizer'].build_analyzer()
+            self._model = model
+            self.source = source
+        classify_intent.cache_clear()
+
+    def save(self):
+        """Write the model to INTENT_MODEL_PATH"""
+        if self._model is None:
+            return False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write next to the target and swap it in, so workers never read half a file
+        temp_path = f"{self.path}.tmp"
+        joblib.dump(self._model, temp_path)
+        os.replace(temp_path, self.path)
+        return True
+
+    @property
+    def model(self):
+        model = self._model
+        if model is None:
+            model = self.load()
+        return model
+
+    def probabilities(self, text):
+        """
+        {intent: probability} for a message.
+
+        The TF-IDF features are computed here rather than with the
+        vectorizer's transform(), whose per-call overhead is many times the
+        cost of scoring one short message: the message's n-grams are
+        counted, weighted 1 + log(count) and l2-normalised, and the matching
+        weight rows summed.
+        """
+        model = self.model
+        vocabulary = model['vectorizer'].vocabulary_
+        found = [(vocabulary[ngram], count) for ngram, count in Counter(self._analyzer(text)).items()
+                 if ngram in vocabulary]
+        scores = model['intercept'].copy()
+        if found:
+            rows = [row for row, count in found]
+            values = np.array([1 + math.log(count) if count > 1 else 1.0 for row, count in found])
+            # The norm includes the IDF, which is folded into the weights
+            norm = math.sqrt(np.dot(values * model['vectorizer'].idf_[rows], values * model['vectorizer'].idf_[rows]))
+            scores += (values / norm) @ model['weights'][rows]
+        scores = np.exp(scores - scores.max())
+        scores /= scores.sum()
+        return dict(zip(model['intents'], scores.tolist()))
+
+    def classify(self, text):
+        """Intent(intent, confidence); the fallback intent when unsure"""
+        if not text or not text.strip():
+            return Intent(FALLBACK_INTENT, 1.0)
+        probabilities = self.probabilities(text)
+        intent = max(probabilities, key=probabilities.get)
+        confidence = probabilities[intent]
+        if confidence < self.min_confidence:
+            return Intent(FALLBACK_INTENT, confidence)
+        return Intent(intent, confidence)
+
+
+# Shared classifier, loaded on first use
+intent_classifier = IntentClassifier()
+
+
+@lru_cache(maxsize=getattr(settings, 'INTENT_CACHE_SIZE', 4096))
+def classify_intent(text):
+    """Intent(intent, confidence) of a message, remembered per worker"""
+    return intent_classifier.classify(text)
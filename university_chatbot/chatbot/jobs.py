@@ -0,0 +1,155 @@
+# chatbot/jobs.py
+
+# Database-backed job queue run by the run_background_jobs command
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# kind -> (function, max_attempts)
+JOB_HANDLERS = {}
+
+# Seconds before a failed job is retried; doubled after every attempt
+RETRY_DELAY = 30
+
+
+def job_handler(kind, max_attempts=3):
+    """Register a function as the handler for jobs of the given kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = (func, max_attempts)
+        return func
+    return register
+
+
+def enqueue_job(kind, **payload):
+    """Queue a job; the payload is passed to the handler as keyword arguments"""
+    from .models import BackgroundJob
+    _, max_attempts = JOB_HANDLERS.get(kind, (None, 3))
+    return BackgroundJob.objects.create(kind=kind, payload=payload, max_attempts=max_attempts)
+
+
+def claim_next_job(kinds=None):
+    """
+    Mark the oldest runnable job as running and return it, or None.
+
+    The claim is a conditional UPDATE, so when several workers race for the
+    same job exactly one of them gets it, on any database.
+    """
+    from .models import BackgroundJob
+    while True:
+        jobs = BackgroundJob.objects.filter(status=BackgroundJob.PENDING, run_after__lte=timezone.now())
+        if kinds:
+            jobs = jobs.filter(kind__in=kinds)
+        job_id = jobs.order_by('run_after', 'id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        claimed = BackgroundJob.objects.filter(id=job_id, status=BackgroundJob.PENDING).update(
+            status=BackgroundJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return BackgroundJob.objects.get(id=job_id)
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; failed jobs are retried with backoff"""
+    from .models import BackgroundJob
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        handler[0](**job.payload)
+    except Exception as e:
+        print(f"Background job error ({job}): {e}")
+        job.last_error = traceback.format_exc()
+        if handler is not None and job.attempts < job.max_attempts:
+            job.status = BackgroundJob.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = BackgroundJob.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = BackgroundJob.DONE
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'run_after', 'finished_at'])
+    return job
+
+
+def requeue_stale_jobs():
+    """
+    Put back jobs left running by a worker that died, once they have run
+    for longer than BACKGROUND_JOB_TIMEOUT seconds
+    """
+    from .models import BackgroundJob, Document
+    timeout = getattr(settings, 'BACKGROUND_JOB_TIMEOUT', 600)
+    with transaction.atomic():
+        stale = BackgroundJob.objects.select_for_update().filter(
+            status=BackgroundJob.RUNNING,
+            started_at__lt=timezone.now() - timedelta(seconds=timeout),
+        )
+        # A document whose extraction died with the worker is left running;
+        # put it back to pending so the retried job claims it again
+        document_ids = [payload.get('document_id') for payload in
+                        stale.filter(kind='extract_document').values_list('payload', flat=True)]
+        Document.objects.filter(
+            id__in=[document_id for document_id in document_ids if document_id],
+            extraction_status=Document.EXTRACTION_RUNNING,
+        ).update(extraction_status=Document.EXTRACTION_PENDING)
+        return stale.update(status=BackgroundJob.PENDING)
+
+
+@job_handler('extract_document', max_attempts=1)
+def extract_document(document_id):
+    """Extract the text and pages/slides of an uploaded document"""
+    from .models import Document
+    claimed = Document.objects.filter(
+        id=document_id, extraction_status=Document.EXTRACTION_PENDING,
+    ).update(extraction_status=Document.EXTRACTION_RUNNING)
+    if not claimed:
+        # Already extracted by an earlier job, or the document was deleted
+        return
+
+    document = Document.objects.get(id=document_id)
+    try:
+        passages = document.read_passages_from_file()
+    except Exception:
+        Document.objects.filter(id=document_id).update(extraction_status=Document.EXTRACTION_FAILED)
+        raise
+    document.set_text_from_passages(passages)
+    document.extraction_status = Document.EXTRACTION_DONE
+    # update_fields makes this fail instead of re-inserting a deleted document
+    document.save(update_fields=['extraction_status'])
+    document.save_passages(passages)
+
+
+@job_handler('translate_content')
+def translate_content(model, object_ids, overwrite=False):
+    """Store the Hindi/Gujarati translations of new or edited FAQs and documents"""
+    from .content_translation import translate_objects
+    translate_objects(model, object_ids, overwrite)
+
+
+@job_handler('ingest_archive', max_attempts=1)
+def ingest_archive(archive, manifest=None, user_id=None):
+    """Bulk load an archive uploaded from the admin dashboard, then delete the upload"""
+    from django.contrib.auth.models import User
+    from django.core.files.storage import default_storage
+    from .ingest import ingest, read_manifest, throughput_summary
+
+    try:
+        rows = None
+        if manifest:
+            with default_storage.open(manifest, 'rb') as f:
+                rows = read_manifest(f, manifest)
+        uploaded_by = User.objects.filter(id=user_id).first() if user_id else None
+        summary = ingest(default_storage.path(archive), rows, uploaded_by=uploaded_by)
+    finally:
+        for name in [archive, manifest]:
+            if name:
+                default_storage.delete(name)
+
+    for error in summary['errors']:
+        print(f"Ingest error: {error}")
+    print(f"Ingested {throughput_summary(summary)}")
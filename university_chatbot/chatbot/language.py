@@ -0,0 +1,116 @@
+# chatbot/language.py
+
+# Language detection for chat messages (English, Hindi, Gujarati)
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from langdetect import DetectorFactory, detect
+
+# Set seed for consistent language detection
+DetectorFactory.seed = 0
+
+ROMAN_WORD_RE = re.compile(r'[a-z]+')
+
+# Romanized words that are common in Hindi or Gujarati chat and are not
+# English words (or subject abbreviations such as 'se' and 'ep')
+ROMANIZED_HINDI = frozenset([
+    'mujhe', 'muje', 'myjhe', 'chahiye', 'chaiye', 'chaihye', 'chahie', 'hai', 'hain', 'kya', 'kaise',
+    'kitna', 'kitne', 'kitni', 'nahi', 'nahin', 'mera', 'meri', 'mere', 'aaj', 'kal', 'batao',
+    'bataiye', 'bataye', 'karo', 'kab', 'kahan', 'kaun', 'ka', 'ke', 'ki', 'ko', 'mein', 'aur',
+    'bhi', 'hoga', 'tha', 'thi', 'wala', 'wali', 'dijiye', 'dena', 'dedo', 'abhi', 'haziri',
+    'upasthiti', 'kaksha', 'pustak', 'prashn', 'samay', 'kripya', 'dhanyavad', 'hum', 'humein',
+    'liye', 'karne', 'karna', 'honge', 'bhej', 'bhejo', 'sakta', 'sakte', 'milega', 'chahte',
+])
+ROMANIZED_GUJARATI = frozenset([
+    'mane', 'joiye', 'joie', 'joyie', 'che', 'chhe', 'shu', 'kem', 'tamaru', 'tamari', 'maru',
+    'mari', 'aaje', 'kyare', 'kyan', 'nathi', 'hatu', 'hati', 'apo', 'aapo', 'batavo', 'kevi',
+    'rite', 'nu', 'ni', 'na', 'ma', 'mate', 'pan', 'ane', 'kaho', 'kahejo', 'hajri', 'prakaran',
+    'prashna', 'vargo', 'aabhar', 'tame', 'ame', 'amne', 'ketli', 'ketla', 'ketlu', 'mokalo',
+    'mokli', 'tamaro', 'amaru', 'malse', 'joishe',
+])
+
+# Romanized words needed before a Latin message counts as clearly Hindi or
+# Gujarati, and how far one language must lead the other
+MIN_ROMANIZED_HITS = 2
+ROMANIZED_LEAD = 2
+
+Detection = namedtuple('Detection', ['language', 'script', 'method'])
+
+
+def script_counts(text):
+    """(Devanagari, Gujarati, Latin) letter counts of a text, in one pass"""
+    devanagari = gujarati = latin = 0
+    for char in text:
+        if char < '\u0080':
+            if char.isalpha():
+                latin += 1
+        elif '\u0900' <= char <= '\u097F':
+            devanagari += 1
+        elif '\u0A80' <= char <= '\u0AFF':
+            gujarati += 1
+    return devanagari, gujarati, latin
+
+
+def romanized_hits(text):
+    """Number of romanized Hindi and Gujarati marker words in a text"""
+    hindi = gujarati = 0
+    for word in ROMAN_WORD_RE.findall(text.lower()):
+        if word in ROMANIZED_HINDI:
+            hindi += 1
+        if word in ROMANIZED_GUJARATI:
+            gujarati += 1
+    return hindi, gujarati
+
+
+def _langdetect(text):
+    try:
+        return detect(text)
+    except Exception as e:
+        print(f"Language detection error: {e}")
+        return None
+
+
+@lru_cache(maxsize=getattr(settings, 'LANGUAGE_DETECTION_CACHE_SIZE', 4096))
+def analyze_language(text):
+    """
+    Detection(language, script, method) for a chat message.
+
+    Text with Devanagari or Gujarati letters is settled by its script
+    counts. Latin text without any romanized Hindi/Gujarati word is
+    English. Romanized text is settled by its marker words when one
+    language clearly leads, and only otherwise asks langdetect, which is
+    slow and probabilistic.
+    """
+    if not text or not isinstance(text, str):
+        return Detection('en', 'latin', 'empty')
+
+    devanagari, gujarati, latin = script_counts(text)
+    native = devanagari + gujarati
+    letters = native + latin
+    if native and (native >= 2 or native / letters > 0.1):
+        if devanagari >= gujarati:
+            return Detection('hi', 'devanagari', 'script')
+        return Detection('gu', 'gujarati', 'script')
+
+    hindi, gujarati = romanized_hits(text)
+    if not hindi and not gujarati:
+        return Detection('en', 'latin', 'script')
+    leader, hits, other = ('hi', hindi, gujarati) if hindi >= gujarati else ('gu', gujarati, hindi)
+    if hits >= MIN_ROMANIZED_HITS and hits >= ROMANIZED_LEAD * other:
+        return Detection(leader, 'latin', 'romanized')
+
+    # A word or two that may be romanized: let langdetect decide whether
+    # this is English, and otherwise trust the markers
+    detected = _langdetect(text)
+    if detected in ['en', 'hi', 'gu']:
+        return Detection(detected, 'latin', 'langdetect')
+    if hits > other:
+        return Detection(leader, 'latin', 'langdetect')
+    return Detection('en', 'latin', 'langdetect')
+
+
+def detect_language(text):
+    """Language code ('en', 'hi' or 'gu') of a chat message"""
+    return analyze_language(text).language
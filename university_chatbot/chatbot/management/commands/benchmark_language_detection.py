@@ -0,0 +1,83 @@
+# chatbot/management/commands/benchmark_language_detection.py
+import json
+import os
+import platform
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chatbot.benchmarks import langdetect_language, run_benchmark, script_share_language
+from chatbot.language import analyze_language, detect_language
+
+SAMPLES_PATH = os.path.join(settings.BASE_DIR, 'chatbot', 'data', 'language_samples.json')
+
+
+def accuracy(detector, samples):
+    """Overall and per-language share of samples detected correctly, plus the mistakes"""
+    correct = Counter()
+    total = Counter()
+    mistakes = []
+    for sample in samples:
+        detected = detector(sample['text'])
+        total[sample['language']] += 1
+        if detected == sample['language']:
+            correct[sample['language']] += 1
+        else:
+            mistakes.append({'text': sample['text'], 'expected': sample['language'], 'detected': detected})
+    return {
+        'accuracy': round(sum(correct.values()) / len(samples), 4),
+        'per_language': {language: round(correct[language] / total[language], 4) for language in sorted(total)},
+        'mistakes': mistakes,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Measures accuracy and latency of chat language detection on the labelled '
+            'samples in chatbot/data/language_samples.json, against the previous detectors')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', default=SAMPLES_PATH, help='JSON list of {"text", "language"} samples')
+        parser.add_argument('--repeat', type=int, default=20, help='Times the samples are run for timing')
+        parser.add_argument('--output', default='language_benchmark.json', help='Where to write the JSON results')
+
+    def handle(self, *args, **options):
+        with open(options['samples'], encoding='utf-8') as f:
+            samples = json.load(f)
+        texts = [sample['text'] for sample in samples] * options['repeat']
+
+        def uncached(text):
+            return analyze_language.__wrapped__(text).language
+
+        detectors = [
+            ('script_share', script_share_language),
+            ('langdetect', langdetect_language),
+            ('script_histogram', uncached),
+            ('script_histogram_cached', detect_language),
+        ]
+        results = []
+        for name, detector in detectors:
+            result = run_benchmark(name, detector, texts, samples=len(samples))
+            result.update(accuracy(detector, samples))
+            results.append(result)
+        methods = Counter(analyze_language(sample['text']).method for sample in samples)
+
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'options': {key: options[key] for key in ['samples', 'repeat']},
+            'detection_methods': dict(methods),
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        for result in results:
+            self.stdout.write(
+                f"{result['benchmark']:<24} accuracy={result['accuracy']} {result['per_language']} "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms"
+            )
+        self.stdout.write(f"Settled by: {dict(methods)}")
+        self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
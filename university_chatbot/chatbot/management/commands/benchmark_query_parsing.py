@@ -0,0 +1,66 @@
+# chatbot/management/commands/benchmark_query_parsing.py
+import json
+import platform
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from chatbot.benchmarks import legacy_document_filters, legacy_query_parsing, run_benchmark
+from chatbot.entities import (SUBJECT_ABBREVIATIONS, extract_document_filters, extract_entities,
+                              faculty_names, match_subject)
+from chatbot.intent import SAMPLES_PATH, load_samples
+
+
+class Command(BaseCommand):
+    help = ('Times the single-pass entity extractor against the separate scans process_message '
+            'made before, on the queries in chatbot/data/intent_samples.json, and lists the '
+            'queries whose document filters changed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', default=SAMPLES_PATH, help='JSON list of {"text", "intent"} samples')
+        parser.add_argument('--repeat', type=int, default=20, help='Times the samples are run for timing')
+        parser.add_argument('--output', default='query_parsing_benchmark.json', help='Where to write the JSON results')
+
+    def handle(self, *args, **options):
+        texts, _ = load_samples(options['samples'])
+        inputs = texts * options['repeat']
+        # Documents are filed under abbreviations, attendance under full names
+        document_subjects = [abbr.upper() for abbr in SUBJECT_ABBREVIATIONS]
+        attendance_subjects = list(SUBJECT_ABBREVIATIONS.values())
+        faculty = faculty_names()
+
+        def legacy(text):
+            return legacy_query_parsing(text, document_subjects, faculty)
+
+        def single_pass(text):
+            entities = extract_entities.__wrapped__(text)
+            match_subject(entities, attendance_subjects, partial=True)
+            return entities
+
+        results = [
+            run_benchmark('separate_scans', legacy, inputs, samples=len(texts)),
+            run_benchmark('extract_entities', single_pass, inputs, samples=len(texts)),
+            run_benchmark('extract_entities_cached', extract_entities, inputs, samples=len(texts)),
+        ]
+        changed = []
+        for text in texts:
+            before = legacy_document_filters(text, document_subjects)
+            after = extract_document_filters(text, document_subjects)
+            if before != after:
+                changed.append({'text': text, 'before': before, 'after': after})
+
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'options': {key: options[key] for key in ['samples', 'repeat']},
+            'results': results,
+            'changed_filters': changed,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        for result in results:
+            self.stdout.write(f"{result['benchmark']:<24} p50={result['p50_ms']}ms p95={result['p95_ms']}ms")
+        self.stdout.write(f"Document filters changed for {len(changed)} of {len(texts)} queries")
+        self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
@@ -0,0 +1,193 @@
+# chatbot/management/commands/benchmark_search.py
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from chatbot import fts
+from chatbot.benchmarks import SyntheticCorpus, run_benchmark, search_documents_logical
+from chatbot.models import Document, DocumentText, FAQ
+from chatbot.search_index import document_index, faq_index, passage_index
+from chatbot.semantic_index import semantic_index
+from chatbot.utils import calculate_similarity, enhanced_document_search
+
+
+def recall_at_k(index, reference, k=5):
+    """Mean share of the reference results found in the index's top k"""
+    recalls = []
+    for query, expected in reference.items():
+        if expected:
+            found = {doc_id for doc_id, _ in index.search(query, limit=k)}
+            recalls.append(len(found & expected) / len(expected))
+    return round(sum(recalls) / len(recalls), 4) if recalls else None
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Point the default connection at a new, migrated database the way the
+    test runner does (a SQLite file in a temporary directory, or
+    test_<NAME> on other databases) and drop it afterwards, so the
+    configured database is never written to
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    old_name = connection.settings_dict['NAME']
+    old_test_name = connection.settings_dict['TEST'].get('NAME')
+    temp_dir = None
+    if connection.vendor == 'sqlite':
+        temp_dir = tempfile.mkdtemp(prefix='benchmark_search_')
+        connection.settings_dict['TEST']['NAME'] = os.path.join(temp_dir, 'benchmark.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        connection.settings_dict['TEST']['NAME'] = old_test_name
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks document search and FAQ matching on synthetic corpora. '
+            'Each corpus is loaded into a throwaway database created like the test database, '
+            'never into the configured one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='Corpus sizes (number of documents) to benchmark')
+        parser.add_argument('--queries', type=int, default=200, help='Queries timed per benchmark')
+        parser.add_argument('--legacy-queries', type=int, default=10,
+                            help='Queries for enhanced_document_search, which refits the whole corpus per call')
+        parser.add_argument('--text-chars', type=int, default=8000,
+                            help='Mean extracted_text length in characters')
+        parser.add_argument('--faqs', type=int, default=2000, help='Number of synthetic FAQs')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='search_benchmark.json', help='Where to write the JSON results')
+
+    def handle(self, *args, **options):
+        results = []
+        for size in options['sizes']:
+            self.stdout.write(f"Benchmarking a corpus of {size} documents...")
+            with throwaway_database():
+                results.extend(self.benchmark_corpus(size, options))
+            # The in-process indexes still hold the synthetic rows
+            document_index.invalidate()
+            semantic_index.invalidate()
+            passage_index.invalidate()
+            faq_index.invalidate()
+
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'options': {key: options[key] for key in ['sizes', 'queries', 'legacy_queries', 'text_chars', 'faqs', 'seed']},
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        for result in results:
+            line = (
+                f"{result['corpus_size']:>7} {result['benchmark']:<32} "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms "
+                f"peak={result['peak_memory_mb']}MB"
+            )
+            if 'recall_vs_enhanced' in result:
+                line += f" index={result['index_memory_mb']}MB recall={result['recall_vs_enhanced']}"
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
+
+    def benchmark_corpus(self, size, options):
+        corpus = SyntheticCorpus(seed=options['seed'], mean_text_chars=options['text_chars'])
+
+        # bulk_create skips the signals that maintain the indexes
+        # (and Document.save(), so the text rows are written separately)
+        batch = []
+        for document in corpus.documents(size):
+            batch.append(document)
+            if len(batch) == 1000:
+                DocumentText.bulk_save(Document.objects.bulk_create(batch))
+                batch = []
+        DocumentText.bulk_save(Document.objects.bulk_create(batch))
+        FAQ.objects.bulk_create(corpus.faqs(options['faqs']))
+        fts.rebuild()
+
+        queries = corpus.queries(options['queries'])
+        faq_queries = corpus.faq_queries(options['queries'])
+        results = []
+
+        def record(result):
+            result['corpus_size'] = size
+            results.append(result)
+            self.stdout.write(f"  {result['benchmark']}: p50={result['p50_ms']}ms")
+
+        # Index build cost, paid once per worker (and after large changes)
+        start = time.perf_counter()
+        document_index.build()
+        record({
+            'benchmark': 'tfidf_index_build', 'calls': 1,
+            'p50_ms': round((time.perf_counter() - start) * 1000, 3),
+            'p95_ms': None, 'p99_ms': None, 'mean_ms': None, 'peak_memory_mb': None,
+        })
+
+        tfidf_result = run_benchmark('tfidf_index_search', document_index.search, queries)
+        record(tfidf_result)
+
+        start = time.perf_counter()
+        semantic_index.build(use_saved=False)
+        record({
+            'benchmark': 'lsa_index_build', 'calls': 1,
+            'p50_ms': round((time.perf_counter() - start) * 1000, 3),
+            'p95_ms': None, 'p99_ms': None, 'mean_ms': None, 'peak_memory_mb': None,
+            'components': semantic_index.n_components,
+        })
+        lsa_result = run_benchmark('lsa_index_search', semantic_index.search, queries)
+        record(lsa_result)
+
+        if fts.fts_available():
+            record(run_benchmark('fts5_bm25_search', fts.search_document_ids, queries))
+
+        documents = list(Document.objects.filter(is_active=True).select_related('text_content'))
+        legacy_queries = queries[:options['legacy_queries']]
+        reference = {}
+
+        def legacy_search(query):
+            reference[query] = {doc.id for doc in enhanced_document_search(query, documents)}
+
+        record(run_benchmark('enhanced_document_search', legacy_search, legacy_queries, memory_samples=1))
+
+        # Share of enhanced_document_search's top 5 that each index also returns
+        for result, index in [(tfidf_result, document_index), (lsa_result, semantic_index)]:
+            result['index_memory_mb'] = round(index.nbytes() / (1024 * 1024), 3)
+            result['recall_vs_enhanced'] = recall_at_k(index, reference)
+        record(run_benchmark(
+            'search_documents_logical', lambda query: search_documents_logical(query, documents), queries,
+        ))
+        del documents
+
+        faqs = list(FAQ.objects.all())
+
+        def legacy_faq_match(query):
+            best_match = None
+            highest_similarity = 0
+            for faq in faqs:
+                similarity = calculate_similarity(query, faq.question.lower())
+                if similarity > highest_similarity and similarity > 0.3:
+                    highest_similarity = similarity
+                    best_match = faq
+            return best_match
+
+        record(run_benchmark(
+            'faq_match_per_faq_fit', legacy_faq_match, faq_queries[:options['legacy_queries']], memory_samples=1,
+            faqs=len(faqs),
+        ))
+        faq_index.build()
+        record(run_benchmark('faq_match_index', faq_index.best_match, faq_queries, faqs=len(faqs)))
+        return results
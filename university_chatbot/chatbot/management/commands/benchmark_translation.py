@@ -0,0 +1,70 @@
+# chatbot/management/commands/benchmark_translation.py
+import json
+import platform
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from chatbot.benchmarks import run_benchmark, translation_inputs, word_by_word_translate
+from chatbot.phrase_translator import PhraseTranslator, tokenize
+from chatbot.utils import translation_dict
+
+
+def phrase_coverage(translate, texts, phrases):
+    """Share of the dictionary phrases placed in the texts that came out translated"""
+    placed = translated = 0
+    known = {tuple(tokenize(phrase)): translation for phrase, translation in phrases.items()}
+    for text in texts:
+        output = translate(text)
+        for phrase, translation in known.items():
+            if len(phrase) > 1 and ' '.join(phrase) in ' '.join(tokenize(text)) and translation:
+                placed += 1
+                translated += translation in output
+    return round(translated / placed, 4) if placed else None
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the offline dictionary translator (translate_text_fallback) '
+            'against the previous word-by-word lookup')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--texts', type=int, default=5000, help='Texts translated per language')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='translation_benchmark.json', help='Where to write the JSON results')
+
+    def handle(self, *args, **options):
+        results = []
+        for language, phrases in translation_dict['en'].items():
+            texts = translation_inputs(phrases, options['texts'], options['seed'])
+            translator = PhraseTranslator(phrases)
+
+            def legacy(text):
+                return word_by_word_translate(text, phrases)
+
+            results.append(run_benchmark(
+                'word_by_word', legacy, texts, language=language,
+                multi_word_coverage=phrase_coverage(legacy, texts[:500], phrases),
+            ))
+            results.append(run_benchmark(
+                'phrase_trie', translator.translate, texts, language=language,
+                phrases=translator.size,
+                multi_word_coverage=phrase_coverage(translator.translate, texts[:500], phrases),
+            ))
+
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'options': {key: options[key] for key in ['texts', 'seed']},
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+        for result in results:
+            self.stdout.write(
+                f"{result['language']} {result['benchmark']:<14} "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms mean={result['mean_ms']}ms "
+                f"multi-word phrases translated={result['multi_word_coverage']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Benchmark results written to {options['output']}"))
@@ -0,0 +1,26 @@
+# chatbot/management/commands/extract_document_passages.py
+from django.core.management.base import BaseCommand
+
+from chatbot.models import Document
+
+
+class Command(BaseCommand):
+    help = 'Extracts page/slide passages for documents uploaded before passages were stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-extract every document, not only those without passages')
+
+    def handle(self, *args, **options):
+        documents = Document.objects.all()
+        if not options['all']:
+            documents = documents.filter(passages__isnull=True)
+
+        count = 0
+        for document in documents.iterator():
+            if not document.file:
+                continue
+            document.save_passages(document.extract_passages_from_file())
+            count += 1
+            self.stdout.write(f"Extracted passages for: {document.title}")
+
+        self.stdout.write(self.style.SUCCESS(f'Passages extracted for {count} documents!'))
@@ -0,0 +1,38 @@
+# chatbot/management/commands/ingest_documents.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.ingest import ingest, read_manifest, throughput_summary
+
+
+class Command(BaseCommand):
+    help = ('Loads every document listed in a manifest from a directory or zip archive. '
+            'The manifest is a CSV or JSON file with the columns file, title, subject, '
+            'semester, unit, doc_type and description.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Directory or zip archive holding the files')
+        parser.add_argument('--manifest', help='Manifest file (defaults to manifest.csv/.json inside the source)')
+        parser.add_argument('--workers', type=int, help='Extraction processes (defaults to one per CPU)')
+        parser.add_argument('--user', help='Username recorded as the uploader')
+
+    def handle(self, *args, **options):
+        uploaded_by = None
+        if options['user']:
+            uploaded_by = User.objects.filter(username=options['user']).first()
+            if uploaded_by is None:
+                raise CommandError(f"No user named {options['user']}")
+
+        rows = None
+        if options['manifest']:
+            with open(options['manifest'], 'rb') as f:
+                rows = read_manifest(f, options['manifest'])
+
+        try:
+            summary = ingest(options['source'], rows, uploaded_by=uploaded_by, workers=options['workers'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for error in summary['errors']:
+            self.stdout.write(self.style.WARNING(error))
+        self.stdout.write(self.style.SUCCESS(f"Ingested {throughput_summary(summary)}"))
@@ -0,0 +1,16 @@
+# chatbot/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from chatbot import fts
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the SQLite FTS5 document search table from the Document table'
+
+    def handle(self, *args, **options):
+        if not fts.fts_available():
+            self.stdout.write(self.style.WARNING('FTS5 search is only available on SQLite; nothing to do.'))
+            return
+
+        fts.rebuild()
+        self.stdout.write(self.style.SUCCESS('Document search index rebuilt successfully!'))
@@ -0,0 +1,28 @@
+# chatbot/management/commands/rebuild_semantic_index.py
+from django.core.management.base import BaseCommand
+
+from chatbot.search_cache import get_corpus_version
+from chatbot.semantic_index import semantic_index
+
+
+class Command(BaseCommand):
+    help = ('Fits the latent semantic (LSA) document index and saves it for the web workers. '
+            'Run it again after many documents have been added.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--components', type=int,
+                            help='Latent dimensions (defaults to SEMANTIC_SEARCH_COMPONENTS)')
+
+    def handle(self, *args, **options):
+        if options['components']:
+            semantic_index.n_components = options['components']
+        semantic_index.ensure_version(get_corpus_version())
+        semantic_index.build(use_saved=False)
+
+        if not semantic_index.save():
+            self.stdout.write(self.style.WARNING('No searchable documents; nothing was saved.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Semantic index saved to {semantic_index.path} "
+            f"({semantic_index.nbytes() / (1024 * 1024):.1f} MB)"
+        ))
@@ -0,0 +1,48 @@
+# chatbot/management/commands/run_background_jobs.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatbot.jobs import claim_next_job, requeue_stale_jobs, run_job
+from chatbot.translation_cache import translation_cache
+
+# Seconds between purges of expired cached translations
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (text extraction, ...) until stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of waiting')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait between polls of an empty queue')
+        parser.add_argument('--kinds', nargs='+', help='Only run jobs of these kinds')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} jobs left running by a stopped worker'))
+
+        count = 0
+        last_purge = None
+        try:
+            while True:
+                if last_purge is None or time.monotonic() - last_purge > PURGE_INTERVAL:
+                    purged = translation_cache.purge_expired()
+                    if purged:
+                        self.stdout.write(f"Purged {purged} expired cached translations")
+                    last_purge = time.monotonic()
+                job = claim_next_job(options['kinds'])
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                start = time.perf_counter()
+                job = run_job(job)
+                count += 1
+                self.stdout.write(f"{job.kind} #{job.id}: {job.status} in {time.perf_counter() - start:.2f}s")
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {count} background jobs!'))
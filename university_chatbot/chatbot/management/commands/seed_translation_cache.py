@@ -0,0 +1,40 @@
+# chatbot/management/commands/seed_translation_cache.py
+from django.core.management.base import BaseCommand
+
+from chatbot.models import CachedTranslation
+from chatbot.translation_cache import source_hash
+from chatbot.utils import translation_dict
+
+
+class Command(BaseCommand):
+    help = ('Fills the translation cache with the hand-written phrases of translation_dict, '
+            'so those responses never reach the translation API')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replace', action='store_true',
+                            help='Overwrite translations already cached for the same phrases')
+
+    def handle(self, *args, **options):
+        rows = [
+            CachedTranslation(
+                source_hash=source_hash(text),
+                language=language,
+                source_text=text,
+                translated_text=translated,
+                origin=CachedTranslation.ORIGIN_DICTIONARY,
+            )
+            for language, phrases in translation_dict['en'].items()
+            for text, translated in phrases.items()
+        ]
+        before = CachedTranslation.objects.count()
+        if options['replace']:
+            CachedTranslation.objects.bulk_create(
+                rows, batch_size=500, update_conflicts=True,
+                unique_fields=['source_hash', 'language'],
+                update_fields=['translated_text', 'origin'],
+            )
+        else:
+            CachedTranslation.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+        added = CachedTranslation.objects.count() - before
+
+        self.stdout.write(self.style.SUCCESS(f'Translation cache seeded: {added} new of {len(rows)} phrases!'))
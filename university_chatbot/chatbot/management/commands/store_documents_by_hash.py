@@ -0,0 +1,37 @@
+# chatbot/management/commands/store_documents_by_hash.py
+from django.core.management.base import BaseCommand
+
+from chatbot.content_store import release_file, restore_file, store_file
+from chatbot.models import Document
+
+
+class Command(BaseCommand):
+    help = ('Moves files uploaded before content hashing into the content-addressed layout, '
+            'so identical files are stored once')
+
+    def handle(self, *args, **options):
+        moved = 0
+        missing = 0
+        for document in Document.objects.filter(content_hash='').iterator():
+            old_name = document.file.name
+            if not old_name or not document.file.storage.exists(old_name):
+                missing += 1
+                self.stdout.write(self.style.WARNING(f"File missing for: {document.title}"))
+                continue
+            with document.file.open('rb'):
+                new_name, digest = store_file(document.file.file, old_name, document.file.storage)
+                # update() keeps the search index signals out of a pure storage change
+                Document.objects.filter(id=document.id).update(
+                    file=new_name,
+                    content_hash=digest,
+                    original_filename=document.original_filename or document.filename(),
+                )
+                stored_name = restore_file(document.file.file, new_name, document.file.storage)
+                if stored_name != new_name:
+                    Document.objects.filter(id=document.id).update(file=stored_name)
+            if new_name != old_name:
+                release_file(old_name, document.file.storage)
+            moved += 1
+            self.stdout.write(f"Stored by hash: {document.title}")
+
+        self.stdout.write(self.style.SUCCESS(f'{moved} documents stored by hash ({missing} files missing)!'))
@@ -0,0 +1,98 @@
+# chatbot/management/commands/train_intent_classifier.py
+import json
+import platform
+from collections import Counter
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from sklearn.model_selection import StratifiedKFold
+
+from chatbot.benchmarks import regex_intent, run_benchmark
+from chatbot.intent import SAMPLES_PATH, IntentClassifier, classify_intent, intent_classifier, load_samples
+
+
+def accuracy(predictions, texts, intents):
+    """Overall and per-intent share of samples classified correctly, plus the mistakes"""
+    correct = Counter()
+    total = Counter()
+    mistakes = []
+    for text, expected, predicted in zip(texts, intents, predictions):
+        total[expected] += 1
+        if predicted == expected:
+            correct[expected] += 1
+        else:
+            mistakes.append({'text': text, 'expected': expected, 'predicted': predicted})
+    return {
+        'accuracy': round(sum(correct.values()) / len(texts), 4),
+        'per_intent': {intent: round(correct[intent] / total[intent], 4) for intent in sorted(total)},
+        'mistakes': mistakes,
+    }
+
+
+def cross_validated(texts, intents, folds):
+    """Predictions for every sample from a model that was not trained on it"""
+    predictions = [None] * len(texts)
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=0)
+    for train, test in splitter.split(texts, intents):
+        classifier = IntentClassifier()
+        classifier.train([texts[i] for i in train], [intents[i] for i in train])
+        for i in test:
+            predictions[i] = classifier.classify(texts[i]).intent
+    return predictions
+
+
+class Command(BaseCommand):
+    help = ('Trains the intent classifier on chatbot/data/intent_samples.json, saves it to '
+            'INTENT_MODEL_PATH and reports its accuracy and latency against the regex scan')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', default=SAMPLES_PATH, help='JSON list of {"text", "intent"} samples')
+        parser.add_argument('--folds', type=int, default=5, help='Cross-validation folds for the accuracy report')
+        parser.add_argument('--repeat', type=int, default=20, help='Times the samples are run for timing')
+        parser.add_argument('--output', default='intent_benchmark.json', help='Where to write the JSON results')
+        parser.add_argument('--no-save', action='store_true', help='Report only; do not save the model')
+
+    def handle(self, *args, **options):
+        texts, intents = load_samples(options['samples'])
+        timing_inputs = texts * options['repeat']
+
+        # Held-out accuracy, so the model is not graded on what it memorised
+        classifier_accuracy = accuracy(cross_validated(texts, intents, options['folds']), texts, intents)
+        regex_accuracy = accuracy([regex_intent(text) for text in texts], texts, intents)
+
+        model = intent_classifier.train(texts, intents)
+        results = [
+            dict(run_benchmark('regex_scan', regex_intent, timing_inputs, samples=len(texts)), **regex_accuracy),
+            dict(run_benchmark('char_ngram_classifier', intent_classifier.classify, timing_inputs,
+                               samples=len(texts), folds=options['folds']), **classifier_accuracy),
+            # Repeated messages ('hi', 'attendance') are answered from memory
+            dict(run_benchmark('char_ngram_classifier_cached', classify_intent, timing_inputs,
+                               samples=len(texts), folds=options['folds']), **classifier_accuracy),
+        ]
+
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'options': {key: options[key] for key in ['samples', 'folds', 'repeat']},
+            'intents': dict(Counter(intents)),
+            'features': len(model['vectorizer'].vocabulary_),
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        for result in results:
+            self.stdout.write(
+                f"{result['benchmark']:<30} accuracy={result['accuracy']} "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms"
+            )
+        self.stdout.write(f"Benchmark results written to {options['output']}")
+
+        if options['no_save']:
+            return
+        intent_classifier.save()
+        self.stdout.write(self.style.SUCCESS(
+            f"Intent model ({len(model['intents'])} intents, {len(texts)} samples) "
+            f"saved to {intent_classifier.path}"
+        ))
@@ -0,0 +1,37 @@
+# chatbot/management/commands/translate_content.py
+from django.core.management.base import BaseCommand
+
+from chatbot.content_translation import queue_translation, translate_objects
+from chatbot.models import Document, FAQ
+
+MODELS = {'faq': FAQ, 'document': Document}
+
+
+class Command(BaseCommand):
+    help = ('Fills in the Hindi/Gujarati translations of existing FAQs and documents, '
+            'so chat responses do not translate them at request time')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), action='append',
+                            help='Only translate this model (repeatable; default: all)')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Translate again fields that already have a translation')
+        parser.add_argument('--queue', action='store_true',
+                            help='Queue translate_content jobs for the worker instead of translating now')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Objects per queued job')
+
+    def handle(self, *args, **options):
+        for name in options['model'] or sorted(MODELS):
+            model = MODELS[name]
+            if options['queue']:
+                ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+                batch_size = options['batch_size']
+                for start in range(0, len(ids), batch_size):
+                    queue_translation(model, ids[start:start + batch_size], options['overwrite'])
+                self.stdout.write(f"{name}: queued {len(ids)} objects")
+            else:
+                translated = translate_objects(model, overwrite=options['overwrite'])
+                self.stdout.write(f"{name}: translated {translated} fields")
+
+        self.stdout.write(self.style.SUCCESS('Content translation finished!'))
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_document_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS chatbot_document_fts USING fts5("
+        "title, subject, description, extracted_text, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO chatbot_document_fts (rowid, title, subject, description, extracted_text) "
+        "SELECT id, title, subject, description, extracted_text FROM chatbot_document"
+    )
+
+
+def drop_document_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS chatbot_document_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0005_document_extracted_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_document_fts, drop_document_fts),
+    ]
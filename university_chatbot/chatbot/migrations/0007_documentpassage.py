@@ -0,0 +1,43 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_passage_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS chatbot_documentpassage_fts USING fts5("
+        "text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+
+def drop_passage_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS chatbot_documentpassage_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0006_document_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPassage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='passages', to='chatbot.document')),
+            ],
+            options={
+                'ordering': ['document', 'number'],
+                'unique_together': {('document', 'number')},
+            },
+        ),
+        migrations.RunPython(create_passage_fts, drop_passage_fts),
+    ]
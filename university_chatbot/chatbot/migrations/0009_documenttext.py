@@ -0,0 +1,50 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:21
+
+import django.db.models.deletion
+import zlib
+
+from django.db import migrations, models
+
+
+def copy_text_out(apps, schema_editor):
+    Document = apps.get_model('chatbot', 'Document')
+    DocumentText = apps.get_model('chatbot', 'DocumentText')
+    batch = []
+    for doc_id, text in Document.objects.values_list('id', 'extracted_text').iterator():
+        text = text or ""
+        batch.append(DocumentText(document_id=doc_id, data=zlib.compress(text.encode('utf-8')), size=len(text)))
+        if len(batch) == 500:
+            DocumentText.objects.bulk_create(batch)
+            batch = []
+    DocumentText.objects.bulk_create(batch)
+
+
+def copy_text_back(apps, schema_editor):
+    Document = apps.get_model('chatbot', 'Document')
+    DocumentText = apps.get_model('chatbot', 'DocumentText')
+    for row in DocumentText.objects.iterator():
+        text = zlib.decompress(row.data).decode('utf-8') if row.data else ""
+        Document.objects.filter(id=row.document_id).update(extracted_text=text)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0008_corpusversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text_content', serialize=False, to='chatbot.document')),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(copy_text_out, copy_text_back),
+        migrations.RemoveField(
+            model_name='document',
+            name='extracted_text',
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0012_cachedtranslation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorpusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('version', models.PositiveBigIntegerField()),
+                ('document_id', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'version'], name='chatbot_cor_name_f9eefd_idx')],
+            },
+        ),
+    ]
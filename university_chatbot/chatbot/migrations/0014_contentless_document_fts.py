@@ -0,0 +1,60 @@
+import zlib
+
+from django.conf import settings
+from django.db import migrations
+
+FTS_TABLE = 'chatbot_document_fts'
+
+
+def _document_rows(apps):
+    """(id, title, subject, description, text) in the source language, text decompressed"""
+    Document = apps.get_model('chatbot', 'Document')
+    DocumentText = apps.get_model('chatbot', 'DocumentText')
+    language = getattr(settings, 'MODELTRANSLATION_DEFAULT_LANGUAGE', 'en')
+    texts = dict(DocumentText.objects.values_list('document_id', 'data').iterator())
+    for doc in Document.objects.iterator():
+        data = texts.get(doc.id)
+        yield [
+            doc.id,
+            getattr(doc, f'title_{language}', None) or '',
+            doc.subject or '',
+            getattr(doc, f'description_{language}', None) or '',
+            zlib.decompress(data).decode('utf-8') if data else '',
+        ]
+
+
+def _create_fts(apps, schema_editor, options):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"title, subject, description, extracted_text, {options}"
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, subject, description, extracted_text) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            list(_document_rows(apps)),
+        )
+
+
+def make_contentless(apps, schema_editor):
+    # Index only; the text itself stays compressed in DocumentText
+    _create_fts(apps, schema_editor, "content = '', ")
+
+
+def make_content(apps, schema_editor):
+    _create_fts(apps, schema_editor, "")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0013_corpuschange'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_contentless, make_content),
+    ]
@@ -1,11 +1,20 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from django.dispatch import Signal
 from django.utils.translation import gettext_lazy as _
 import os
-import PyPDF2
-from pptx import Presentation
+import zlib
 import io
 
+from .content_store import read_passages_cached, release_file, restore_file, store_file
+from .extraction import ExtractionLimits, iter_pdf_pages, iter_ppt_slides, join_passages, read_passages
+
+# Sent after a document's pages/slides have been replaced, with the ids of
+# the passages that were removed and the list of new passages
+passages_saved = Signal()
+
 class Document(models.Model):
     SEMESTER_CHOICES = [
         (1, '1st Semester'),
@@ -27,6 +36,17 @@ class Document(models.Model):
         ('question_paper', 'Question Paper'),
     ]
     
+    EXTRACTION_PENDING = 'pending'
+    EXTRACTION_RUNNING = 'running'
+    EXTRACTION_DONE = 'done'
+    EXTRACTION_FAILED = 'failed'
+    EXTRACTION_STATUS_CHOICES = [
+        (EXTRACTION_PENDING, 'Pending'),
+        (EXTRACTION_RUNNING, 'Running'),
+        (EXTRACTION_DONE, 'Done'),
+        (EXTRACTION_FAILED, 'Failed'),
+    ]
+    
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     file = models.FileField(upload_to='documents/%Y/%m/%d/')
@@ -37,72 +57,295 @@ class Document(models.Model):
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
-    extracted_text = models.TextField(blank=True)
+    extraction_status = models.CharField(max_length=10, choices=EXTRACTION_STATUS_CHOICES, default=EXTRACTION_PENDING)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    original_filename = models.CharField(max_length=255, blank=True)
     
     def __str__(self):
         return self.title
     
+    @property
+    def extracted_text(self):
+        """
+        Text extracted from the file. It lives compressed in DocumentText
+        and is only loaded (and decompressed) when first accessed.
+        """
+        if not hasattr(self, '_extracted_text'):
+            try:
+                self._extracted_text = self.text_content.text if self.pk else ""
+            except DocumentText.DoesNotExist:
+                self._extracted_text = ""
+        return self._extracted_text
+    
+    @extracted_text.setter
+    def extracted_text(self, value):
+        self._extracted_text = value
+        self._extracted_text_changed = True
+    
+    def has_extracted_text(self):
+        """Check for stored text without loading it"""
+        if hasattr(self, '_extracted_text'):
+            return bool(self._extracted_text)
+        return bool(self.pk) and DocumentText.objects.filter(document_id=self.pk, size__gt=0).exists()
+    
     def filename(self):
-        return os.path.basename(self.file.name)
+        return self.original_filename or os.path.basename(self.file.name)
     
     def extension(self):
         name, extension = os.path.splitext(self.file.name)
         return extension.lower()
     
+    def is_text_ready(self):
+        """False while the file's text is still waiting to be extracted"""
+        return self.extraction_status not in [self.EXTRACTION_PENDING, self.EXTRACTION_RUNNING]
+    
     def save(self, *args, **kwargs):
-        # Extract text when saving
-        if self.file and not self.extracted_text:
-            self.extracted_text = self.extract_text_from_file()
+        # Store a newly uploaded file under its content hash, once
+        upload = None
+        if self.file and not self.file._committed:
+            upload = self.file.file
+            self.original_filename = os.path.basename(self.file.name)
+            self.file, self.content_hash = store_file(upload, self.file.name, self.file.storage)
+        
+        # Extract text when saving, or queue it for the background worker
+        passages = None
+        queue_extraction = False
+        if self.extraction_status == self.EXTRACTION_PENDING:
+            if not self.file or self.has_extracted_text():
+                self.extraction_status = self.EXTRACTION_DONE
+            elif getattr(settings, 'EXTRACT_TEXT_IN_BACKGROUND', True):
+                queue_extraction = True
+            else:
+                passages = self.extract_passages_from_file()
+                self.set_text_from_passages(passages)
+                self.extraction_status = self.EXTRACTION_DONE
         super().save(*args, **kwargs)
+        if upload is not None:
+            # The reused file may have been released by a concurrent delete
+            name = restore_file(upload, self.file.name, self.file.storage)
+            if name != self.file.name:
+                self.file.name = name
+                Document.objects.filter(pk=self.pk).update(file=name)
+        if getattr(self, '_extracted_text_changed', False):
+            DocumentText.objects.update_or_create(
+                document=self,
+                defaults=DocumentText.compressed_fields(self._extracted_text),
+            )
+            self._extracted_text_changed = False
+        if passages is not None:
+            self.save_passages(passages)
+        if queue_extraction:
+            from .jobs import enqueue_job
+            enqueue_job('extract_document', document_id=self.pk)
+    
+    def save_passages(self, passages):
+        """
+        Replace the stored pages/slides with (number, text) pairs
+        """
+        old_ids = list(self.passages.values_list('id', flat=True))
+        self.passages.all().delete()
+        new_passages = DocumentPassage.objects.bulk_create([
+            DocumentPassage(document=self, number=number, text=text)
+            for number, text in passages
+            if text.strip()
+        ])
+        passages_saved.send(sender=Document, document=self, old_ids=old_ids, passages=new_passages)
+    
+    def set_text_from_passages(self, passages):
+        """Store the joined pages/slides as the searchable text, within the byte cap"""
+        self.extracted_text = join_passages(passages, ExtractionLimits.from_settings().max_stored_bytes)
     
     def extract_text_from_file(self):
         """
         Extract text content from uploaded files
         """
+        return join_passages(self.extract_passages_from_file())
+    
+    def extract_passages_from_file(self):
+        """
+        Extract (page or slide number, text) pairs from uploaded files
+        """
         try:
-            file_extension = os.path.splitext(self.file.name)[1].lower()
-            
-            if file_extension == '.pdf':
-                return self.extract_text_from_pdf()
-            elif file_extension in ['.ppt', '.pptx']:
-                return self.extract_text_from_ppt()
-            else:
-                return ""
-                
+            return self.read_passages_from_file()
         except Exception as e:
             print(f"Error extracting text: {e}")
-            return ""
+            return []
+    
+    def read_passages_from_file(self):
+        """
+        Like extract_passages_from_file(), but errors reading the file are
+        raised so the caller can tell a failed extraction from an empty one
+        """
+        return read_passages_cached(self.file.path, self.content_hash)
     
     def extract_text_from_pdf(self):
         """Extract text from PDF files"""
-        text = ""
         try:
-            # Save file to temporary location for reading
-            with open(self.file.path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+            return join_passages(self.extract_pages_from_pdf())
         except Exception as e:
             print(f"Error reading PDF: {e}")
-        return text
+            return ""
+    
+    def extract_pages_from_pdf(self):
+        """Extract the text of each PDF page"""
+        return read_passages(self.file.path, ExtractionLimits.from_settings(), iter_pdf_pages)
     
     def extract_text_from_ppt(self):
         """Extract text from PowerPoint files"""
-        text = ""
         try:
-            presentation = Presentation(self.file.path)
-            for slide in presentation.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
+            return join_passages(self.extract_slides_from_ppt())
         except Exception as e:
             print(f"Error reading PPT: {e}")
-        return text
+            return ""
+    
+    def extract_slides_from_ppt(self):
+        """Extract the text of each PowerPoint slide"""
+        return read_passages(self.file.path, ExtractionLimits.from_settings(), iter_ppt_slides)
     
     def delete(self, *args, **kwargs):
-        # Delete the file from storage when the document is deleted
-        self.file.delete()
-        super().delete(*args, **kwargs)
+        # Delete the file from storage when no other document shares it
+        name = self.file.name
+        result = super().delete(*args, **kwargs)
+        release_file(name, self.file.storage)
+        return result
+
+class DocumentText(models.Model):
+    """
+    zlib-compressed extracted text of a document, kept out of the Document
+    row so listing and filtering documents does not read it
+    """
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, primary_key=True, related_name='text_content')
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Text of {self.document_id} ({self.size} characters)"
+    
+    @property
+    def text(self):
+        return zlib.decompress(self.data).decode('utf-8') if self.data else ""
+    
+    @staticmethod
+    def compressed_fields(text):
+        """Field values storing the given text"""
+        return {'data': zlib.compress(text.encode('utf-8')), 'size': len(text)}
+    
+    @classmethod
+    def bulk_save(cls, documents):
+        """Store the extracted_text of documents created with bulk_create"""
+        cls.objects.bulk_create([
+            cls(document=document, **cls.compressed_fields(document.extracted_text))
+            for document in documents
+        ])
+
+class ExtractionCache(models.Model):
+    """
+    Pages/slides extracted from a file's content, as zlib-compressed JSON,
+    so identical uploads and re-indexing are not parsed again
+    """
+    content_hash = models.CharField(max_length=64)
+    extractor = models.CharField(max_length=50)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('content_hash', 'extractor')
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.extractor})"
+
+class CachedTranslation(models.Model):
+    """A translated string, looked up by the hash of its source text"""
+    ORIGIN_API = 'api'
+    ORIGIN_DICTIONARY = 'dictionary'
+    ORIGIN_CHOICES = [
+        (ORIGIN_API, 'Translation API'),
+        (ORIGIN_DICTIONARY, 'Translation dictionary'),
+    ]
+
+    source_hash = models.CharField(max_length=64)
+    language = models.CharField(max_length=10)
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    origin = models.CharField(max_length=20, choices=ORIGIN_CHOICES, default=ORIGIN_API)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('source_hash', 'language')
+
+    def __str__(self):
+        return f"{self.source_text[:40]} ({self.language})"
+
+class DocumentPassage(models.Model):
+    """A single PDF page or PowerPoint slide of a document"""
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='passages')
+    number = models.PositiveIntegerField()
+    text = models.TextField()
+    
+    class Meta:
+        ordering = ['document', 'number']
+        unique_together = ('document', 'number')
+    
+    def __str__(self):
+        return f"{self.document} - {self.label()}"
+    
+    def label(self):
+        """Human readable location, e.g. 'page 14' or 'slide 3'"""
+        kind = 'slide' if self.document.extension() in ['.ppt', '.pptx'] else 'page'
+        return f"{kind} {self.number}"
+
+class CorpusVersion(models.Model):
+    """Counter bumped whenever a searchable corpus (e.g. documents) changes"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+class CorpusChange(models.Model):
+    """
+    The document a corpus version bump was for, so other worker processes
+    can apply just that change to their in-process indexes
+    """
+    name = models.CharField(max_length=50)
+    version = models.PositiveBigIntegerField()
+    document_id = models.BigIntegerField()
+    
+    class Meta:
+        indexes = [models.Index(fields=['name', 'version'])]
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}: document {self.document_id}"
+
+class BackgroundJob(models.Model):
+    """A unit of work queued for the run_background_jobs worker"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
 
 class FAQ(models.Model):
     question = models.CharField(max_length=300)
@@ -0,0 +1,96 @@
+# chatbot/phrase_translator.py
+
+# Offline phrase-by-phrase translation from a phrase dictionary
+import re
+
+# Template placeholders ('{0}'), words (with inner apostrophes, e.g.
+# "don't") and single punctuation marks
+TOKEN_RE = re.compile(r"\{\d+\}|\w+(?:'\w+)*|[^\w\s]", re.UNICODE)
+WORD_RE = re.compile(r'\w', re.UNICODE)
+
+# Marks the end of a phrase in the trie
+_END = object()
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text)]
+
+
+class PhraseTranslator:
+    """
+    Replaces the longest dictionary phrases found in a text, left to right.
+
+    The phrases are compiled into a trie over lower-cased tokens, so a text
+    is translated in one scan: from each position the trie is walked only
+    as far as the text still matches some phrase, and the longest match is
+    replaced. Matching whole tokens means 'in' never matches inside
+    'information', and multi-word phrases such as 'thank you' win over
+    their single words. Spacing, punctuation and line breaks are kept.
+
+    A text is only translated when its phrases cover every word: swapped
+    into an English sentence they leave it half translated ('में आपकी
+    उपस्थिति DAA is 80%.'), so such a text is returned unchanged. For the
+    same reason single-word entries ('for', 'with', 'search') are only used
+    when they are the whole text, give or take punctuation. Template
+    placeholders such as '{0}' are values, not words, and need no phrase.
+    """
+
+    def __init__(self, phrases):
+        self.root = {}
+        self.words = {}
+        self.size = 0
+        for phrase, translation in phrases.items():
+            tokens = tokenize(phrase)
+            if not tokens:
+                continue
+            if len(tokens) == 1:
+                # Words differing only in case share an entry; the first one wins
+                if tokens[0] not in self.words:
+                    self.words[tokens[0]] = translation
+                    self.size += 1
+                continue
+            node = self.root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            if _END not in node:
+                node[_END] = translation
+                self.size += 1
+
+    def translate(self, text):
+        matches = list(TOKEN_RE.finditer(text))
+        tokens = [match.group().lower() for match in matches]
+        words = [i for i, match in enumerate(matches) if WORD_RE.match(match.group())]
+        if len(words) == 1 and tokens[words[0]] in self.words:
+            match = matches[words[0]]
+            return text[:match.start()] + self.words[tokens[words[0]]] + text[match.end():]
+        parts = []
+        position = 0   # end of the text already copied to parts
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            longest = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _END in node:
+                    longest = (j, node[_END])
+            if longest is None:
+                if WORD_RE.match(tokens[i]):
+                    # A word no phrase covers: keep the text in English
+                    return text
+                i += 1
+                continue
+            end, translation = longest
+            start = matches[i].start()
+            stop = matches[end - 1].end()
+            parts.append(text[position:start])
+            parts.append(translation)
+            position = stop
+            if not translation:
+                # Don't leave a double space where a word was dropped
+                while position < len(text) and text[position] == ' ' and (not parts[-2] or parts[-2].endswith(' ')):
+                    position += 1
+            i = end
+        parts.append(text[position:])
+        return ''.join(parts)
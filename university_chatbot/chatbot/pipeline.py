@@ -0,0 +1,157 @@
+# chatbot/pipeline.py
+
+# Chat message processing as a pipeline of timed stages: detect the
+# language, normalize the query, classify it, resolve the student, run the
+# intent's handler, translate the response and render it
+import time
+from collections import namedtuple
+
+from .entities import extract_entities
+from .intent import FALLBACK_INTENT, classify_intent
+from .language import detect_language
+from .models import Student
+from .query_normalizer import normalize_query
+from .responses import ChatResponse
+from .utils import TranslationUnavailable, machine_translate
+
+# Handlers by intent, registered with @intent_handler
+HANDLERS = {}
+
+Handler = namedtuple('Handler', ['function', 'needs_student'])
+
+
+def intent_handler(intent, needs_student=False):
+    """
+    Register a function as the handler of an intent. It is called with the
+    ChatContext and sets context.response (and context.response_type).
+    Handlers that need the student's profile are only called when the
+    user has one.
+    """
+    def register(function):
+        HANDLERS[intent] = Handler(function, needs_student)
+        return function
+    return register
+
+
+class ChatContext:
+    """State of one chat message as it goes through the stages"""
+
+    def __init__(self, request, message):
+        self.request = request
+        self.message = message
+        self.language = 'en'
+        self.search_query = message.lower()
+        self.intent = None
+        self.confidence = None
+        self.entities = None
+        self.student = None
+        self.response = ChatResponse("I'm sorry, I didn't understand that. Could you rephrase?")
+        self.response_type = 'text'
+        self.rendered = ''
+        self.timings = []     # (stage, milliseconds)
+
+    def handler(self):
+        return HANDLERS.get(self.intent) or HANDLERS.get(FALLBACK_INTENT)
+
+    def server_timing(self):
+        """Value of the Server-Timing header: one metric per stage, and the total"""
+        metrics = [f"{stage};dur={ms:.2f}" for stage, ms in self.timings]
+        metrics.append(f"total;dur={sum(ms for stage, ms in self.timings):.2f}")
+        return ', '.join(metrics)
+
+    def debug_info(self):
+        """What each stage decided, for the debug JSON"""
+        entities = self.entities._asdict() if self.entities else {}
+        entities.pop('text', None)
+        entities['words'] = sorted(entities.get('words', ()))
+        entities['cues'] = sorted(entities.get('cues', ()))
+        return {
+            'language': self.language,
+            'search_query': self.search_query,
+            'intent': self.intent,
+            'confidence': round(self.confidence, 4) if self.confidence is not None else None,
+            'entities': entities,
+            'student': self.student.id if self.student else None,
+            'timings_ms': {stage: round(ms, 3) for stage, ms in self.timings},
+        }
+
+
+def detect(context):
+    context.language = detect_language(context.message)
+
+
+def normalize(context):
+    """
+    Map Hindi/Gujarati queries to English search terms offline; only
+    native-script words outside the vocabulary need the translation API
+    """
+    if context.language == 'en':
+        return
+    search_query, unknown_words = normalize_query(context.message, context.language)
+    if unknown_words:
+        try:
+            search_query = machine_translate(context.message, 'en', store=False).lower()
+        except TranslationUnavailable:
+            pass
+        except Exception as e:
+            print(f"Query translation error: {e}")
+    context.search_query = search_query
+
+
+def classify(context):
+    """Intent of the message, and the entities shared by the handlers"""
+    intent = classify_intent(context.message)
+    if context.language != 'en':
+        # The English terms may be recognised with more confidence
+        english_intent = classify_intent(context.search_query)
+        if english_intent.confidence > intent.confidence:
+            intent = english_intent
+    context.intent, context.confidence = intent
+    context.entities = extract_entities(context.search_query)
+
+
+def resolve_student(context):
+    """Look up the student's profile, for the handlers that need it"""
+    handler = context.handler()
+    if handler and handler.needs_student:
+        context.student = Student.objects.filter(user=context.request.user).first()
+
+
+def handle(context):
+    handler = context.handler()
+    if handler is None:
+        return
+    if handler.needs_student and context.student is None:
+        context.response = ChatResponse("I couldn't find your student profile. Please contact administration.")
+        return
+    handler.function(context)
+
+
+def translate(context):
+    """Translate the fixed phrases of the response if needed"""
+    context.response = context.response.translate(context.language)
+
+
+def render(context):
+    context.rendered = context.response.render()
+
+
+STAGES = [
+    ('detect', detect),
+    ('normalize', normalize),
+    ('classify', classify),
+    ('resolve_student', resolve_student),
+    ('handle', handle),
+    ('translate', translate),
+    ('render', render),
+]
+
+
+def run_pipeline(request, message):
+    """Run every stage on a message and return the ChatContext, with its timings"""
+    context = ChatContext(request, message)
+    for name, stage in STAGES:
+        start = time.perf_counter()
+        stage(context)
+        context.timings.append((name, (time.perf_counter() - start) * 1000))
+    return context
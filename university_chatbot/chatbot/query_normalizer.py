@@ -0,0 +1,139 @@
+# chatbot/query_normalizer.py
+
+# Offline normalization of Hindi and Gujarati chat queries, romanized or in
+# native script, into the English terms the search indexes are built on
+import re
+
+from .language import ROMANIZED_GUJARATI, ROMANIZED_HINDI
+
+# Romanized vocabulary (formerly views.translate_to_english)
+HINDI_TERMS = {
+    'chahiye': 'need', 'mujhe': 'i', 'kitne': 'how many', 'dhanyavad': 'thanks', 'namaste': 'hello',
+    'myjhe': 'i', 'chaihye': 'need', 'chaiye': 'need',
+    'pustak': 'book', 'kaksha': 'class', 'path': 'chapter', 'prashn': 'question',
+    'haziri': 'attendance', 'upasthiti': 'attendance', 'samay': 'time', 'aaj': 'today',
+    'abhi': 'now', 'pariksha': 'exam', 'shikshak': 'faculty', 'bhejo': 'send', 'dikhao': 'show',
+}
+GUJARATI_TERMS = {
+    'joiye': 'need', 'mane': 'i', 'ketla': 'how many', 'jaroor': 'need', 'aabhar': 'thanks',
+    'pustak': 'book', 'kaksha': 'class', 'prakaran': 'chapter', 'prashna': 'question',
+    'hajri': 'attendance', 'aaje': 'today', 'atyare': 'now', 'pariksha': 'exam',
+    'mokalo': 'send', 'batavo': 'show',
+}
+
+# Native-script vocabulary for the same terms
+NATIVE_TERMS = {
+    # Hindi
+    'मुझे': 'i', 'चाहिए': 'need', 'नोट्स': 'notes', 'यूनिट': 'unit', 'इकाई': 'unit',
+    'अध्याय': 'chapter', 'पाठ': 'chapter', 'पीपीटी': 'ppt', 'सिलेबस': 'syllabus',
+    'पाठ्यक्रम': 'syllabus', 'असाइनमेंट': 'assignment', 'किताब': 'book', 'पुस्तक': 'book',
+    'उपस्थिति': 'attendance', 'हाजिरी': 'attendance', 'टाइमटेबल': 'timetable',
+    'परीक्षा': 'exam', 'शिक्षक': 'faculty', 'फैकल्टी': 'faculty', 'लेक्चर': 'lecture',
+    'व्याख्यान': 'lecture', 'कक्षा': 'class', 'आज': 'today', 'अभी': 'now', 'भेजो': 'send',
+    'दिखाओ': 'show', 'प्रश्न': 'question', 'पत्र': 'paper', 'छात्रवृत्ति': 'scholarship',
+    'हॉस्टल': 'hostel', 'छात्रावास': 'hostel', 'फीस': 'fees', 'शुल्क': 'fees',
+    'छुट्टी': 'vacation', 'छुट्टियां': 'vacation', 'दिवाली': 'diwali', 'ईमेल': 'email',
+    'फॉर्म': 'form', 'कितने': 'how many', 'धन्यवाद': 'thanks', 'नमस्ते': 'hello',
+    # Gujarati
+    'મને': 'i', 'જોઈએ': 'need', 'નોટ્સ': 'notes', 'યુનિટ': 'unit', 'એકમ': 'unit',
+    'પ્રકરણ': 'chapter', 'પીપીટી': 'ppt', 'સિલેબસ': 'syllabus', 'અભ્યાસક્રમ': 'syllabus',
+    'અસાઇનમેન્ટ': 'assignment', 'પુસ્તક': 'book', 'હાજરી': 'attendance',
+    'ટાઇમટેબલ': 'timetable', 'પરીક્ષા': 'exam', 'શિક્ષક': 'faculty', 'ફેકલ્ટી': 'faculty',
+    'લેક્ચર': 'lecture', 'વર્ગ': 'class', 'આજે': 'today', 'અત્યારે': 'now', 'મોકલો': 'send',
+    'બતાવો': 'show', 'પ્રશ્ન': 'question', 'શિષ્યવૃત્તિ': 'scholarship', 'હોસ્ટેલ': 'hostel',
+    'છાત્રાલય': 'hostel', 'ફી': 'fees', 'વેકેશન': 'vacation', 'દિવાળી': 'diwali',
+    'ઇમેઇલ': 'email', 'ફોર્મ': 'form', 'કેટલા': 'how many', 'આભાર': 'thanks', 'આજ': 'today',
+}
+
+# Gujarati postpositions written onto the word before them ('હોસ્ટેલની')
+GUJARATI_SUFFIXES = ('માં', 'નું', 'ની', 'નો', 'ના', 'ને')
+
+# Native-script words that carry no search meaning
+NATIVE_FILLERS = frozenset([
+    'के', 'का', 'की', 'को', 'में', 'है', 'हैं', 'क्या', 'कब', 'कैसे', 'कितनी', 'कितना',
+    'मेरी', 'मेरा', 'मेरे', 'कौन', 'सा', 'से', 'लिए', 'दो', 'दीजिए', 'करें', 'और', 'भी', 'कृपया',
+    'છે', 'ની', 'નો', 'નું', 'ના', 'માં', 'મારી', 'મારું', 'મારા', 'શું', 'કેટલી', 'ક્યારે',
+    'કયું', 'માટે', 'કેવી', 'રીતે', 'અને', 'પણ', 'આપો', 'કૃપા', 'કરીને',
+])
+
+# Subject abbreviations spelled out in native script
+SUBJECT_ALIASES = {
+    'डीएए': 'daa', 'एसई': 'se', 'डीवीडी': 'dvd', 'ईपी': 'ep', 'टीओसी': 'toc',
+    'एडब्ल्यूएस': 'aws', 'पीसीई': 'pce',
+    'ડીએએ': 'daa', 'એસઈ': 'se', 'ડીવીડી': 'dvd', 'ઈપી': 'ep', 'ટીઓસી': 'toc',
+    'એડબલ્યુએસ': 'aws', 'પીસીઈ': 'pce',
+}
+
+# Number words, read as numbers only after 'unit' or 'chapter' ('do' is
+# also 'give' in Hindi)
+NUMBER_WORDS = {
+    'ek': '1', 'do': '2', 'teen': '3', 'char': '4', 'panch': '5', 'che': '6', 'chhe': '6',
+    'saat': '7', 'aath': '8', 'nau': '9', 'das': '10', 'be': '2', 'tran': '3', 'cha': '6',
+    'sat': '7', 'nav': '9',
+    'एक': '1', 'दो': '2', 'तीन': '3', 'चार': '4', 'पांच': '5', 'पाँच': '5', 'छह': '6',
+    'सात': '7', 'आठ': '8', 'नौ': '9', 'दस': '10',
+    'એક': '1', 'બે': '2', 'ત્રણ': '3', 'ચાર': '4', 'પાંચ': '5', 'છ': '6', 'સાત': '7',
+    'આઠ': '8', 'નવ': '9', 'દસ': '10',
+}
+NUMBERED_TERMS = {'unit', 'chapter'}
+
+# Devanagari and Gujarati digits to ASCII
+DIGITS = str.maketrans('०१२३४५६७८९૦૧૨૩૪૫૬૭૮૯', '01234567890123456789')
+
+# Words and '%'. Devanagari and Gujarati vowel signs and viramas are not
+# \w, so the two blocks are listed explicitly (except the dandas)
+TOKEN_RE = re.compile(r'(?:\w|[\u0900-\u0963\u0966-\u097F\u0A80-\u0AFF])+|%', re.UNICODE)
+UNIT_NUMBER_RE = re.compile(r'^(unit|chapter)(\d+)$')
+
+
+def _is_latin(word):
+    return word.isascii()
+
+
+def _native_term(token):
+    """English term for a native-script word, also with a Gujarati suffix attached"""
+    if token in NATIVE_TERMS:
+        return NATIVE_TERMS[token]
+    if token in SUBJECT_ALIASES:
+        return SUBJECT_ALIASES[token]
+    for suffix in GUJARATI_SUFFIXES:
+        if token.endswith(suffix):
+            stem = token[:-len(suffix)]
+            return NATIVE_TERMS.get(stem) or SUBJECT_ALIASES.get(stem)
+    return None
+
+
+def normalize_query(text, language):
+    """
+    English search terms for a Hindi ('hi') or Gujarati ('gu') query, and
+    the number of native-script words that could not be mapped.
+
+    Known words are mapped to English, number words after 'unit' or
+    'chapter' and native digits become numbers, 'unit2' becomes 'unit 2',
+    and Hindi/Gujarati filler words are dropped. Unknown Latin words (names,
+    subject terms, English) are kept as they are.
+    """
+    romanized = GUJARATI_TERMS if language == 'gu' else HINDI_TERMS
+    fillers = ROMANIZED_GUJARATI if language == 'gu' else ROMANIZED_HINDI
+    terms = []
+    unknown = 0
+    for token in TOKEN_RE.findall(text.translate(DIGITS).lower()):
+        if terms and terms[-1] in NUMBERED_TERMS and token in NUMBER_WORDS:
+            terms.append(NUMBER_WORDS[token])
+            continue
+        match = UNIT_NUMBER_RE.match(token)
+        if match:
+            terms.extend(match.groups())
+        elif token in romanized:
+            terms.append(romanized[token])
+        elif token in fillers or token in NATIVE_FILLERS or token in NUMBER_WORDS:
+            continue
+        elif _is_latin(token):
+            terms.append(token)
+        else:
+            term = _native_term(token)
+            if term:
+                terms.append(term)
+            else:
+                unknown += 1
+    return ' '.join(terms), unknown
@@ -0,0 +1,126 @@
+# chatbot/responses.py
+
+# Chat responses built from segments, so that only their fixed phrases are
+# translated. Dynamic values (names, numbers, emails, links) are kept out
+# of the text sent for translation: they would be mangled, and they would
+# make every response a different string that no cache can reuse.
+import re
+from string import Formatter
+
+from .utils import translate_text
+
+PLACEHOLDER_RE = re.compile(r'\{(\d+)\}')
+
+TEMPLATE = 'template'
+LITERAL = 'literal'
+
+
+def _split_whitespace(text):
+    """(leading, core, trailing) whitespace of a text; translation loses the outer parts"""
+    core = text.strip()
+    if not core:
+        return text, '', ''
+    start = text.index(core)
+    return text[:start], core, text[start + len(core):]
+
+
+def _fields(template):
+    """
+    (text, field) pairs of a template, where field is the full replacement
+    field such as '{percentage:.1f}', or None after the last text
+    """
+    for text, name, spec, conversion in Formatter().parse(template):
+        if name is None:
+            yield text, None
+            continue
+        field = name + (f"!{conversion}" if conversion else '') + (f":{spec}" if spec else '')
+        yield text, '{' + field + '}'
+
+
+def _translate_lines(text, language):
+    """Translate line by line so line breaks and outer spaces survive"""
+    translated = []
+    for line in text.split('\n'):
+        leading, core, trailing = _split_whitespace(line)
+        translated.append(leading + translate_text(core, language) + trailing if core else line)
+    return '\n'.join(translated)
+
+
+def translate_template(template, language):
+    """
+    Translate a '{name}' template and keep its placeholders.
+
+    The template is sent with '{0}', '{1}', ... in place of the names, since
+    numbers pass through translation untouched while a word in braces may
+    get translated too. When the translation still drops or repeats a
+    placeholder, the text between the placeholders is translated piece by
+    piece instead.
+    """
+    pairs = list(_fields(template))
+    fields = [field for text, field in pairs if field is not None]
+    positional = ''
+    number = 0
+    for text, field in pairs:
+        positional += text
+        if field is not None:
+            positional += '{%d}' % number
+            number += 1
+    translated = _translate_lines(positional, language)
+    found = sorted(int(number) for number in PLACEHOLDER_RE.findall(translated))
+    if found == list(range(len(fields))):
+        return PLACEHOLDER_RE.sub(lambda match: fields[int(match.group(1))], translated)
+
+    return ''.join(_translate_lines(text, language) + (field or '') for text, field in pairs)
+
+
+class ChatResponse:
+    """
+    A response as a list of segments: templates, which are translated as
+    a whole and then filled in, and literals, which are sent as they are.
+
+        response = ChatResponse("Your attendance in {subject} is {percentage}%.",
+                                subject=record.subject, percentage=record.percentage)
+        response.literal("<a href='...'>...</a>")
+        response.render('hi')
+    """
+
+    def __init__(self, template=None, **values):
+        self.segments = []
+        if template is not None:
+            self.add(template, **values)
+
+    def add(self, template, **values):
+        """Append a phrase to translate, with {name} placeholders for values"""
+        self.segments.append((TEMPLATE, template, values))
+        return self
+
+    def literal(self, text):
+        """Append text that is never translated (HTML, names, stored translations)"""
+        self.segments.append((LITERAL, str(text), None))
+        return self
+
+    def extend(self, other):
+        """Append the segments of another response"""
+        self.segments.extend(other.segments)
+        return self
+
+    def templates(self):
+        return [text for kind, text, values in self.segments if kind == TEMPLATE]
+
+    def translate(self, language):
+        """A copy of the response with its templates translated"""
+        translated = ChatResponse()
+        for kind, text, values in self.segments:
+            if kind == TEMPLATE and language != 'en':
+                text = translate_template(text, language)
+            translated.segments.append((kind, text, values))
+        return translated
+
+    def render(self, language='en'):
+        parts = []
+        for kind, text, values in self.translate(language).segments:
+            parts.append(text if kind == LITERAL else text.format(**values))
+        return ''.join(parts)
+
+    def __str__(self):
+        return self.render()
@@ -0,0 +1,195 @@
+# chatbot/search.py
+
+# Entry point for document search; picks the backend configured in settings
+from django.conf import settings
+
+from . import fts
+from .entities import extract_document_filters, text_terms
+from .search_cache import FAQS_CORPUS, get_corpus_version, normalize_query, result_cache
+from .search_index import document_index, faq_index, passage_index
+from .semantic_index import semantic_index
+from .utils import guess_faq_category
+
+# Distinct subjects per corpus version, so the lookup is not repeated per query
+_subjects_by_version = {}
+
+
+def get_search_backend():
+    """
+    Return the configured document search backend ('tfidf', 'lsa' or 'fts5')
+    """
+    backend = getattr(settings, 'DOCUMENT_SEARCH_BACKEND', 'tfidf')
+    if backend == 'fts5' and not fts.fts_available():
+        # FTS5 needs SQLite; fall back to the in-process index elsewhere
+        return 'tfidf'
+    return backend
+
+
+def _document_index(backend):
+    """In-process index behind a non-FTS backend"""
+    return semantic_index if backend == 'lsa' else document_index
+
+
+def get_subjects(version):
+    """Distinct document subjects, cached for the given corpus version"""
+    from .models import Document
+    if version not in _subjects_by_version:
+        _subjects_by_version.clear()
+        _subjects_by_version[version] = list(
+            Document.objects.filter(is_active=True).values_list('subject', flat=True).distinct()
+        )
+    return _subjects_by_version[version]
+
+
+def _candidate_ids(filters):
+    """Ids of active documents passing the metadata filters (no text loaded)"""
+    from .models import Document
+    orm_filters = {('subject__iexact' if key == 'subject' else key): value for key, value in filters.items()}
+    return Document.objects.filter(is_active=True, **orm_filters).values_list('id', flat=True)
+
+
+def _cached_ids(kind, queries, limit, search_ids):
+    """
+    Look up result ids for each query in the cache and run
+    search_ids(backend, missed_queries, version) once for all misses.
+
+    Keys carry the corpus version, so any document change makes older
+    entries unreachable and they age out of the LRU.
+    """
+    version = get_corpus_version()
+    backend = get_search_backend()
+    keys = [(kind, backend, normalize_query(query), limit, version) for query in queries]
+    results = [result_cache.get(key) for key in keys]
+
+    missed = [i for i, ids in enumerate(results) if ids is None]
+    if missed:
+        if backend != 'fts5':
+            # Pick up changes made by other worker processes
+            _document_index(backend).ensure_version(version)
+            passage_index.ensure_version(version)
+        found = search_ids(backend, [queries[i] for i in missed], version)
+        for i, ids in zip(missed, found):
+            result_cache.put(keys[i], ids)
+            results[i] = ids
+    return results
+
+
+def search_documents(query, limit=5):
+    """Return the documents best matching a chat query, best first"""
+    return search_documents_batch([query], limit=limit)[0]
+
+
+def search_documents_batch(queries, limit=5):
+    """
+    Return one list of matching documents per query. On the in-process
+    backends all cache misses are scored together with a single product.
+    """
+    from .models import Document
+
+    def search_ids(backend, queries, version):
+        subjects = get_subjects(version)
+        results = []
+        unfiltered = []
+        for i, query in enumerate(queries):
+            filters = extract_document_filters(query, subjects)
+            if not filters:
+                unfiltered.append(i)
+                results.append(None)
+                continue
+            results.append(_search_filtered(backend, query, filters, limit))
+
+        # Queries without metadata are scored together in one batch
+        unfiltered_queries = [queries[i] for i in unfiltered]
+        if backend == 'fts5':
+            found = [fts.search_document_ids(query, limit=limit) for query in unfiltered_queries]
+        else:
+            found = [
+                [doc_id for doc_id, _ in query_hits]
+                for query_hits in _document_index(backend).search_many(unfiltered_queries, limit=limit)
+            ]
+        for i, ids in zip(unfiltered, found):
+            results[i] = ids
+        return results
+
+    id_lists = _cached_ids('documents', queries, limit, search_ids)
+    documents = Document.objects.in_bulk(
+        {doc_id for ids in id_lists for doc_id in ids}
+    )
+    results = []
+    for ids in id_lists:
+        matches = [documents[doc_id] for doc_id in ids if doc_id in documents]
+        # Documents still waiting for text extraction only matched on their
+        # metadata, so they go after the ones matched on content
+        matches.sort(key=lambda doc: not doc.is_text_ready())
+        results.append(matches)
+    return results
+
+
+def _search_filtered(backend, query, filters, limit):
+    """
+    Rank only the documents that pass the metadata filters. When the query
+    is nothing but metadata ('daa unit 2 notes') every one of them is what
+    was asked for, so if too few match the text the rest are added, newest
+    first; a query with words of its own only returns text matches.
+    """
+    if backend == 'fts5':
+        ids = fts.search_document_ids(query, limit=limit, filters=filters)
+    else:
+        candidates = list(_candidate_ids(filters))
+        if not candidates:
+            return []
+        index = _document_index(backend)
+        ids = [doc_id for doc_id, _ in index.search(query, limit=limit, keys=candidates)]
+
+    if len(ids) < limit and not text_terms(query, filters.get('subject')):
+        ids += list(
+            _candidate_ids(filters).exclude(id__in=ids).order_by('-uploaded_at')[:limit - len(ids)]
+        )
+    return ids
+
+
+def search_passages(query, limit=3):
+    """Return the pages/slides best matching a chat query, best first"""
+    from .models import DocumentPassage
+
+    def search_ids(backend, queries, version):
+        filters = extract_document_filters(queries[0], get_subjects(version))
+        if backend == 'fts5':
+            return [fts.search_passage_ids(queries[0], limit=limit, filters=filters)]
+
+        keys = None
+        if filters:
+            keys = list(
+                DocumentPassage.objects
+                .filter(document__in=_candidate_ids(filters))
+                .values_list('id', flat=True)
+            )
+        hits = passage_index.search(queries[0], limit=limit, keys=keys)
+        return [[passage_id for passage_id, _ in hits]]
+
+    passage_ids = _cached_ids('passages', [query], limit, search_ids)[0]
+    passages = (
+        DocumentPassage.objects
+        .select_related('document')
+        .in_bulk(passage_ids)
+    )
+    return [passages[passage_id] for passage_id in passage_ids if passage_id in passages]
+
+
+def find_faq(query, min_score=0.3):
+    """
+    Return the FAQ whose question best matches the query, or None.
+    Questions in the category the query points at are tried first.
+    """
+    from .models import FAQ
+    faq_index.ensure_version(get_corpus_version(FAQS_CORPUS))
+
+    hit = None
+    category = guess_faq_category(query)
+    if category:
+        hit = faq_index.best_match(query, category=category, min_score=min_score)
+    if hit is None:
+        hit = faq_index.best_match(query, min_score=min_score)
+    if hit is None:
+        return None
+    return FAQ.objects.filter(id=hit[0]).first()
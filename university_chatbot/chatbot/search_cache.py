@@ -0,0 +1,120 @@
+# chatbot/search_cache.py
+
+# Query result cache for document search, keyed on the corpus version
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import F
+
+DOCUMENTS_CORPUS = 'documents'
+FAQS_CORPUS = 'faqs'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize_query(query):
+    """
+    Reduce a query to a cache key: its lower-cased words, in order.
+
+    Case, punctuation and spacing do not change the result, but word order
+    does: the metadata filters read a number by the word next to it, so
+    'sem 2 unit 5' and 'unit 2 sem 5' ask for different documents.
+    """
+    return ' '.join(TOKEN_RE.findall(query.lower()))
+
+
+def get_corpus_version(name=DOCUMENTS_CORPUS):
+    from .models import CorpusVersion
+    version = CorpusVersion.objects.filter(name=name).values_list('version', flat=True).first()
+    return version or 0
+
+
+# Versions whose changed document is remembered; a worker further behind
+# than this rebuilds its indexes instead of catching up
+CORPUS_CHANGES_KEPT = 1000
+
+
+def bump_corpus_version(name=DOCUMENTS_CORPUS, document_id=None):
+    """
+    Increment a corpus version and return the new value. With a document
+    id the change is logged, so other workers can apply it row by row;
+    a bump without one makes them rebuild.
+    """
+    from .models import CorpusChange, CorpusVersion
+    updated = CorpusVersion.objects.filter(name=name).update(version=F('version') + 1)
+    if not updated:
+        CorpusVersion.objects.get_or_create(name=name)
+        CorpusVersion.objects.filter(name=name).update(version=F('version') + 1)
+    version = get_corpus_version(name)
+    if document_id is not None:
+        CorpusChange.objects.create(name=name, version=version, document_id=document_id)
+        if version % 100 == 0:
+            CorpusChange.objects.filter(name=name, version__lte=version - CORPUS_CHANGES_KEPT).delete()
+    return version
+
+
+def changed_documents(since, version, name=DOCUMENTS_CORPUS):
+    """
+    Ids of the documents changed by the bumps after `since` up to `version`,
+    or None when one of those bumps was not logged
+    """
+    from .models import CorpusChange
+    document_ids = list(
+        CorpusChange.objects.filter(name=name, version__gt=since, version__lte=version)
+        .values_list('document_id', flat=True)
+    )
+    if len(document_ids) != version - since:
+        return None
+    return set(document_ids)
+
+
+class SearchResultCache:
+    """
+    Size-bounded LRU cache of search results with hit/miss counters
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+# Shared cache used by chatbot.search
+result_cache = SearchResultCache(getattr(settings, 'SEARCH_CACHE_SIZE', 1024))
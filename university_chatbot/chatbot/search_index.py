@@ -0,0 +1,408 @@
+# chatbot/search_index.py
+
+# Persistent TF-IDF indexes for document and passage search
+import threading
+
+import numpy as np
+from scipy import sparse
+from django.utils.translation import override
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+from .content_translation import source_language
+from .utils import document_search_text, top_k_indices
+
+
+class TfidfIndex:
+    """
+    In-process TF-IDF index over (key, text) rows.
+
+    The vocabulary and the sparse term matrix are fitted once and then kept
+    up to date row by row as the underlying objects change, so a query only
+    costs one transform and one sparse dot product.
+    """
+
+    # Refit from scratch once this share of the rows has changed since the
+    # last fit, so vocabulary and IDF weights follow the corpus.
+    REFIT_RATIO = 0.2
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None     # corpus version the rows correspond to
+        self._reset()
+
+    def _reset(self):
+        self._built = False
+        self._vectorizer = None
+        self._matrix = None      # CSR matrix, one l2-normalised row per key
+        self._row_ids = []       # row -> key (None for dropped rows)
+        self._rows = {}          # key -> row
+        self._live = np.zeros(0, dtype=bool)
+        self._changes = 0
+
+    def _iter_rows(self):
+        """Yield (key, text) for every object that should be searchable"""
+        raise NotImplementedError
+
+    def _source_rows(self):
+        """
+        _iter_rows() with translated fields read in the source language,
+        whatever language the current request has activated
+        """
+        with override(source_language()):
+            yield from self._iter_rows()
+
+    def make_vectorizer(self):
+        return TfidfVectorizer(stop_words='english')
+
+    @staticmethod
+    def transform_queries(vectorizer, queries):
+        """
+        Vectorize queries against the fitted vocabulary.
+
+        Words the index has never seen cannot be matched, but they still
+        count towards each query's length (with the IDF of an unseen term),
+        as they would if the query had been part of the fit. Otherwise a
+        query sharing a single common word with a row would score as if
+        that word were all it said.
+        """
+        counts = CountVectorizer.transform(vectorizer, queries)
+        weighted = counts.multiply(vectorizer.idf_).tocsr()
+        unseen_idf = np.log(1 + vectorizer.n_fit_docs_) + 1
+
+        analyzer = vectorizer.build_analyzer()
+        vocabulary = vectorizer.vocabulary_
+        unseen_sq = np.zeros(len(queries))
+        for i, query in enumerate(queries):
+            unseen = {}
+            for term in analyzer(query):
+                if term not in vocabulary:
+                    unseen[term] = unseen.get(term, 0) + 1
+            unseen_sq[i] = sum((count * unseen_idf) ** 2 for count in unseen.values())
+
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel() + unseen_sq)
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ weighted
+
+    def build(self):
+        """Fit the vectorizer and matrix on every searchable row"""
+        keys = []
+        texts = []
+        for key, text in self._source_rows():
+            keys.append(key)
+            texts.append(text)
+
+        with self._lock:
+            self._reset()
+            self._built = True
+            if not texts:
+                return
+            try:
+                vectorizer = self.make_vectorizer()
+                matrix = vectorizer.fit_transform(texts).tocsr()
+                vectorizer.n_fit_docs_ = len(texts)
+            except ValueError as e:
+                # Raised when the corpus has no usable vocabulary
+                print(f"Search index build error: {e}")
+                return
+            self._vectorizer = vectorizer
+            self._matrix = matrix
+            self._row_ids = keys
+            self._rows = {key: row for row, key in enumerate(keys)}
+            self._live = np.ones(len(keys), dtype=bool)
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt on the next search"""
+        with self._lock:
+            self._reset()
+
+    def ensure_version(self, version):
+        """
+        Bring the index up to a corpus version changed behind our back (e.g.
+        by the background job worker). The documents changed in between are
+        re-read and their rows replaced; only when that is not possible (the
+        change log does not cover the gap, or the index has not been built)
+        is the index dropped, to be refitted by the next search.
+        """
+        with self._lock:
+            if self._version == version:
+                return
+            since = self._version if self._built else None
+        if since is not None and since < version:
+            from .search_cache import changed_documents
+            document_ids = changed_documents(since, version)
+            if document_ids is not None and self.refresh_documents(document_ids):
+                with self._lock:
+                    if self._version == since:
+                        self._version = version
+                        return
+        with self._lock:
+            if self._version != version:
+                self._reset()
+                self._version = version
+
+    def refresh_documents(self, document_ids):
+        """
+        Re-read the rows of the given documents; returns False when the
+        index cannot be updated this way and has to be rebuilt
+        """
+        return False
+
+    def note_version(self, version):
+        """
+        Record a version bump whose change this process has already applied.
+        If other bumps were missed in between, the next search rebuilds.
+        """
+        with self._lock:
+            if self._version == version - 1:
+                self._version = version
+
+    def _ensure_built(self):
+        with self._lock:
+            needs_build = not self._built or (
+                self._changes > self.REFIT_RATIO * max(len(self._rows), 1)
+            )
+        if needs_build:
+            self.build()
+
+    def _drop_row(self, key):
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._live[row] = False
+            self._row_ids[row] = None
+            self._changes += 1
+
+    def _transform_rows(self, texts):
+        """Vectorize new rows with the fitted vocabulary"""
+        return self._vectorizer.transform(texts)
+
+    def _append_rows(self, rows):
+        self._matrix = sparse.vstack([self._matrix, rows], format='csr')
+
+    def update_rows(self, items):
+        """
+        Add or replace rows from (key, text) pairs; a text of None drops
+        the row. All new rows are transformed and appended in one go.
+        """
+        with self._lock:
+            if not self._built:
+                return
+            added = []
+            for key, text in items:
+                self._drop_row(key)
+                if text is not None:
+                    added.append((key, text))
+            if not added:
+                return
+            if self._vectorizer is None:
+                # Nothing fitted yet, so there is no vocabulary to map into
+                self._built = False
+                return
+
+            self._append_rows(self._transform_rows([text for _, text in added]))
+            for key, _ in added:
+                self._rows[key] = len(self._row_ids)
+                self._row_ids.append(key)
+            self._live = np.append(self._live, np.ones(len(added), dtype=bool))
+            self._changes += len(added)
+
+    def update_row(self, key, text):
+        """Add or replace a single row; a text of None drops it"""
+        self.update_rows([(key, text)])
+
+    def remove_row(self, key):
+        with self._lock:
+            if self._built:
+                self._drop_row(key)
+
+    # Queries scored per sparse product in search_many; bounds the size of
+    # the dense (queries x rows) score block held in memory at once.
+    BATCH_SIZE = 256
+
+    # Default lowest cosine similarity returned by a search
+    MIN_SCORE = 0.1
+
+    def search(self, query, limit=5, min_score=None, keys=None):
+        """
+        Return (key, score) pairs for the best matches, best first
+        """
+        return self.search_many([query], limit=limit, min_score=min_score, keys=keys)[0]
+
+    def search_many(self, queries, limit=5, min_score=None, keys=None):
+        """
+        Score many queries at once and return one list of (key, score)
+        pairs per query. Each block of queries costs one transform and one
+        sparse matrix product, and the top hits per row are picked with
+        argpartition. If keys is given, only those rows are scored.
+        """
+        if min_score is None:
+            min_score = self.MIN_SCORE
+        self._ensure_built()
+        with self._lock:
+            vectorizer, matrix, live, row_ids = (
+                self._vectorizer, self._matrix, self._live, self._row_ids
+            )
+            if vectorizer is not None and keys is not None:
+                rows = sorted(self._rows[key] for key in keys if key in self._rows)
+                matrix = matrix[rows]
+                live = live[rows]
+                row_ids = [row_ids[row] for row in rows]
+        if vectorizer is None or not row_ids:
+            return [[] for _ in queries]
+
+        results = []
+        for start in range(0, len(queries), self.BATCH_SIZE):
+            block = [query or '' for query in queries[start:start + self.BATCH_SIZE]]
+            scores = self._score_block(vectorizer, matrix, block)
+            scores[:, ~live] = 0
+
+            for row_scores, top in zip(scores, top_k_indices(scores, limit)):
+                results.append([
+                    (row_ids[i], float(row_scores[i]))
+                    for i in top
+                    if row_scores[i] > min_score and row_ids[i] is not None
+                ])
+        return results
+
+
+    def _score_block(self, vectorizer, matrix, queries):
+        """Dense (queries x rows) array of cosine similarities"""
+        query_vectors = self.transform_queries(vectorizer, queries)
+        # Rows are l2-normalised, so the dot product is the cosine similarity.
+        # Multiplying as (rows x queries) avoids converting the big matrix
+        # out of CSR on every call.
+        return (matrix @ query_vectors.T).T.toarray()
+
+    def nbytes(self):
+        """Memory held by the row vectors"""
+        with self._lock:
+            if self._matrix is None:
+                return 0
+            return self._matrix.data.nbytes + self._matrix.indices.nbytes + self._matrix.indptr.nbytes
+
+
+class DocumentIndex(TfidfIndex):
+    """TF-IDF index with one row per active document"""
+
+    def _iter_rows(self):
+        from .models import Document
+        for doc in Document.objects.filter(is_active=True).select_related('text_content').iterator():
+            yield doc.id, document_search_text(doc)
+
+    def update_document(self, doc):
+        self.update_row(doc.id, document_search_text(doc) if doc.is_active else None)
+
+    def refresh_documents(self, document_ids):
+        from .models import Document
+        with override(source_language()):
+            documents = Document.objects.filter(id__in=document_ids).select_related('text_content').in_bulk()
+            self.update_rows([
+                (doc_id, document_search_text(documents[doc_id])
+                 if doc_id in documents and documents[doc_id].is_active else None)
+                for doc_id in document_ids
+            ])
+        return True
+
+    def remove_document(self, doc_id):
+        self.remove_row(doc_id)
+
+
+class PassageIndex(TfidfIndex):
+    """TF-IDF index with one row per page or slide of an active document"""
+
+    def __init__(self):
+        super().__init__()
+        self._documents = {}     # passage id -> document id
+
+    def _iter_rows(self):
+        from .models import DocumentPassage
+        passages = DocumentPassage.objects.filter(document__is_active=True)
+        documents = {}
+        for passage_id, document_id, text in passages.values_list('id', 'document_id', 'text').iterator():
+            documents[passage_id] = document_id
+            yield passage_id, text
+        self._documents = documents
+
+    def update_passages(self, document, old_passage_ids, passages):
+        """Swap a document's old passages for its current ones"""
+        items = [(passage_id, None) for passage_id in old_passage_ids]
+        with self._lock:
+            if document.is_active:
+                items += [(passage.id, passage.text) for passage in passages]
+                self._documents.update((passage.id, document.id) for passage in passages)
+            self.update_rows(items)
+
+    def refresh_documents(self, document_ids):
+        from .models import DocumentPassage
+        passages = list(
+            DocumentPassage.objects.filter(document_id__in=document_ids, document__is_active=True)
+            .values_list('id', 'document_id', 'text')
+        )
+        with self._lock:
+            # Passages replaced since are gone from the database, so the
+            # rows to drop are found through the documents they belonged to
+            items = [(passage_id, None) for passage_id, document_id in self._documents.items()
+                     if document_id in document_ids]
+            for passage_id, document_id, text in passages:
+                self._documents[passage_id] = document_id
+                items.append((passage_id, text))
+            self.update_rows(items)
+        return True
+
+    def set_document_active(self, document):
+        """Add or drop a document's passages when it is (de)activated"""
+        with self._lock:
+            if not self._built:
+                return
+            passage_ids = document.passages.values_list('id', flat=True)
+            changed = [
+                passage_id for passage_id in passage_ids
+                if document.is_active != (passage_id in self._rows)
+            ]
+            if not changed:
+                return
+            if not document.is_active:
+                self.update_rows([(passage_id, None) for passage_id in changed])
+                return
+            self._documents.update((passage_id, document.id) for passage_id in changed)
+            self.update_rows(document.passages.filter(id__in=changed).values_list('id', 'text'))
+
+
+class FAQIndex(TfidfIndex):
+    """
+    TF-IDF index over FAQ questions, so an unmatched chat message is scored
+    against every question in one operation instead of one fit per FAQ.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._categories = {}
+
+    def make_vectorizer(self):
+        # Same settings calculate_similarity() used for question matching
+        return TfidfVectorizer()
+
+    def _iter_rows(self):
+        from .models import FAQ
+        categories = {}
+        for faq_id, question, category in FAQ.objects.values_list('id', 'question', 'category').iterator():
+            categories[faq_id] = category
+            yield faq_id, question.lower()
+        self._categories = categories
+
+    def best_match(self, query, category=None, min_score=0.3):
+        """
+        Return (FAQ id, score) of the closest question, or None. With a
+        category, only questions in that category are considered.
+        """
+        self._ensure_built()
+        keys = None
+        if category:
+            keys = [faq_id for faq_id, faq_category in self._categories.items() if faq_category == category]
+        hits = self.search(query, limit=1, min_score=min_score, keys=keys)
+        return hits[0] if hits else None
+
+
+# Shared indexes used by the views
+document_index = DocumentIndex()
+passage_index = PassageIndex()
+faq_index = FAQIndex()
@@ -0,0 +1,150 @@
+# chatbot/semantic_index.py
+
+# Latent semantic (LSA) document index: TF-IDF reduced with TruncatedSVD
+import os
+
+import joblib
+import numpy as np
+from django.conf import settings
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from .search_index import DocumentIndex
+
+
+class SemanticDocumentIndex(DocumentIndex):
+    """
+    Document index on dense low-rank vectors.
+
+    The TF-IDF matrix is reduced to a few hundred latent dimensions with
+    TruncatedSVD, so documents that use related words end up close together
+    even when they share no term with the query. Document vectors are kept
+    as one contiguous float32 array and a query costs one projection and
+    one matrix-vector product.
+
+    Fitting the SVD is the expensive part, so `rebuild_semantic_index`
+    fits it once and saves it to SEMANTIC_INDEX_PATH. Workers load the
+    saved index; documents added or changed later are projected with the
+    saved model ("folded in") until the command is run again.
+    """
+
+    # Cosine similarities in the latent space run higher than on raw terms
+    MIN_SCORE = 0.3
+
+    def __init__(self, n_components=None, path=None):
+        super().__init__()
+        self.n_components = n_components or getattr(settings, 'SEMANTIC_SEARCH_COMPONENTS', 200)
+        self.path = path or getattr(settings, 'SEMANTIC_INDEX_PATH', None)
+
+    @staticmethod
+    def _project(vectorizer, tfidf):
+        """Map TF-IDF rows into the latent space, l2-normalised"""
+        tfidf = tfidf.astype(np.float32)  # keeps the product from upcasting the projection
+        return np.ascontiguousarray(normalize(tfidf @ vectorizer.projection_), dtype=np.float32)
+
+    def _fit(self, texts):
+        vectorizer = self.make_vectorizer()
+        tfidf = vectorizer.fit_transform(texts)
+        vectorizer.n_fit_docs_ = len(texts)
+        n_components = min(self.n_components, tfidf.shape[0] - 1, tfidf.shape[1] - 1)
+        if n_components < 1:
+            raise ValueError("Too few documents for a semantic index")
+        svd = TruncatedSVD(n_components=n_components, random_state=0)
+        svd.fit(tfidf)
+        # Kept on the vectorizer so queries and new rows use the same model
+        vectorizer.projection_ = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+        return vectorizer, self._project(vectorizer, tfidf)
+
+    def _load_saved(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            return joblib.load(self.path)
+        except Exception as e:
+            print(f"Semantic index load error: {e}")
+            return None
+
+    def build(self, use_saved=True):
+        """
+        Load the saved index if it matches the corpus version, otherwise
+        project the current rows with the saved model, or fit a new one
+        when nothing has been saved.
+        """
+        saved = self._load_saved() if use_saved else None
+        if saved is not None and saved['version'] == self._version:
+            vectorizer, vectors, keys = saved['vectorizer'], saved['vectors'], saved['row_ids']
+        else:
+            keys = []
+            texts = []
+            for key, text in self._source_rows():
+                keys.append(key)
+                texts.append(text)
+            if saved is not None:
+                # Words only used by new documents are unknown to the saved
+                # model, so once enough of the corpus is new it is refitted
+                saved_ids = set(saved['row_ids'])
+                new_rows = sum(1 for key in keys if key not in saved_ids)
+                if new_rows > self.REFIT_RATIO * max(len(keys), 1):
+                    saved = None
+
+            vectorizer = vectors = None
+            if texts:
+                try:
+                    if saved is not None:
+                        vectorizer = saved['vectorizer']
+                        vectors = self._project(vectorizer, vectorizer.transform(texts))
+                    else:
+                        vectorizer, vectors = self._fit(texts)
+                except ValueError as e:
+                    print(f"Semantic index build error: {e}")
+                    vectorizer = vectors = None
+
+        with self._lock:
+            self._reset()
+            self._built = True
+            if vectorizer is None:
+                return
+            self._vectorizer = vectorizer
+            self._matrix = vectors
+            self._row_ids = list(keys)
+            self._rows = {key: row for row, key in enumerate(keys)}
+            self._live = np.ones(len(keys), dtype=bool)
+
+    def save(self):
+        """Write the live rows and the fitted model to SEMANTIC_INDEX_PATH"""
+        with self._lock:
+            if self._vectorizer is None:
+                return False
+            live = np.flatnonzero(self._live)
+            state = {
+                'version': self._version,
+                'vectorizer': self._vectorizer,
+                'vectors': np.ascontiguousarray(self._matrix[live]),
+                'row_ids': [self._row_ids[row] for row in live],
+            }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write next to the target and swap it in, so workers never read half a file
+        temp_path = f"{self.path}.tmp"
+        joblib.dump(state, temp_path)
+        os.replace(temp_path, self.path)
+        return True
+
+    def _transform_rows(self, texts):
+        return self._project(self._vectorizer, self._vectorizer.transform(texts))
+
+    def _append_rows(self, rows):
+        self._matrix = np.vstack([self._matrix, rows])
+
+    def _score_block(self, vectorizer, matrix, queries):
+        query_vectors = self._project(vectorizer, self.transform_queries(vectorizer, queries))
+        return query_vectors @ matrix.T
+
+    def nbytes(self):
+        with self._lock:
+            if self._matrix is None:
+                return 0
+            return self._matrix.nbytes + self._vectorizer.projection_.nbytes
+
+
+# Shared index used when DOCUMENT_SEARCH_BACKEND is 'lsa'
+semantic_index = SemanticDocumentIndex()
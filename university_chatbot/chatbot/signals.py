@@ -0,0 +1,90 @@
+# chatbot/signals.py
+from django.db.models.signals import post_save, pre_delete, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils.translation import override
+
+from . import fts
+from .content_translation import clear_stale_translations, missing_translations, queue_translation, source_language, translated_fields
+from .models import Document, FAQ, passages_saved
+from .search_cache import FAQS_CORPUS, bump_corpus_version
+from .search_index import document_index, faq_index, passage_index
+from .semantic_index import semantic_index
+
+
+def _corpus_changed(document_id):
+    """Invalidate cached search results everywhere"""
+    version = bump_corpus_version(document_id=document_id)
+    document_index.note_version(version)
+    semantic_index.note_version(version)
+    passage_index.note_version(version)
+
+
+@receiver(pre_save, sender=Document)
+def read_fts_values(sender, instance, **kwargs):
+    # The contentless FTS row can only be removed with the values it holds
+    instance._fts_values = fts.stored_values(instance.pk)
+
+
+@receiver(post_save, sender=Document)
+def update_document_index(sender, instance, **kwargs):
+    """Keep the document search indexes in step with saved documents"""
+    # Only the source language is indexed, whichever language the request uses
+    with override(source_language()):
+        document_index.update_document(instance)
+        semantic_index.update_document(instance)
+        passage_index.set_document_active(instance)
+        fts.sync_document(instance, getattr(instance, '_fts_values', None))
+    _corpus_changed(instance.id)
+
+
+@receiver(pre_delete, sender=Document)
+def remove_passages_from_index(sender, instance, **kwargs):
+    # Passages are cascade-deleted with the document, so collect them first
+    passage_ids = list(instance.passages.values_list('id', flat=True))
+    passage_index.update_rows([(passage_id, None) for passage_id in passage_ids])
+    fts.sync_passages(passage_ids, [])
+    instance._fts_values = fts.stored_values(instance.pk)
+
+
+@receiver(post_delete, sender=Document)
+def remove_from_document_index(sender, instance, **kwargs):
+    document_index.remove_document(instance.id)
+    semantic_index.remove_document(instance.id)
+    fts.remove_document(instance.id, getattr(instance, '_fts_values', None))
+    _corpus_changed(instance.id)
+
+
+@receiver(passages_saved, sender=Document)
+def update_passage_index(sender, document, old_ids, passages, **kwargs):
+    passage_index.update_passages(document, old_ids, passages)
+    fts.sync_passages(old_ids, passages)
+    _corpus_changed(document.id)
+
+
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def refresh_faq_index(sender, instance, **kwargs):
+    """FAQs are few and short, so any change simply refits the FAQ index"""
+    faq_index.invalidate()
+    faq_index.note_version(bump_corpus_version(FAQS_CORPUS))
+
+
+def _touches_translated_fields(sender, update_fields):
+    return update_fields is None or any(
+        name.split('_')[0] in translated_fields(sender) for name in update_fields
+    )
+
+
+@receiver(pre_save, sender=Document)
+@receiver(pre_save, sender=FAQ)
+def drop_stale_translations(sender, instance, update_fields=None, **kwargs):
+    if _touches_translated_fields(sender, update_fields):
+        clear_stale_translations(instance, update_fields)
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=FAQ)
+def queue_content_translation(sender, instance, update_fields=None, **kwargs):
+    """Translate new or edited text in the background worker"""
+    if _touches_translated_fields(sender, update_fields) and missing_translations(instance):
+        queue_translation(sender, [instance.pk])
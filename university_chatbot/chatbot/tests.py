@@ -1,3 +1,602 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import content_store, downloads, fts
+from .downloads import signed_download_url
+from .entities import extract_document_filters, extract_entities
+from .jobs import claim_next_job, requeue_stale_jobs, run_job
+from .language import analyze_language
+from .extraction import ExtractionLimits
+from .intent import FALLBACK_INTENT, Intent, IntentClassifier, load_samples
+from .models import BackgroundJob, CachedTranslation, Document, ExtractionCache
+from .phrase_translator import PhraseTranslator
+from .pipeline import STAGES
+from .responses import ChatResponse
+from .search import search_documents, search_passages
+from .search_cache import bump_corpus_version, normalize_query, result_cache
+from .search_index import document_index, passage_index
+from .translation_cache import translation_cache
+from .utils import machine_translate
+
+
+class MediaTestCase(TestCase):
+    """Stores uploads in a temporary MEDIA_ROOT, removed after the tests"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def make_document(self, title='Unit 2 notes', content=b'%PDF-1.4 notes', text=None, extension='pdf', **fields):
+        """A document whose file reads as `text` (extracted on save) when given"""
+        fields = {'semester': 5, 'subject': 'DAA', 'unit': 2, 'doc_type': 'notes', **fields}
+        upload = SimpleUploadedFile(f"{title}.{extension}", content)
+        if text is None:
+            return Document.objects.create(title=title, file=upload, **fields)
+        with override_settings(EXTRACT_TEXT_IN_BACKGROUND=False), \
+                mock.patch.object(Document, 'read_passages_from_file', return_value=[(1, text)]):
+            return Document.objects.create(title=title, file=upload, **fields)
+
+
+@override_settings(EXTRACT_TEXT_IN_BACKGROUND=True, BACKGROUND_JOB_TIMEOUT=600)
+class BackgroundJobTests(MediaTestCase):
+
+    def test_stale_extraction_is_requeued_and_extracted_again(self):
+        document = self.make_document()
+        job = claim_next_job(['extract_document'])
+        self.assertEqual(job.payload, {'document_id': document.id})
+
+        # The worker dies while parsing: the document is left running
+        Document.objects.filter(id=document.id).update(extraction_status=Document.EXTRACTION_RUNNING)
+        BackgroundJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(seconds=601))
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        document.refresh_from_db()
+        self.assertEqual(document.extraction_status, Document.EXTRACTION_PENDING)
+
+        job = claim_next_job(['extract_document'])
+        with mock.patch.object(Document, 'read_passages_from_file', return_value=[(1, 'greedy algorithms')]):
+            run_job(job)
+        self.assertEqual(job.status, BackgroundJob.DONE)
+        document = Document.objects.get(id=document.id)
+        self.assertEqual(document.extraction_status, Document.EXTRACTION_DONE)
+        self.assertEqual(document.extracted_text, 'greedy algorithms')
+
+    def test_running_jobs_within_the_timeout_are_left_alone(self):
+        document = self.make_document()
+        claim_next_job(['extract_document'])
+        Document.objects.filter(id=document.id).update(extraction_status=Document.EXTRACTION_RUNNING)
+
+        self.assertEqual(requeue_stale_jobs(), 0)
+        document.refresh_from_db()
+        self.assertEqual(document.extraction_status, Document.EXTRACTION_RUNNING)
+
+
+class EntityExtractionTests(TestCase):
+
+    def test_numbers_are_read_by_the_word_next_to_them(self):
+        entities = extract_entities('sem 2 unit 5 notes')
+        self.assertEqual((entities.semester, entities.unit), (2, 5))
+        entities = extract_entities('unit 2 sem 5 notes')
+        self.assertEqual((entities.semester, entities.unit), (5, 2))
+
+    def test_semester_before_its_word_and_with_ordinal(self):
+        self.assertEqual(extract_entities('5 sem daa unit 3').semester, 5)
+        self.assertEqual(extract_entities('3rd sem notes unit 1').semester, 3)
+        self.assertEqual(extract_entities('unit2 ppt').unit, 2)
+
+    def test_percentage_is_not_taken_as_unit(self):
+        entities = extract_entities('how many lectures to reach 75%')
+        self.assertEqual(entities.target_percentage, 75)
+        self.assertIsNone(entities.unit)
+
+    def test_bare_number_is_the_unit(self):
+        entities = extract_entities('daa 4 notes')
+        self.assertEqual((entities.unit, entities.subject, entities.doc_type),
+                         (4, 'Design and Analysis of Algorithms', 'notes'))
+
+    def test_document_filters(self):
+        self.assertEqual(
+            extract_document_filters('unit 2 sem 5 DAA ppt', ['DAA', 'Software Engineering']),
+            {'semester': 5, 'unit': 2, 'subject': 'DAA', 'doc_type': 'ppt'},
+        )
+        self.assertEqual(
+            extract_document_filters('software engineering syllabus', ['DAA', 'Software Engineering']),
+            {'subject': 'Software Engineering', 'doc_type': 'syllabus'},
+        )
+
+
+class SearchCacheTests(MediaTestCase):
+
+    def setUp(self):
+        result_cache.clear()
+        document_index.invalidate()
+        passage_index.invalidate()
+
+    def test_cache_key_keeps_word_order(self):
+        self.assertNotEqual(normalize_query('sem 2 unit 5 notes'), normalize_query('unit 2 sem 5 notes'))
+        self.assertEqual(normalize_query('Sem 2,  Unit 5 notes?'), normalize_query('sem 2 unit 5 notes'))
+
+    def test_reordered_query_is_not_served_from_the_cache(self):
+        sem2 = self.make_document('Sem 2 unit 5', text='sorting', semester=2, unit=5)
+        sem5 = self.make_document('Sem 5 unit 2', text='sorting', semester=5, unit=2)
+        self.assertEqual(search_documents('unit 2 sem 5 notes'), [sem5])
+        self.assertEqual(search_documents('sem 2 unit 5 notes'), [sem2])
+
+    def test_metadata_only_query_lists_the_filtered_documents(self):
+        notes = self.make_document('Greedy', text='greedy algorithms')
+        self.assertEqual(search_documents('daa unit 2 notes'), [notes])
+
+    def test_unrelated_documents_are_not_added_to_text_queries(self):
+        notes = self.make_document('Greedy', text='greedy algorithms')
+        self.assertEqual(search_documents('notes on quantum physics'), [])
+        self.assertEqual(search_documents('daa unit 2 notes on greedy'), [notes])
+
+
+class ContentStoreTests(MediaTestCase):
+
+    def test_shared_file_is_deleted_with_its_last_document(self):
+        first = self.make_document('First', content=b'%PDF-1.4 shared')
+        second = self.make_document('Second', content=b'%PDF-1.4 shared')
+        self.assertEqual(first.file.name, second.file.name)
+        content_store.cache_passages(first.content_hash, ExtractionLimits.from_settings(), [[1, 'shared']])
+        name = first.file.name
+
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertTrue(ExtractionCache.objects.filter(content_hash=second.content_hash).exists())
+
+        second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(ExtractionCache.objects.filter(content_hash=second.content_hash).exists())
+
+    def test_file_released_during_upload_is_stored_again(self):
+        first = self.make_document('First', content=b'%PDF-1.4 shared')
+
+        def store_then_release(f, filename, storage):
+            # Another worker deletes the last other document right after the reuse check
+            name, digest = content_store.store_file(f, filename, storage)
+            Document.objects.filter(id=first.id).delete()
+            content_store.release_file(name, storage)
+            return name, digest
+
+        with mock.patch('chatbot.models.store_file', side_effect=store_then_release):
+            second = self.make_document('Second', content=b'%PDF-1.4 shared')
+        self.assertTrue(default_storage.exists(second.file.name))
+        with default_storage.open(second.file.name) as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 shared')
+
+
+class DownloadTests(MediaTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('student1', password='x')
+        self.client.force_login(self.user)
+        self.document = self.make_document(content=b'0123456789')
+        self.url = reverse('download_document', args=[self.document.id])
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_download_has_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], f'"{self.document.content_hash}"')
+        self.assertIn('Last-Modified', response)
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(self.content(response), b'789')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=7-')
+        self.assertEqual(response['Content-Range'], 'bytes 7-9/10')
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-20')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_malformed_or_multiple_ranges_send_the_whole_file(self):
+        for header in ['bytes=a-b', 'bytes=0-1,4-5']:
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_if_range_with_old_etag_sends_the_whole_file(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), b'0123456789')
+
+
+@override_settings(DOWNLOAD_ACTIVE_IDS_MAX_AGE=3600)
+class SignedDownloadTests(MediaTestCase):
+
+    def setUp(self):
+        # Forget the active documents seen by earlier tests
+        downloads._active_ids['loaded_at'] = None
+
+    def test_signed_link_serves_the_file_without_a_session_or_query(self):
+        document = self.make_document(content=b'0123456789')
+        url = signed_download_url(document)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_deactivated_document_is_not_served(self):
+        document = self.make_document(content=b'0123456789')
+        url = signed_download_url(document)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        Document.objects.filter(id=document.id).update(is_active=False)
+        with override_settings(DOWNLOAD_ACTIVE_IDS_MAX_AGE=0):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        # Links to documents uploaded after the list was loaded still work
+        self.assertEqual(self.client.get(signed_download_url(self.make_document('New'))).status_code, 200)
+
+    def test_only_pdfs_open_inline(self):
+        pdf = self.make_document('Slides', content=b'%PDF-1.4 slides')
+        response = self.client.get(signed_download_url(pdf, inline=True, page=3))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+
+        page = self.make_document('Page', content=b'<script>alert(1)</script>', extension='html')
+        for url in [signed_download_url(page, inline=True), signed_download_url(page) + '?inline=1']:
+            response = self.client.get(url)
+            self.assertEqual(response['Content-Type'], 'application/octet-stream')
+            self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+
+    def test_inline_flag_is_signed(self):
+        pdf = self.make_document('Slides', content=b'%PDF-1.4 slides')
+        response = self.client.get(signed_download_url(pdf) + '?inline=1')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+
+    def test_tampered_and_expired_links(self):
+        document = self.make_document(content=b'0123456789')
+        url = signed_download_url(document)
+        self.assertEqual(self.client.get(url[:-3] + 'xx/').status_code, 403)
+        with override_settings(DOWNLOAD_URL_MAX_AGE=-1):
+            self.assertEqual(self.client.get(url).status_code, 410)
+
+
+@override_settings(SEARCH_API_TOKEN='analytics-token')
+class SearchApiTests(MediaTestCase):
+
+    def setUp(self):
+        result_cache.clear()
+        document_index.invalidate()
+        self.url = reverse('search_documents_api')
+        self.body = json.dumps({'queries': ['daa unit 2 notes'], 'limit': 3})
+        self.notes = self.make_document('Greedy', text='greedy algorithms')
+
+    def post(self, client, **extra):
+        return client.post(self.url, self.body, content_type='application/json', **extra)
+
+    def test_service_token(self):
+        client = Client(enforce_csrf_checks=True)
+        response = self.post(client, HTTP_AUTHORIZATION='Bearer analytics-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([doc['id'] for doc in response.json()['results'][0]['documents']], [self.notes.id])
+        self.assertEqual(self.post(client, HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+
+    def test_students_and_anonymous_users_are_refused(self):
+        client = Client()
+        self.assertEqual(self.post(client).status_code, 403)
+        client.force_login(User.objects.create_user('student1', password='x'))
+        self.assertEqual(self.post(client).status_code, 403)
+
+    def test_staff_session_needs_a_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.create_user('tadmin', password='x', is_staff=True))
+        self.assertEqual(self.post(client).status_code, 403)
+
+        client.cookies['csrftoken'] = 'a' * 32
+        response = self.post(client, HTTP_X_CSRFTOKEN='a' * 32)
+        self.assertEqual(response.status_code, 200)
+
+
+class IndexCatchUpTests(MediaTestCase):
+    """Changes made by another process (e.g. the job worker) reach this one's indexes"""
+
+    def setUp(self):
+        result_cache.clear()
+        document_index.invalidate()
+        passage_index.invalidate()
+        self.greedy = self.make_document('Greedy', text='greedy algorithms')
+        # Enough rows that one change stays under the refit ratio
+        for i in range(10):
+            self.make_document(f'Filler {i}', content=f'filler {i}'.encode(), text=f'filler topic {i}', unit=i + 3)
+        self.assertEqual(search_documents('greedy'), [self.greedy])
+        self.assertEqual(len(search_passages('greedy')), 1)
+
+    def save_elsewhere(self, **kwargs):
+        """Save a document without this process's signal handlers touching its indexes"""
+        with mock.patch('chatbot.signals.document_index'), mock.patch('chatbot.signals.passage_index'), \
+                mock.patch('chatbot.signals.semantic_index'):
+            return self.make_document(**kwargs)
+
+    def test_changed_documents_are_applied_without_a_rebuild(self):
+        # New rows are mapped into the fitted vocabulary, so reuse its words
+        revision = self.save_elsewhere(title='Revision', content=b'revision', text='greedy algorithms revision')
+        with mock.patch.object(document_index, 'build', side_effect=AssertionError('rebuilt')), \
+                mock.patch.object(passage_index, 'build', side_effect=AssertionError('rebuilt')):
+            self.assertCountEqual(search_documents('greedy'), [self.greedy, revision])
+            self.assertCountEqual([passage.document for passage in search_passages('greedy')],
+                                  [self.greedy, revision])
+
+    def test_deactivated_elsewhere_is_dropped_without_a_rebuild(self):
+        with mock.patch('chatbot.signals.document_index'), mock.patch('chatbot.signals.passage_index'), \
+                mock.patch('chatbot.signals.semantic_index'):
+            self.greedy.is_active = False
+            self.greedy.save()
+        with mock.patch.object(document_index, 'build', side_effect=AssertionError('rebuilt')), \
+                mock.patch.object(passage_index, 'build', side_effect=AssertionError('rebuilt')):
+            self.assertEqual(search_documents('greedy algorithms'), [])
+            self.assertEqual(search_passages('greedy algorithms'), [])
+
+    def test_unlogged_change_rebuilds(self):
+        bump_corpus_version()
+        with mock.patch.object(document_index, 'build', wraps=document_index.build) as build:
+            self.assertEqual(search_documents('greedy algorithms'), [self.greedy])
+        build.assert_called_once()
+
+
+class TranslationCacheTests(TestCase):
+
+    def setUp(self):
+        translation_cache.clear()
+        patcher = mock.patch('chatbot.utils.translator')
+        self.translator = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.translator.translate.side_effect = lambda text, dest: mock.Mock(text=f'<{dest}>{text}')
+
+    def test_responses_are_stored(self):
+        self.assertEqual(machine_translate('Here are your documents', 'hi'), '<hi>Here are your documents')
+        self.assertTrue(CachedTranslation.objects.filter(language='hi').exists())
+
+    def test_user_messages_are_only_kept_in_memory(self):
+        self.assertEqual(machine_translate('मुझे नोट्स भेजो', 'en', store=False), '<en>मुझे नोट्स भेजो')
+        self.assertFalse(CachedTranslation.objects.exists())
+        machine_translate('मुझे नोट्स भेजो', 'en', store=False)
+        self.assertEqual(self.translator.translate.call_count, 1)
+
+    @override_settings(TRANSLATION_CACHE_MAX_AGE=90)
+    def test_purge_expired(self):
+        machine_translate('Old response', 'hi')
+        machine_translate('New response', 'hi')
+        CachedTranslation.objects.create(source_hash='x', language='hi', source_text='Hello',
+                                         translated_text='नमस्ते', origin=CachedTranslation.ORIGIN_DICTIONARY)
+        CachedTranslation.objects.filter(source_text__in=['Old response', 'Hello']).update(
+            created_at=timezone.now() - timedelta(days=91))
+
+        self.assertEqual(translation_cache.purge_expired(), 1)
+        self.assertCountEqual(CachedTranslation.objects.values_list('source_text', flat=True),
+                              ['New response', 'Hello'])
+
+
+class FullTextSearchTests(MediaTestCase):
+
+    def test_contentless_table_follows_document_changes(self):
+        document = self.make_document('Greedy', text='greedy algorithms')
+        self.assertEqual(fts.search_document_ids('greedy'), [document.id])
+
+        document.extracted_text = 'dynamic programming'
+        document.title = 'Dynamic'
+        document.save()
+        self.assertEqual(fts.search_document_ids('greedy'), [])
+        self.assertEqual(fts.search_document_ids('dynamic programming'), [document.id])
+
+        document.delete()
+        self.assertEqual(fts.search_document_ids('dynamic'), [])
+
+    def test_text_is_not_copied_into_the_index(self):
+        document = self.make_document('Greedy', text='greedy algorithms')
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT extracted_text FROM {fts.FTS_TABLE} WHERE rowid = %s", [document.id])
+            self.assertEqual(cursor.fetchone(), (None,))
+
+    def test_rebuild(self):
+        document = self.make_document('Greedy', text='greedy algorithms')
+        fts.rebuild()
+        fts.rebuild()
+        self.assertEqual(fts.search_document_ids('greedy'), [document.id])
+
+
+class PhraseTranslatorTests(TestCase):
+
+    def setUp(self):
+        self.translator = PhraseTranslator({
+            'for': 'के लिए', 'Physics': 'भौतिक विज्ञान', 'thank you': 'धन्यवाद', 'unit': 'यूनिट',
+        })
+
+    def test_single_words_are_not_replaced_inside_sentences(self):
+        self.assertEqual(self.translator.translate('I found these documents for you'),
+                         'I found these documents for you')
+
+    def test_single_word_as_the_whole_text(self):
+        self.assertEqual(self.translator.translate('physics'), 'भौतिक विज्ञान')
+        self.assertEqual(self.translator.translate(' Physics:'), ' भौतिक विज्ञान:')
+
+    def test_phrases_inside_sentences_are_not_replaced(self):
+        self.assertEqual(self.translator.translate('Thank you for asking!'), 'Thank you for asking!')
+        self.assertEqual(self.translator.translate('information'), 'information')
+
+    def test_text_covered_by_phrases(self):
+        self.assertEqual(self.translator.translate('Thank you!'), 'धन्यवाद!')
+        self.assertEqual(self.translator.translate('Thank you, {0}!'), 'धन्यवाद, {0}!')
+
+    @override_settings(TRANSLATION_API_ENABLED=False)
+    def test_responses_are_not_half_translated(self):
+        translation_cache.clear()
+        response = ChatResponse('Your attendance in {subject} is {percentage}%.', subject='DAA', percentage=80)
+        self.assertEqual(response.render('hi'), 'Your attendance in DAA is 80%.')
+        response = ChatResponse('Thank you! I need help with {subject}.', subject='DAA')
+        self.assertEqual(response.render('hi'), 'Thank you! I need help with DAA.')
+
+
+class ChatResponseTests(TestCase):
+    """Translation of response templates, with translate_text stubbed by a table"""
+
+    def translate(self, translations):
+        def translate_text(text, language):
+            self.sent.append(text)
+            return translations.get(text, text)
+        self.sent = []
+        return mock.patch('chatbot.responses.translate_text', side_effect=translate_text)
+
+    def test_placeholders_are_numbered_and_filled_in(self):
+        with self.translate({'Your attendance in {0} is {1}%.': '{0} में आपकी उपस्थिति {1}% है।'}):
+            text = ChatResponse('Your attendance in {subject} is {percentage}%.', subject='DAA', percentage=80).render('hi')
+        self.assertEqual(self.sent, ['Your attendance in {0} is {1}%.'])
+        self.assertEqual(text, 'DAA में आपकी उपस्थिति 80% है।')
+
+    def test_reordered_placeholders(self):
+        with self.translate({'{0} teaches {1}': '{1} को {0} पढ़ाते हैं'}):
+            text = ChatResponse('{faculty} teaches {subject}', faculty='Dr. Shah', subject='DAA').render('hi')
+        self.assertEqual(text, 'DAA को Dr. Shah पढ़ाते हैं')
+
+    def test_lost_placeholder_translates_piece_by_piece(self):
+        with self.translate({
+            'Your attendance in {0} is {1}%.': 'आपकी उपस्थिति {0} है।',
+            'Your attendance in': 'आपकी उपस्थिति',
+            'is': 'है',
+        }):
+            text = ChatResponse('Your attendance in {subject} is {percentage}%.', subject='DAA', percentage=80).render('hi')
+        self.assertEqual(self.sent, ['Your attendance in {0} is {1}%.', 'Your attendance in', 'is', '%.'])
+        self.assertEqual(text, 'आपकी उपस्थिति DAA है 80%.')
+
+    def test_format_specs_survive_translation(self):
+        with self.translate({'Attendance: {0}%': 'उपस्थिति: {0}%'}):
+            text = ChatResponse('Attendance: {percentage:.1f}%', percentage=82.456).render('hi')
+        self.assertEqual(text, 'उपस्थिति: 82.5%')
+
+    def test_outer_whitespace_is_kept_line_by_line(self):
+        with self.translate({'Faculty:': 'फैकल्टी:', 'Subject:': 'विषय:'}):
+            text = ChatResponse('\n  Faculty: \n\tSubject:\n').render('hi')
+        self.assertEqual(self.sent, ['Faculty:', 'Subject:'])
+        self.assertEqual(text, '\n  फैकल्टी: \n\tविषय:\n')
+
+    def test_literals_are_not_translated(self):
+        link = "<a href='/download/1/?t=a%20b'>Unit {2} notes</a>  \n"
+        with self.translate({'Here are your notes:': 'ये रहे आपके नोट्स:'}):
+            text = ChatResponse('Here are your notes:').literal(link).render('hi')
+        self.assertEqual(self.sent, ['Here are your notes:'])
+        self.assertEqual(text, 'ये रहे आपके नोट्स:' + link)
+
+
+class ProcessMessageTests(TestCase):
+    """The chat endpoint, with the intent fixed so no model is needed"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('student1', password='x')
+        self.client.force_login(self.user)
+        classify = mock.patch('chatbot.pipeline.classify_intent', return_value=Intent('attendance_query', 0.9))
+        classify.start()
+        self.addCleanup(classify.stop)
+
+    def post(self, **data):
+        return self.client.post(reverse('process_message'), {'message': 'my attendance', **data})
+
+    def test_server_timing_lists_every_stage(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        metrics = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(metrics, ['detect', 'normalize', 'classify', 'resolve_student',
+                                   'handle', 'translate', 'render', 'total'])
+        self.assertEqual(metrics[:-1], [name for name, stage in STAGES])
+
+    def test_debug_info_is_for_staff_only(self):
+        self.assertNotIn('debug', self.post(debug='1').json())
+
+        self.user.is_staff = True
+        self.user.save()
+        debug = self.post(debug='1').json()['debug']
+        self.assertEqual(debug['intent'], 'attendance_query')
+        self.assertEqual(debug['language'], 'en')
+        self.assertEqual(list(debug['timings_ms']), [name for name, stage in STAGES])
+
+    def test_handler_needing_a_student_without_a_profile(self):
+        self.assertEqual(self.post().json()['response'],
+                         "I couldn't find your student profile. Please contact administration.")
+
+
+class IntentClassifierTests(TestCase):
+    """The model fitted on data/intent_samples.json"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.classifier = IntentClassifier()
+        cls.classifier.train(*load_samples())
+
+    def test_notes_for_an_exam_are_a_document_request(self):
+        for message in ['exam notes', 'notes for the end sem exam', 'exam notes for daa']:
+            self.assertEqual(self.classifier.classify(message).intent, 'document_request', message)
+        self.assertEqual(self.classifier.classify('exam schedule').intent, 'academic_calendar')
+
+    def test_unrelated_messages_fall_back(self):
+        self.assertEqual(self.classifier.min_confidence, 0.25)
+        for message in ['tell me a joke', 'lorem ipsum dolor sit amet', 'banana']:
+            self.assertEqual(self.classifier.classify(message).intent, FALLBACK_INTENT, message)
+            # No intent with a handler of its own is likely enough to be used
+            probabilities = self.classifier.probabilities(message)
+            del probabilities[FALLBACK_INTENT]
+            self.assertLess(max(probabilities.values()), self.classifier.min_confidence, message)
+
+
+class LanguageDetectionTests(TestCase):
+
+    def test_labelled_samples(self):
+        with open(os.path.join(os.path.dirname(__file__), 'data', 'language_samples.json'), encoding='utf-8') as f:
+            samples = json.load(f)
+        detected = [(sample['text'], analyze_language(sample['text']).language) for sample in samples]
+        self.assertEqual(detected, [(sample['text'], sample['language']) for sample in samples])
+
+    def test_romanized_messages_left_to_langdetect(self):
+        # Not used to choose the marker words; one marker each is too few to
+        # settle them without langdetect
+        messages = {
+            'sir kab aayenge': 'hi',
+            'result kab aayega': 'hi',
+            'library kitne baje khulti': 'hi',
+            'exam kyare': 'gu',
+            'fees ketli': 'gu',
+            'holiday list joiye': 'gu',
+        }
+        for message, language in messages.items():
+            self.assertEqual(analyze_language(message), (language, 'latin', 'langdetect'), message)
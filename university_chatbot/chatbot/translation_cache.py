@@ -0,0 +1,108 @@
+# chatbot/translation_cache.py
+
+# Two-level cache of machine translations: an in-process LRU in front of
+# the CachedTranslation table, so a fixed response string is sent to the
+# translation API once rather than on every request
+import hashlib
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .search_cache import SearchResultCache
+
+
+def source_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """
+    get() looks in memory, then in the database; put() stores in both.
+    With store=False only the bounded in-process level is used, for text
+    that should not be kept (users' own messages). Counters record where
+    lookups were answered.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.memory = SearchResultCache(maxsize)
+        self._lock = threading.Lock()
+        self.db_hits = 0
+        self.misses = 0
+
+    def get(self, text, language, store=True):
+        from .models import CachedTranslation
+        key = (source_hash(text), language)
+        translated = self.memory.get(key)
+        if translated is not None or not store:
+            return translated
+        translated = (
+            CachedTranslation.objects
+            .filter(source_hash=key[0], language=language)
+            .values_list('translated_text', flat=True)
+            .first()
+        )
+        with self._lock:
+            if translated is None:
+                self.misses += 1
+            else:
+                self.db_hits += 1
+        if translated is not None:
+            self.memory.put(key, translated)
+        return translated
+
+    def put(self, text, language, translated, origin='api', store=True):
+        from .models import CachedTranslation
+        key = (source_hash(text), language)
+        if not store:
+            self.memory.put(key, translated)
+            return
+        # Another worker may have stored the same text meanwhile
+        CachedTranslation.objects.bulk_create([
+            CachedTranslation(
+                source_hash=key[0], language=language, source_text=text,
+                translated_text=translated, origin=origin,
+            )
+        ], ignore_conflicts=True)
+        self.memory.put(key, translated)
+
+    def purge_expired(self):
+        """
+        Delete translations fetched from the API more than
+        TRANSLATION_CACHE_MAX_AGE days ago (the hand-written dictionary
+        phrases are kept); returns the number of rows deleted
+        """
+        from .models import CachedTranslation
+        max_age = getattr(settings, 'TRANSLATION_CACHE_MAX_AGE', 90)
+        if max_age is None:
+            return 0
+        deleted, _ = CachedTranslation.objects.filter(
+            origin=CachedTranslation.ORIGIN_API,
+            created_at__lt=timezone.now() - timedelta(days=max_age),
+        ).delete()
+        return deleted
+
+    def clear(self):
+        """Empty the in-process level and reset the counters"""
+        self.memory.clear()
+        with self._lock:
+            self.db_hits = 0
+            self.misses = 0
+
+    def stats(self):
+        memory = self.memory.stats()
+        with self._lock:
+            lookups = memory['hits'] + self.db_hits + self.misses
+            return {
+                'memory_hits': memory['hits'],
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'hit_rate': round((memory['hits'] + self.db_hits) / lookups, 4) if lookups else 0.0,
+                'memory_size': memory['size'],
+                'memory_maxsize': memory['maxsize'],
+            }
+
+
+# Shared cache used by utils.translate_text
+translation_cache = TranslationCache(getattr(settings, 'TRANSLATION_CACHE_SIZE', 4096))
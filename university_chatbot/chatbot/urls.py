@@ -11,9 +11,13 @@ urlpatterns = [
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('set-language/', views.set_language, name='set_language'),
     path('process-message/', views.process_message, name='process_message'),
+    path('search-documents/', views.search_documents_api, name='search_documents_api'),
+    path('search-cache-stats/', views.search_cache_stats, name='search_cache_stats'),
+    path('translation-cache-stats/', views.translation_cache_stats, name='translation_cache_stats'),
     path('delete-document/<int:document_id>/', views.delete_document, name='delete_document'),
     path('delete-faq/<int:faq_id>/', views.delete_faq, name='delete_faq'),
     path('download-document/<int:document_id>/', views.download_document, name='download_document'),
+    path('d/<str:token>/', views.signed_download, name='signed_download'),
     path('logout/', views.logout_view, name='logout'),
 ]
 
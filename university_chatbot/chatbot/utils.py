@@ -2,11 +2,15 @@
 
 # Enhanced translation and language detection
 from googletrans import Translator
-from langdetect import detect, DetectorFactory
 import logging
 import re  # Add this import
-# Set seed for consistent language detection
-DetectorFactory.seed = 0
+
+from django.conf import settings
+
+from .intent import classify_intent
+from .language import detect_language  # noqa: F401 (shared detector, kept importable from utils)
+from .phrase_translator import PhraseTranslator
+from .translation_cache import translation_cache
 
 # Initialize translator
 translator = Translator()
@@ -177,43 +181,32 @@ translation_dict = {
     }
 }
 
-def detect_language(text):
+# translation_dict compiled for the offline fallback, one matcher per language
+phrase_translators = {
+    language: PhraseTranslator(phrases)
+    for language, phrases in translation_dict['en'].items()
+}
+
+class TranslationUnavailable(Exception):
+    """Raised by machine_translate when TRANSLATION_API_ENABLED is off"""
+
+def machine_translate(text, dest_language, store=True):
     """
-    Improved language detection that handles mixed language text
+    Translate with the Google Translate API, through the translation cache.
+    Errors from the API are raised. With store=False (for users' messages)
+    the translation is only remembered in this worker's memory, never in
+    the database.
     """
-    if not text or not isinstance(text, str):
-        return 'en'
+    # Fixed responses repeat constantly, so translations are cached
+    cached = translation_cache.get(text, dest_language, store=store)
+    if cached is not None:
+        return cached
     
-    try:
-        # First try langdetect
-        lang_code = detect(text)
-        
-        # Validate if it's one of our supported languages
-        if lang_code in ['en', 'hi', 'gu']:
-            return lang_code
-            
-        # Fallback to character-based detection
-        hindi_chars = sum(1 for char in text if '\u0900' <= char <= '\u097F')
-        gujarati_chars = sum(1 for char in text if '\u0A80' <= char <= '\u0AFF')
-        
-        if hindi_chars > 1:
-            return 'hi'
-        elif gujarati_chars > 1:
-            return 'gu'
-        else:
-            return 'en'
-            
-    except Exception as e:
-        # Fallback to character-based detection
-        hindi_chars = sum(1 for char in text if '\u0900' <= char <= '\u097F')
-        gujarati_chars = sum(1 for char in text if '\u0A80' <= char <= '\u0AFF')
-        
-        if hindi_chars > 1:
-            return 'hi'
-        elif gujarati_chars > 1:
-            return 'gu'
-        else:
-            return 'en'
+    if not getattr(settings, 'TRANSLATION_API_ENABLED', True):
+        raise TranslationUnavailable("The translation API is disabled")
+    translation = translator.translate(text, dest=dest_language)
+    translation_cache.put(text, dest_language, translation.text, store=store)
+    return translation.text
 
 def translate_text(text, dest_language='en'):
     """
@@ -223,38 +216,24 @@ def translate_text(text, dest_language='en'):
         return text
     
     try:
-        # Use googletrans for better translation
-        translation = translator.translate(text, dest=dest_language)
-        return translation.text
+        return machine_translate(text, dest_language)
+    except TranslationUnavailable:
+        return translate_text_fallback(text, dest_language)
     except Exception as e:
-        # Fallback to dictionary-based translation
+        # Fallback to dictionary-based translation; its results are not
+        # cached, so the API is tried again next time
         print(f"Translation API error: {e}, falling back to dictionary")
         return translate_text_fallback(text, dest_language)
 
 def translate_text_fallback(text, dest_language='en'):
     """
-    Fallback translation using dictionary
+    Fallback translation using dictionary: the longest known phrases are
+    replaced and anything else is left in English
     """
-    if dest_language == 'en':
+    if dest_language == 'en' or dest_language not in phrase_translators:
         return text
     
-    try:
-        # Try to translate the whole text
-        if text in translation_dict['en'][dest_language]:
-            return translation_dict['en'][dest_language][text]
-        
-        # If not found, try to translate individual words
-        words = text.split()
-        translated_words = []
-        for word in words:
-            if word in translation_dict['en'][dest_language]:
-                translated_words.append(translation_dict['en'][dest_language][word])
-            else:
-                translated_words.append(word)
-        
-        return ' '.join(translated_words)
-    except:
-        return text  # Return original text if translation fails
+    return phrase_translators[dest_language].translate(text)
     
 
 # Add these imports at the top of utils.py
@@ -264,6 +243,18 @@ import numpy as np
 
 # Add these functions at the end of utils.py
 
+def top_k_indices(scores, k):
+    """
+    Indices of the k highest scores in each row of a 2-D array, best first.
+    Uses argpartition so only the k winners per row are fully sorted.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=int)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
 def calculate_similarity(text1, text2):
     """
     Calculate similarity between two texts using TF-IDF
@@ -276,22 +267,66 @@ def calculate_similarity(text1, text2):
         print(f"Similarity calculation error: {e}")
         return 0
 
+def document_search_text(doc):
+    """
+    Build the text a document is matched on
+    """
+    # Use extracted text if available, otherwise use metadata
+    if getattr(doc, 'extracted_text', None):
+        doc_text = f"{doc.title} {doc.subject} {doc.extracted_text}"
+    else:
+        doc_text = f"{doc.title} {doc.subject} {doc.description} {doc.doc_type}"
+    
+    if doc.unit:
+        doc_text += f" unit {doc.unit}"
+    return doc_text
+
+def make_snippet(text, query, width=160):
+    """
+    Return a short excerpt of text around the first query word it contains
+    """
+    text = ' '.join(text.split())
+    lower_text = text.lower()
+    start = 0
+    for word in re.findall(r'\w+', query.lower()):
+        if len(word) < 3:
+            continue
+        position = lower_text.find(word)
+        if position != -1:
+            start = max(0, position - width // 4)
+            break
+    snippet = text[start:start + width]
+    if start > 0:
+        snippet = '…' + snippet
+    if start + width < len(text):
+        snippet += '…'
+    return snippet
+
+# Words that point a general question at one FAQ category
+FAQ_CATEGORY_KEYWORDS = {
+    'admission': ['admission', 'admit', 'apply', 'eligibility', 'enrol', 'enroll'],
+    'examination': ['exam', 'examination', 'result', 'hall ticket', 'revaluation', 'backlog'],
+    'scholarship': ['scholarship', 'stipend', 'fee waiver', 'freeship'],
+    'hostel': ['hostel', 'mess', 'warden', 'room'],
+}
+
+def guess_faq_category(query):
+    """
+    Return the FAQ category a query is clearly about, or None
+    """
+    query = query.lower()
+    matches = [
+        category for category, keywords in FAQ_CATEGORY_KEYWORDS.items()
+        if any(keyword in query for keyword in keywords)
+    ]
+    return matches[0] if len(matches) == 1 else None
+
 def enhanced_document_search(query, documents):
     """
     Use TF-IDF and cosine similarity for better document matching
     """
     # Prepare document texts for similarity comparison
-    doc_texts = []
-    for doc in documents:
-        # Use extracted text if available, otherwise use metadata
-        if hasattr(doc, 'extracted_text') and doc.extracted_text:
-            doc_text = f"{doc.title} {doc.subject} {doc.extracted_text}"
-        else:
-            doc_text = f"{doc.title} {doc.subject} {doc.description} {doc.doc_type}"
-        
-        if doc.unit:
-            doc_text += f" unit {doc.unit}"
-        doc_texts.append(doc_text)
+    doc_texts = [document_search_text(doc) for doc in documents]
     
     # Add the query to the corpus
     all_texts = doc_texts + [query]
@@ -304,8 +339,8 @@ def enhanced_document_search(query, documents):
         # Calculate cosine similarity between query and documents
         cosine_similarities = cosine_similarity(tfidf_matrix[-1], tfidf_matrix[:-1])
         
-        # Get indices of documents sorted by similarity
-        similar_indices = cosine_similarities.argsort()[0][-5:][::-1]  # Top 5 matches
+        # Get indices of the most similar documents
+        similar_indices = top_k_indices(cosine_similarities, 5)[0]  # Top 5 matches
         
         # Return the most relevant documents
         relevant_docs = []
@@ -320,46 +355,7 @@ def enhanced_document_search(query, documents):
 
 def understand_query(query):
     """
-    Enhanced query understanding with NLP
+    Intent of a chat message, from the trained intent classifier
+    (see chatbot.intent); 'general' when no intent is likely enough
     """
-    query = query.lower()
-    
-    # Define patterns for different types of queries
-    patterns = {
-        'document_request': [
-            r'(send|give|provide|get|need|want|chahiye|joiye).*(ppt|notes|pdf|document|file|syllabus|assignment)',
-            r'(ppt|notes|pdf|document|file|syllabus|assignment).*(send|give|provide|get|need|want|chahiye|joiye)',
-            r'(unit|chapter).*\d+',
-        ],
-        'attendance_query': [
-            r'attendance|haziri|upasthiti|kitna|percentage|%',
-            r'how many.*class|kitni.*class',
-        ],
-        'timetable_query': [
-            r'(timetable|schedule|time table|samay|vartaman)',
-            r'(current|now|abhi|aj).*(class|lecture|period)',
-        ],
-        'faculty_query': [
-            r'(faculty|teacher|professor|sir|maam|madam)',
-            r'(email|contact|phone|number)',
-            r'(schedule|timing|office hours)',
-        ],
-        'current_lecture': [
-            r'(current|now|abhi).*(lecture|class|period)',
-            r'which.*(lecture|class).*now',
-        ],
-        'academic_calendar': [
-            r'(calendar|academic calendar|holiday|vacation|exam)',
-        ]
-    }
-    
-    # Check which pattern matches
-    for query_type, pattern_list in patterns.items():
-        for pattern in pattern_list:
-            try:
-                if re.search(pattern, query, re.IGNORECASE):
-                    return query_type
-            except:
-                continue
-                
-    return 'general'
\ No newline at end of file
+    return classify_intent(query).intent
@@ -1,26 +1,33 @@
 # chatbot/views.py
 # In views.py, update the import line
-from .utils import (
-    translate_text, 
-    detect_language, 
-    calculate_similarity, 
-    enhanced_document_search,
-    understand_query
-)
+from .utils import translate_text, make_snippet
 from django.conf import settings
+from django.core import signing
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.crypto import constant_time_compare
+from django.utils.html import escape
 from django.utils.translation import activate, get_language
-from django.core.files.storage import FileSystemStorage
-from .models import Document, FAQ, AttendanceRecord, Timetable, Student,Lecture
-from .forms import DocumentForm, FAQForm
-from .utils import translate_text
+from django.core.files.storage import FileSystemStorage, default_storage
+from .models import Document, FAQ, AttendanceRecord, Timetable, Lecture, BackgroundJob
+from .forms import BulkUploadForm, DocumentForm, FAQForm
+from .jobs import enqueue_job
+from .content_translation import localized_text
+from .language import analyze_language, script_counts
+from .entities import match_subject
+from .downloads import is_document_active, read_download_token, serve_file, signed_download_url
+from .pipeline import intent_handler, run_pipeline
+from .responses import ChatResponse
+from .search import find_faq, search_documents, search_documents_batch, search_passages
+from .search_cache import result_cache
+from .translation_cache import translation_cache
 import json
 import os
-import re
 from datetime import datetime, timedelta
 
 # Add the home view at the top
@@ -77,6 +84,9 @@ def is_admin(user):
 def admin_dashboard(request):
     documents = Document.objects.all().order_by('-uploaded_at')
     faqs = FAQ.objects.all()
+    form = DocumentForm()
+    faq_form = FAQForm()
+    bulk_form = BulkUploadForm()
     
     if request.method == 'POST':
         # Handle document upload
@@ -86,21 +96,30 @@ def admin_dashboard(request):
                 document = form.save(commit=False)
                 document.save()
                 return redirect('admin_dashboard')
+        # Handle bulk upload; the archive is loaded by the background worker
+        elif 'bulk_upload' in request.POST:
+            bulk_form = BulkUploadForm(request.POST, request.FILES)
+            if bulk_form.is_valid():
+                archive = default_storage.save(f"imports/{bulk_form.cleaned_data['archive'].name}", bulk_form.cleaned_data['archive'])
+                manifest = None
+                if bulk_form.cleaned_data['manifest']:
+                    manifest = default_storage.save(f"imports/{bulk_form.cleaned_data['manifest'].name}", bulk_form.cleaned_data['manifest'])
+                enqueue_job('ingest_archive', archive=archive, manifest=manifest, user_id=request.user.id)
+                return redirect('admin_dashboard')
         # Handle FAQ creation
         elif 'add_faq' in request.POST:
             faq_form = FAQForm(request.POST)
             if faq_form.is_valid():
                 faq_form.save()
                 return redirect('admin_dashboard')
-    else:
-        form = DocumentForm()
-        faq_form = FAQForm()
     
     return render(request, 'chatbot/admin_dashboard.html', {
         'documents': documents,
         'faqs': faqs,
         'form': form,
         'faq_form': faq_form,
+        'bulk_form': bulk_form,
+        'bulk_uploads': BackgroundJob.objects.filter(kind='ingest_archive').order_by('-created_at')[:5],
     })
 
 @login_required
@@ -121,6 +140,18 @@ def delete_faq(request, faq_id):
         return redirect('admin_dashboard')
     return redirect('admin_dashboard')
 
+@login_required
+@user_passes_test(is_admin)
+def search_cache_stats(request):
+    """Hit/miss counters of this worker's search result cache"""
+    return JsonResponse(result_cache.stats())
+
+@login_required
+@user_passes_test(is_admin)
+def translation_cache_stats(request):
+    """Hit counters of this worker's translation cache"""
+    return JsonResponse(translation_cache.stats())
+
 @login_required
 def download_document(request, document_id):
     document = get_object_or_404(Document, id=document_id)
@@ -130,39 +161,41 @@ def download_document(request, document_id):
         return HttpResponse("File not found. Please contact administrator.", status=404)
     
     try:
-        # Serve the file for download
-        response = HttpResponse(document.file, content_type='application/octet-stream')
-        response['Content-Disposition'] = f'attachment; filename="{document.filename()}"'
-        return response
+        # Serve the file for download, or inline so page links (#page=N) open in the browser viewer
+        return serve_file(
+            request, document.file.storage, document.file.name, document.filename(),
+            inline=bool(request.GET.get('inline')), content_hash=document.content_hash,
+        )
     except Exception as e:
         return HttpResponse(f"Error downloading file: {str(e)}", status=500)
 
-def detect_language(text):
+def signed_download(request, token):
     """
-    Improved language detection that handles mixed language text
+    Serve a file named by a signed download token. Neither the session nor
+    the database is touched (active documents are checked against a list
+    reloaded once a minute), so the download spike before exams does not
+    load either.
     """
-    if not text or not isinstance(text, str):
-        return 'en'
-    
-    text = text.lower()
-    
-    # Count Hindi characters (Devanagari Unicode block)
-    hindi_chars = sum(1 for char in text if '\u0900' <= char <= '\u097F')
-    # Count Gujarati characters (Gujarati Unicode block)
-    gujarati_chars = sum(1 for char in text if '\u0A80' <= char <= '\u0AFF')
-    # Count English letters
-    english_chars = sum(1 for char in text if 'a' <= char <= 'z')
+    try:
+        payload = read_download_token(token)
+    except signing.SignatureExpired:
+        return HttpResponse("This download link has expired. Please ask the chatbot again.", status=410)
+    except signing.BadSignature:
+        return HttpResponse("Invalid download link.", status=403)
     
-    total_chars = len(text)
+    # Links stay valid for a while after they are handed out; a document
+    # deactivated (or deleted) since then is no longer served
+    if not is_document_active(payload.get('d')):
+        return HttpResponse("This document is no longer available.", status=404)
     
-    # If significant Hindi characters found, treat as Hindi
-    if hindi_chars > 0 and (hindi_chars / total_chars > 0.1 or hindi_chars >= 2):
-        return 'hi'
-    # If significant Gujarati characters found, treat as Gujarati
-    elif gujarati_chars > 0 and (gujarati_chars / total_chars > 0.1 or gujarati_chars >= 2):
-        return 'gu'
-    else:
-        return 'en'
+    try:
+        # Whether the file opens in the browser is part of the signed link
+        return serve_file(
+            request, default_storage, payload['f'], payload['n'],
+            inline=bool(payload.get('i')), content_hash=payload['h'],
+        )
+    except FileNotFoundError:
+        return HttpResponse("File not found. Please contact administrator.", status=404)
 
 def extract_english_keywords(text):
     """
@@ -192,144 +225,6 @@ def extract_english_keywords(text):
     
     return ' '.join(english_words)
 
-def translate_to_english(text, source_language):
-    """
-    Translate Hindi and Gujarati academic terms to English
-    """
-    if source_language == 'hi':
-        # Hindi to English translation
-        hindi_to_english = {
-            'chahiye': 'need', 'mujhe': 'i', 'mein': 'in', 'ka': 'of', 'ki': 'of',
-            'notes': 'notes', 'ppt': 'ppt', 'syllabus': 'syllabus', 'book': 'book',
-            'assignment': 'assignment', 'project': 'project', 'report': 'report',
-            'unit': 'unit', 'chapter': 'chapter', 'lecture': 'lecture', 'class': 'class',
-            'myjhe': 'i', 'chaihye': 'need', 'chahiye': 'need', 'mujhe': 'i',
-            'unit1': '1', 'unit2': '2', 'unit3': '3', 'unit4': '4', 'unit5': '5',
-            'unit6': '6', 'unit7': '7', 'unit8': '8', 'unit9': '9', 'unit10': '10',
-            'ek': '1', 'do': '2', 'teen': '3', 'char': '4', 'panch': '5',
-            'che': '6', 'saat': '7', 'aath': '8', 'nau': '9', 'das': '10',
-            'pustak': 'book', 'kaksha': 'class', 'path': 'chapter', 'prashn': 'question'
-        }
-        translation_dict = hindi_to_english
-    
-    elif source_language == 'gu':
-        # Gujarati to English translation
-        gujarati_to_english = {
-            'joiye': 'need', 'mane': 'i', 'ma': 'in', 'no': 'of', 'ni': 'of',
-            'notes': 'notes', 'ppt': 'ppt', 'syllabus': 'syllabus', 'pustak': 'book',
-            'assignment': 'assignment', 'project': 'project', 'report': 'report',
-            'unit': 'unit', 'chapter': 'chapter', 'lecture': 'lecture', 'class': 'class',
-            'mane': 'i', 'joiye': 'need', 'jaroor': 'need',
-            'unit1': '1', 'unit2': '2', 'unit3': '3', 'unit4': '4', 'unit5': '5',
-            'unit6': '6', 'unit7': '7', 'unit8': '8', 'unit9': '9', 'unit10': '10',
-            'ek': '1', 'be': '2', 'tran': '3', 'char': '4', 'panch': '5',
-            'cha': '6', 'sat': '7', 'aath': '8', 'nav': '9', 'das': '10',
-            'pustak': 'book', 'kaksha': 'class', 'prakaran': 'chapter', 'prashna': 'question'
-        }
-        translation_dict = gujarati_to_english
-    
-    else:
-        return text.lower()
-    
-    translated_words = []
-    for word in text.split():
-        lower_word = word.lower()
-        if lower_word in translation_dict:
-            translated_words.append(translation_dict[lower_word])
-        else:
-            # Keep English words, numbers, and subject names as they are
-            if (any('a' <= char <= 'z' for char in lower_word) or 
-                any('0' <= char <= '9' for char in lower_word) or
-                len(lower_word) > 2):  # Assume longer words might be subject names
-                translated_words.append(lower_word)
-    
-    return ' '.join(translated_words)
-
-def search_documents_logical(query, documents):
-    """
-    Logical document search that follows subject -> unit -> type hierarchy
-    """
-    query = query.lower()
-    query_words = query.split()
-    
-    # Get all available subjects from the database (dynamic)
-    available_subjects = list(Document.objects.values_list('subject', flat=True).distinct())
-    available_subjects_lower = [subject.lower() for subject in available_subjects]
-    
-    # Extract requested subject (check against available subjects)
-    requested_subject = None
-    for word in query_words:
-        if word in available_subjects_lower:
-            requested_subject = available_subjects[available_subjects_lower.index(word)]
-            break
-    
-    # If no exact subject match, try partial matches
-    if not requested_subject:
-        for subject in available_subjects:
-            subject_lower = subject.lower()
-            # Check if any query word is in the subject name
-            if any(word in subject_lower for word in query_words if len(word) > 3):
-                requested_subject = subject
-                break
-    
-    # Extract requested unit
-    requested_unit = None
-    for word in query_words:
-        if word.isdigit():
-            requested_unit = int(word)
-            break
-    
-    # Extract requested document type
-    requested_type = None
-    doc_types = {
-        'ppt': 'ppt', 'powerpoint': 'ppt', 'presentation': 'ppt',
-        'notes': 'notes', 'note': 'notes',
-        'syllabus': 'syllabus', 'syllabi': 'syllabus',
-        'assignment': 'assignment', 'assignments': 'assignment',
-        'circular': 'circular', 'circulars': 'circular',
-        'question': 'question_paper', 'paper': 'question_paper', 'exam': 'question_paper'
-    }
-    
-    for word in query_words:
-        if word in doc_types:
-            requested_type = doc_types[word]
-            break
-    
-    # Filter documents step by step
-    filtered_docs = documents
-    
-    # Step 1: Filter by subject (if requested)
-    if requested_subject:
-        subject_docs = [doc for doc in filtered_docs if doc.subject.lower() == requested_subject.lower()]
-        if not subject_docs:
-            return []  # No documents for this subject
-        filtered_docs = subject_docs
-    else:
-        # If subject was requested but not found, return empty
-        # Check if user was trying to ask for a specific subject
-        subject_keywords = ['se', 'daa', 'dvd', 'ep', 'toc', 'aws', 'pce', 'software', 'engineering', 
-                           'design', 'algorithm', 'data', 'visualization', 'analytics', 
-                           'enterprise', 'programming', 'theory', 'computation', 'professionalism', 'corporate', 'ethics']
-        
-        if any(keyword in query for keyword in subject_keywords):
-            # User was asking for a subject but we couldn't match it exactly
-            return []
-    
-    # Step 2: Filter by unit (if requested)
-    if requested_unit is not None:
-        unit_docs = [doc for doc in filtered_docs if doc.unit == requested_unit]
-        if not unit_docs:
-            return []  # No documents for this unit
-        filtered_docs = unit_docs
-    
-    # Step 3: Filter by document type (if requested)
-    if requested_type:
-        type_docs = [doc for doc in filtered_docs if doc.doc_type == requested_type]
-        if not type_docs:
-            return []  # No documents of this type
-        filtered_docs = type_docs
-    
-    return filtered_docs
 
 def get_file_icon(doc_type):
     """Return appropriate icon for file type"""
@@ -343,17 +238,17 @@ def get_file_icon(doc_type):
     }
     return icons.get(doc_type, '📄')
 
+def get_passage_link(passage):
+    """Download link that opens a PDF at the matching page"""
+    document = passage.document
+    if document.extension() == '.pdf':
+        return signed_download_url(document, inline=True, page=passage.number)
+    return signed_download_url(document)
+
 def get_available_subjects():
     """Get all available subjects from the database"""
     return list(Document.objects.values_list('subject', flat=True).distinct())
 
-# Add this function to get the current student
-def get_current_student(user):
-    try:
-        return Student.objects.get(user=user)
-    except Student.DoesNotExist:
-        return None
-
 # Add this function to get current lecture
 # Fix the get_current_lecture function
 def get_current_lecture(student):
@@ -383,8 +278,9 @@ def get_current_lecture(student):
 
 # Add this function to calculate attendance projection
 def calculate_attendance_projection(current_percentage, target_percentage, total_classes, attended_classes):
+    """Classes still needed to reach a target, and a ChatResponse saying so"""
     if current_percentage >= target_percentage:
-        return 0, "You have already achieved your target attendance!"
+        return 0, ChatResponse("You have already achieved your target attendance!")
     
     # Calculate how many more classes need to be attended to reach target
     # Formula: (attended + x) / (total + x) = target/100
@@ -393,15 +289,18 @@ def calculate_attendance_projection(current_percentage, target_percentage, total
     if target_percentage == 100:
         # Special case for 100% target
         needed = total_classes - attended_classes
-        return needed, f"You need to attend all remaining {needed} classes to reach 100% attendance."
+        return needed, ChatResponse("You need to attend all remaining {needed} classes to reach 100% attendance.", needed=needed)
     
     x = (target_percentage * total_classes - 100 * attended_classes) / (100 - target_percentage)
     needed = max(0, round(x))
     
     if needed == 0:
-        return 0, "You're very close to your target! Just maintain your attendance."
+        return 0, ChatResponse("You're very close to your target! Just maintain your attendance.")
     
-    return needed, f"You need to attend {needed} more classes to reach {target_percentage}% attendance."
+    return needed, ChatResponse(
+        "You need to attend {needed} more classes to reach {target}% attendance.",
+        needed=needed, target=target_percentage,
+    )
 
 def get_remaining_classes(student, subject):
     """Calculate remaining classes for a subject based on timetable and academic calendar"""
@@ -475,13 +374,11 @@ def debug_language_detection(request):
     if request.method == 'POST':
         text = request.POST.get('text', '')
         
-        # Test all detection methods
-        detected_lang = detect_language(text)
+        detection = analyze_language(text)
+        detected_lang = detection.language
         
         # Count characters for each language
-        hindi_chars = sum(1 for char in text if '\u0900' <= char <= '\u097F')
-        gujarati_chars = sum(1 for char in text if '\u0A80' <= char <= '\u0AFF')
-        english_chars = sum(1 for char in text if 'a' <= char <= 'z' or 'A' <= char <= 'Z')
+        hindi_chars, gujarati_chars, english_chars = script_counts(text)
         total_chars = len(text)
         
         # Calculate percentages
@@ -491,7 +388,7 @@ def debug_language_detection(request):
         
         # Log the detection details for debugging
         print(f"Text: {text}")
-        print(f"Detected language: {detected_lang}")
+        print(f"Detected language: {detected_lang} (by {detection.method})")
         print(f"Hindi characters: {hindi_chars} ({hindi_percent:.1f}%)")
         print(f"Gujarati characters: {gujarati_chars} ({gujarati_percent:.1f}%)")
         print(f"English characters: {english_chars} ({english_percent:.1f}%)")
@@ -510,6 +407,7 @@ def debug_language_detection(request):
         return JsonResponse({
             'text': text,
             'detected_language': detected_lang,
+            'detection_method': detection.method,
             'hindi_chars': hindi_chars,
             'hindi_percent': round(hindi_percent, 1),
             'gujarati_chars': gujarati_chars,
@@ -650,331 +548,362 @@ def fuzzy_faculty_search(faculty_name, timetable_data):
     
     return faculty_schedule
 
-# Update the process_message function to include the new features
-@login_required
-def process_message(request):
-    if request.method == 'POST':
-        user_message = request.POST.get('message', '')
-        user_language = detect_language(user_message)
-        
-        # First, understand the query type
-        query_type = understand_query(user_message)
-        
-        # Translate non-English queries to English for processing
-        if user_language != 'en':
-            search_query = translate_text(user_message, 'en')
-        else:
-            search_query = user_message.lower()
-        
-        response_text = "I'm sorry, I didn't understand that. Could you rephrase?"
-        response_type = "text"
-        
-        # Get current student
-        student = get_current_student(request.user)
-        
-        # Process based on query type
-        if query_type == 'document_request':
-            # Use enhanced document search
-            documents = Document.objects.filter(is_active=True)
-            found_docs = enhanced_document_search(search_query, list(documents))
-            
-            if found_docs:
-                response_text = "I found these documents for you:\n"
-                for doc in found_docs[:5]:  # Limit to 5 results
-                    download_url = f"/download-document/{doc.id}/"
-                    icon = get_file_icon(doc.doc_type)
-                    unit_info = f" (Unit {doc.unit})" if doc.unit else ""
-                    response_text += f"- {icon} <a href='{download_url}' style='color: #3f51b5; text-decoration: none;' target='_blank'>{doc.title}{unit_info}</a>\n"
-                response_type = "html"
+
+# Chat messages go through the stages in chatbot.pipeline; the handlers
+# below answer one intent each
+@intent_handler('document_request')
+def handle_document_request(context):
+    """Links to the best matching documents, and to the best matching pages in them"""
+    search_query = context.search_query
+    user_language = context.language
+
+    # Search with the configured backend (TF-IDF index or SQLite FTS5)
+    found_docs = search_documents(search_query)
+
+    if found_docs:
+        # Titles come from their stored translations
+        response = ChatResponse("I found these documents for you:\n")
+        for doc in found_docs[:5]:  # Limit to 5 results
+            download_url = signed_download_url(doc)
+            icon = get_file_icon(doc.doc_type)
+            title = localized_text(doc, 'title', user_language)
+            response.literal(f"- {icon} <a href='{download_url}' style='color: #3f51b5; text-decoration: none;' target='_blank'>{title}")
+            if doc.unit:
+                response.add(" (Unit {unit})", unit=doc.unit)
+            response.literal("</a>\n")
+
+        # Point at the best matching pages/slides inside the documents
+        passages = search_passages(search_query)
+        if passages:
+            response.add("\nBest matching pages:\n")
+            for passage in passages:
+                passage_url = get_passage_link(passage)
+                snippet = escape(make_snippet(passage.text, search_query))
+                title = localized_text(passage.document, 'title', user_language)
+                response.literal(f"- <a href='{passage_url}' style='color: #3f51b5; text-decoration: none;' target='_blank'>{title} ({passage.label()})</a>: {snippet}\n")
+        context.response_type = 'html'
+    else:
+        # Provide helpful feedback
+        available_subjects = get_available_subjects()
+        response = ChatResponse(
+            "I couldn't find documents matching your request. Available subjects: {subjects}. Please contact admin if you need specific documents.",
+            subjects=', '.join(available_subjects),
+        )
+    context.response = response
+
+
+@intent_handler('attendance_query', needs_student=True)
+def handle_attendance_query(context):
+    """The student's attendance in one subject or overall, and what a target percentage needs"""
+    entities = context.entities
+    student = context.student
+
+    # The subject asked about, by name, abbreviation or a word of its name
+    subject_attendance = None
+    all_subjects = AttendanceRecord.objects.filter(student=student).values_list('subject', flat=True)
+    subject = match_subject(entities, all_subjects, partial=True)
+    if subject:
+        subject_attendance = AttendanceRecord.objects.filter(student=student, subject=subject).first()
+
+    if subject_attendance:
+        response = ChatResponse(
+            "Your attendance in {subject} is {percentage}% ({attended}/{total} classes).",
+            subject=subject_attendance.subject,
+            percentage=subject_attendance.percentage,
+            attended=subject_attendance.attended_classes,
+            total=subject_attendance.total_classes,
+        )
+
+        # Check if user is asking about target attendance
+        if entities.target_percentage:
+            needed, message = calculate_attendance_projection(
+                subject_attendance.percentage,
+                entities.target_percentage,
+                subject_attendance.total_classes,
+                subject_attendance.attended_classes
+            )
+
+            # Calculate when this target can be achieved based on timetable
+            if needed > 0:
+                # Get remaining classes from timetable
+                remaining_classes = get_remaining_classes(student, subject_attendance.subject)
+                if remaining_classes:
+                    # Calculate how many weeks it will take
+                    classes_per_week = len(remaining_classes)
+                    weeks_needed = (needed + classes_per_week - 1) // classes_per_week  # Ceiling division
+                    message.add(" You can achieve this in approximately {weeks} weeks.", weeks=weeks_needed)
+
+            response.literal(" ").extend(message)
+    else:
+        # Calculate overall attendance across all subjects
+        attendance_records = AttendanceRecord.objects.filter(student=student)
+        if attendance_records:
+            total_classes = sum(record.total_classes for record in attendance_records)
+            attended_classes = sum(record.attended_classes for record in attendance_records)
+
+            if total_classes > 0:
+                overall_percentage = round((attended_classes / total_classes) * 100, 2)
+                response = ChatResponse(
+                    "Your overall attendance is {percentage}% ({attended}/{total} classes across all subjects).",
+                    percentage=overall_percentage, attended=attended_classes, total=total_classes,
+                )
+
+                # Check if user is asking about target overall attendance
+                if entities.target_percentage:
+                    needed, message = calculate_attendance_projection(
+                        overall_percentage,
+                        entities.target_percentage,
+                        total_classes,
+                        attended_classes
+                    )
+                    response.literal(" ").extend(message)
             else:
-                # Provide helpful feedback
-                available_subjects = get_available_subjects()
-                response_text = f"I couldn't find documents matching your request. Available subjects: {', '.join(available_subjects)}. Please contact admin if you need specific documents."
-        
-        elif query_type == 'attendance_query':
-            if student:
-                # Improved subject detection logic
-                subject_attendance = None
-                
-                # First, get all subjects for this student
-                all_subjects = AttendanceRecord.objects.filter(student=student).values_list('subject', flat=True)
-                
-                # Check if the query contains any specific subject name
-                for subject in all_subjects:
-                    # Check if the subject name (or significant part of it) is in the query
-                    subject_words = subject.lower().split()
-                    for word in subject_words:
-                        if len(word) > 3 and word in search_query:  # Only check words longer than 3 characters
-                            subject_attendance = AttendanceRecord.objects.filter(
-                                student=student, 
-                                subject=subject
-                            ).first()
-                            break
-                    if subject_attendance:
-                        break
-                
-                # If no specific subject found, check for common subject abbreviations
-                if not subject_attendance:
-                    subject_mappings = {
-                        'daa': 'Design and Analysis of Algorithms',
-                        'se': 'Software Engineering',
-                        'dvd': 'Data Visualization & Data Analytics',
-                        'ep': 'Enterprise Programming',
-                        'toc': 'Theory of Computation',
-                        'aws': 'AWS Fundamentals',
-                        'pce': 'Professionalism & Corporate Ethics'
-                    }
-                    
-                    for abbr, full_name in subject_mappings.items():
-                        if abbr in search_query:
-                            subject_attendance = AttendanceRecord.objects.filter(
-                                student=student, 
-                                subject=full_name
-                            ).first()
-                            if subject_attendance:
-                                break
-                
-                if subject_attendance:
-                    response_text = f"Your attendance in {subject_attendance.subject} is {subject_attendance.percentage}% ({subject_attendance.attended_classes}/{subject_attendance.total_classes} classes)."
-                    
-                    # Check if user is asking about target attendance
-                    if any(word in search_query for word in ['target', 'reach', 'achieve', 'kitne', 'kaise', 'how many', 'percentage', '%']):
-                        # Try to extract target percentage
-                        target_percentage = None
-                        words = search_query.split()
-                        for i, word in enumerate(words):
-                            if word.isdigit():
-                                num = int(word)
-                                if 0 <= num <= 100:
-                                    target_percentage = num
-                                    break
-                            # Also check for percentage numbers like "85%"
-                            elif '%' in word and word.replace('%', '').isdigit():
-                                num = int(word.replace('%', ''))
-                                if 0 <= num <= 100:
-                                    target_percentage = num
-                                    break
-                        
-                        if target_percentage:
-                            needed, message = calculate_attendance_projection(
-                                subject_attendance.percentage,
-                                target_percentage,
-                                subject_attendance.total_classes,
-                                subject_attendance.attended_classes
-                            )
-                            
-                            # Calculate when this target can be achieved based on timetable
-                            if needed > 0:
-                                # Get remaining classes from timetable
-                                remaining_classes = get_remaining_classes(student, subject_attendance.subject)
-                                if remaining_classes:
-                                    # Calculate how many weeks it will take
-                                    classes_per_week = len(remaining_classes)
-                                    weeks_needed = (needed + classes_per_week - 1) // classes_per_week  # Ceiling division
-                                    message += f" You can achieve this in approximately {weeks_needed} weeks."
-                            
-                            response_text += " " + message
-                else:
-                    # Calculate overall attendance across all subjects
-                    attendance_records = AttendanceRecord.objects.filter(student=student)
-                    if attendance_records:
-                        total_classes = sum(record.total_classes for record in attendance_records)
-                        attended_classes = sum(record.attended_classes for record in attendance_records)
-                        
-                        if total_classes > 0:
-                            overall_percentage = round((attended_classes / total_classes) * 100, 2)
-                            response_text = f"Your overall attendance is {overall_percentage}% ({attended_classes}/{total_classes} classes across all subjects)."
-                            
-                            # Check if user is asking about target overall attendance
-                            if any(word in search_query for word in ['target', 'reach', 'achieve', 'kitne', 'kaise', 'how many', 'percentage', '%']):
-                                # Try to extract target percentage
-                                target_percentage = None
-                                words = search_query.split()
-                                for i, word in enumerate(words):
-                                    if word.isdigit():
-                                        num = int(word)
-                                        if 0 <= num <= 100:
-                                            target_percentage = num
-                                            break
-                                    elif '%' in word and word.replace('%', '').isdigit():
-                                        num = int(word.replace('%', ''))
-                                        if 0 <= num <= 100:
-                                            target_percentage = num
-                                            break
-                                
-                                if target_percentage:
-                                    needed, message = calculate_attendance_projection(
-                                        overall_percentage,
-                                        target_percentage,
-                                        total_classes,
-                                        attended_classes
-                                    )
-                                    response_text += " " + message
-                        else:
-                            response_text = "No attendance records found for you."
-                    else:
-                        response_text = "No attendance records found for you."
+                response = ChatResponse("No attendance records found for you.")
+        else:
+            response = ChatResponse("No attendance records found for you.")
+    context.response = response
+
+
+@intent_handler('timetable_query', needs_student=True)
+def handle_timetable_query(context):
+    """Today's timetable"""
+    # Get today's day
+    today = datetime.now().strftime('%A')
+    response = ChatResponse("Your timetable for {day}:\n", day=today)
+
+    # Load timetable data
+    with open('chatbot/data/timetable.json', 'r') as f:
+        timetable_data = json.load(f)
+
+    today_schedule = timetable_data['Timetable'].get(today.lower(), {})
+
+    if today_schedule:
+        for time_slot, details in today_schedule.items():
+            if 'subject' in details:
+                response.literal(f"{time_slot}: {details['subject']} ({details['classroom']}) ")
+                response.add("with {faculty}\n", faculty=details['faculty'])
             else:
-                response_text = "I couldn't find your student profile. Please contact administration."
-        
-        elif query_type == 'timetable_query':
-            if student:
-                # Get today's day
-                today = datetime.now().strftime('%A')
-                response_text = f"Your timetable for {today}:\n"
-                
-                # Load timetable data
-                with open('chatbot/data/timetable.json', 'r') as f:
-                    timetable_data = json.load(f)
-                
-                today_schedule = timetable_data['Timetable'].get(today.lower(), {})
-                
-                if today_schedule:
-                    for time_slot, details in today_schedule.items():
-                        if 'subject' in details:
-                            response_text += f"{time_slot}: {details['subject']} ({details['classroom']}) with {details['faculty']}\n"
-                        else:
-                            response_text += f"{time_slot}: {details['activity']}\n"
-                else:
-                    response_text = "You don't have any classes scheduled for today."
+                response.literal(f"{time_slot}: {details['activity']}\n")
+    else:
+        response = ChatResponse("You don't have any classes scheduled for today.")
+    context.response = response
+
+
+@intent_handler('faculty_query', needs_student=True)
+def handle_faculty_query(context):
+    """Email, schedule or details of the faculty member named in the query"""
+    entities = context.entities
+    response = context.response
+
+    # Load timetable data to get all faculty
+    with open('chatbot/data/timetable.json', 'r') as f:
+        timetable_data = json.load(f)
+
+    # The faculty member named in the query (by any part of the name)
+    faculty_found = entities.faculty
+    faculty_info = None
+
+    for day, slots in timetable_data['Timetable'].items():
+        for slot, details in slots.items():
+            if details.get('faculty') == faculty_found and 'subject' in details:
+                faculty_info = {
+                    'subject': details['subject'],
+                    'email': details.get('email', 'Not available'),
+                    'classroom': details.get('classroom', 'Not specified')
+                }
+                break
+
+        if faculty_info:
+            break
+
+    if faculty_info:
+        # Check what kind of information is being requested
+        if 'contact' in entities.cues:
+            # Email/contact request
+            response = ChatResponse("{faculty}'s email: {email}", faculty=faculty_found, email=faculty_info['email'])
+
+        elif 'schedule' in entities.cues:
+            # Schedule request - get faculty's complete schedule
+            faculty_schedule = get_faculty_schedule(faculty_found)
+
+            if faculty_schedule:
+                response = ChatResponse("{faculty}'s schedule:\n", faculty=faculty_found)
+                for day, classes in faculty_schedule.items():
+                    if classes:
+                        response.add(f"{day.title()}:\n")
+                        for cls in classes:
+                            response.literal(f"  {cls['time_slot']}: {cls['subject']} ({cls['classroom']})\n")
             else:
-                response_text = "I couldn't find your student profile. Please contact administration."
-        
-        elif query_type == 'faculty_query':
-            if student:
-                # Load timetable data to get all faculty
-                with open('chatbot/data/timetable.json', 'r') as f:
-                    timetable_data = json.load(f)
-                
-                all_faculty = {}
-                faculty_found = None
-                
-                for day, slots in timetable_data['Timetable'].items():
-                    for slot, details in slots.items():
-                        if 'faculty' in details and 'subject' in details:
-                            faculty_name = details['faculty']
-                            all_faculty[faculty_name] = {
-                                'subject': details['subject'],
-                                'email': details.get('email', 'Not available'),
-                                'classroom': details.get('classroom', 'Not specified')
-                            }
-                            
-                            # Check if this faculty is mentioned in the query
-                            if faculty_name.lower() in search_query:
-                                faculty_found = faculty_name
-                                break
-                    
-                    if faculty_found:
-                        break
-                
-                if faculty_found:
-                    faculty_info = all_faculty[faculty_found]
-                    
-                    # Check what kind of information is being requested
-                    if any(word in search_query for word in ['email', 'mail', 'contact', 'id']):
-                        # Email/contact request
-                        response_text = f"{faculty_found}'s email: {faculty_info['email']}"
-                    
-                    elif any(word in search_query for word in ['schedule', 'lecture', 'time', 'when', 'day']):
-                        # Schedule request - get faculty's complete schedule
-                        faculty_schedule = get_faculty_schedule(faculty_found)
-                        
-                        if faculty_schedule:
-                            response_text = f"{faculty_found}'s schedule:\n"
-                            for day, classes in faculty_schedule.items():
-                                if classes:
-                                    response_text += f"{day.title()}:\n"
-                                    for cls in classes:
-                                        response_text += f"  {cls['time_slot']}: {cls['subject']} ({cls['classroom']})\n"
-                        else:
-                            response_text = f"No schedule found for {faculty_found}."
-                    
-                    else:
-                        # General faculty information
-                        response_text = f"Faculty: {faculty_found}\nSubject: {faculty_info['subject']}\nEmail: {faculty_info['email']}\nUsually teaches in: {faculty_info['classroom']}"
+                response = ChatResponse("No schedule found for {faculty}.", faculty=faculty_found)
+
+        else:
+            # General faculty information
+            response = ChatResponse(
+                "Faculty: {faculty}\nSubject: {subject}\nEmail: {email}\nUsually teaches in: {classroom}",
+                faculty=faculty_found,
+                subject=faculty_info['subject'],
+                email=faculty_info['email'],
+                classroom=faculty_info['classroom'],
+            )
+    context.response = response
+
+
+@intent_handler('current_lecture', needs_student=True)
+def handle_current_lecture(context):
+    """The lecture going on now, according to the timetable"""
+    student = context.student
+
+    current_lecture = get_current_lecture(student)
+    if current_lecture:
+        response = ChatResponse(
+            "Your current lecture is {subject} with {faculty} in {classroom}.",
+            subject=current_lecture.subject,
+            faculty=current_lecture.faculty,
+            classroom=current_lecture.classroom,
+        )
+        if current_lecture.email:
+            response.add(" Faculty email: {email}", email=current_lecture.email)
+    else:
+        response = ChatResponse("You don't have any lecture right now according to your timetable.")
+    context.response = response
+
+
+@intent_handler('academic_calendar')
+def handle_academic_calendar(context):
+    """Events from the academic calendar"""
+    entities = context.entities
+
+    try:
+        with open('chatbot/data/academic_calendar_2025_odd_term.json', 'r') as f:
+            calendar_data = json.load(f)
+
+        # Check for specific date
+        if 'today' in entities.date_words:
+            today = datetime.now().date().isoformat()
+            if today in calendar_data['Academic Calendar']['Daywise Schedule']:
+                events = calendar_data['Academic Calendar']['Daywise Schedule'][today]
+                response = ChatResponse("Today's schedule: {events}", events=', '.join(events))
             else:
-                response_text = "I couldn't find your student profile. Please contact administration."
-        
-        elif query_type == 'current_lecture':
-            if student:
-                current_lecture = get_current_lecture(student)
-                if current_lecture:
-                    response_text = f"Your current lecture is {current_lecture.subject} with {current_lecture.faculty} in {current_lecture.classroom}."
-                    if current_lecture.email:
-                        response_text += f" Faculty email: {current_lecture.email}"
-                else:
-                    response_text = "You don't have any lecture right now according to your timetable."
+                response = ChatResponse("No special events scheduled for today according to the academic calendar.")
+
+        # Check for specific event
+        elif entities.date_words:
+            if 'exam' in entities.date_words:
+                response = ChatResponse("Exam dates:\n")
+                if 'Mid Sem Exam Start' in calendar_data['Academic Calendar']['Daywise Schedule'].values():
+                    response.add("Mid Semester Exams: July 28 - August 2, 2025\n")
+                if 'End Sem Theory Exam' in calendar_data['Academic Calendar']['Daywise Schedule'].values():
+                    response.add("End Semester Theory Exams: November 10-22, 2025\n")
+
+            elif 'diwali' in entities.date_words:
+                response = ChatResponse("Diwali Vacation: October 19 - November 2, 2025")
+
             else:
-                response_text = "I couldn't find your student profile. Please contact administration."
-        
-        elif query_type == 'academic_calendar':
-            try:
-                with open('chatbot/data/academic_calendar_2025_odd_term.json', 'r') as f:
-                    calendar_data = json.load(f)
-                
-                # Check for specific date
-                if any(word in search_query for word in ['today', 'aj', 'aaj']):
-                    today = datetime.now().date().isoformat()
-                    if today in calendar_data['Academic Calendar']['Daywise Schedule']:
-                        events = calendar_data['Academic Calendar']['Daywise Schedule'][today]
-                        response_text = f"Today's schedule: {', '.join(events)}"
-                    else:
-                        response_text = "No special events scheduled for today according to the academic calendar."
-                
-                # Check for specific event
-                elif any(word in search_query for word in ['exam', 'midterm', 'end sem', 'diwali', 'vacation']):
-                    if 'exam' in search_query:
-                        response_text = "Exam dates:\n"
-                        if 'Mid Sem Exam Start' in calendar_data['Academic Calendar']['Daywise Schedule'].values():
-                            response_text += "Mid Semester Exams: July 28 - August 2, 2025\n"
-                        if 'End Sem Theory Exam' in calendar_data['Academic Calendar']['Daywise Schedule'].values():
-                            response_text += "End Semester Theory Exams: November 10-22, 2025\n"
-                    
-                    elif 'diwali' in search_query:
-                        response_text = "Diwali Vacation: October 19 - November 2, 2025"
-                    
-                    else:
-                        response_text = "Academic Calendar Highlights:\n"
-                        response_text += f"Term: {calendar_data['Academic Calendar']['Term']}\n"
-                        response_text += f"Teaching End: October 11, 2025\n"
-                        response_text += f"Diwali Vacation: October 19 - November 2, 2025\n"
-                        response_text += f"End Semester Exams: November 10-22, 2025"
-                
-                else:
-                    response_text = f"Academic Calendar: {calendar_data['Academic Calendar']['Term']}\n"
-                    response_text += f"Programs: {', '.join(calendar_data['Academic Calendar']['Programs'])}\n"
-                    response_text += f"Semesters: {', '.join(calendar_data['Academic Calendar']['Semester'])}\n"
-                    response_text += "Key dates available. Ask about specific events like exams or vacations."
-                    
-            except FileNotFoundError:
-                response_text = "Academic calendar data is not available at the moment."
-        
+                response = ChatResponse("Academic Calendar Highlights:\n")
+                response.add("Term: {term}\n", term=calendar_data['Academic Calendar']['Term'])
+                response.add("Teaching End: October 11, 2025\n")
+                response.add("Diwali Vacation: October 19 - November 2, 2025\n")
+                response.add("End Semester Exams: November 10-22, 2025")
+
         else:
-            # Check if it matches any FAQ using similarity matching
-            faqs = FAQ.objects.all()
-            best_match = None
-            highest_similarity = 0
-            
-            for faq in faqs:
-                similarity = calculate_similarity(search_query, faq.question.lower())
-                if similarity > highest_similarity and similarity > 0.3:
-                    highest_similarity = similarity
-                    best_match = faq
-            
-            if best_match:
-                response_text = best_match.answer
-            else:
-                response_text = "I'm sorry, I couldn't find information about that. Could you try rephrasing your question?"
-        
-        # Translate response if needed
-        if user_language != 'en':
-            response_text = translate_text(response_text, user_language)
-        
-        return JsonResponse({'response': response_text, 'type': response_type})
+            response = ChatResponse("Academic Calendar: {term}\n", term=calendar_data['Academic Calendar']['Term'])
+            response.add("Programs: {programs}\n", programs=', '.join(calendar_data['Academic Calendar']['Programs']))
+            response.add("Semesters: {semesters}\n", semesters=', '.join(calendar_data['Academic Calendar']['Semester']))
+            response.add("Key dates available. Ask about specific events like exams or vacations.")
+
+    except FileNotFoundError:
+        response = ChatResponse("Academic calendar data is not available at the moment.")
+    context.response = response
+
+
+@intent_handler('general')
+def handle_general(context):
+    """The best matching FAQ answer"""
+    search_query = context.search_query
+    user_language = context.language
+
+    # Check if it matches any FAQ using the precomputed FAQ index
+    best_match = find_faq(search_query)
+
+    if best_match:
+        # Answers are translated once, when the FAQ is saved
+        response = ChatResponse().literal(localized_text(best_match, 'answer', user_language))
+    else:
+        response = ChatResponse("I'm sorry, I couldn't find information about that. Could you try rephrasing your question?")
+    context.response = response
+
+
+@login_required
+def process_message(request):
+    if request.method == 'POST':
+        context = run_pipeline(request, request.POST.get('message', ''))
+        data = {'response': context.rendered, 'type': context.response_type}
+        # What each stage decided and how long it took, for staff
+        if request.POST.get('debug') and request.user.is_staff:
+            data['debug'] = context.debug_info()
+        response = JsonResponse(data)
+        response['Server-Timing'] = context.server_timing()
+        return response
     
     return JsonResponse({'error': 'Invalid request'})
 
 
+@csrf_exempt
+def search_documents_api(request):
+    """
+    Batched document search for analytics jobs and the cache warmer.
+    Expects a JSON body like {"queries": ["daa unit 2 notes", ...], "limit": 5}.
+    
+    Jobs send `Authorization: Bearer <SEARCH_API_TOKEN>` and need no CSRF
+    token; staff may also call it from a logged-in session, which is
+    CSRF-checked like any other post. Students cannot use it.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=405)
+    
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if authorization.startswith('Bearer '):
+        token = getattr(settings, 'SEARCH_API_TOKEN', None)
+        if not token or not constant_time_compare(authorization[len('Bearer '):], token):
+            return JsonResponse({'error': 'Invalid token'}, status=401)
+    elif request.user.is_authenticated and is_admin(request.user):
+        csrf_failure = CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {})
+        if csrf_failure is not None:
+            return csrf_failure
+    else:
+        return JsonResponse({'error': 'Staff login or service token required'}, status=403)
+    
+    try:
+        payload = json.loads(request.body)
+        queries = payload['queries']
+        limit = int(payload.get('limit', 5))
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected a JSON body with a "queries" list'}, status=400)
+    
+    max_queries = getattr(settings, 'SEARCH_BATCH_MAX_QUERIES', 1000)
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        return JsonResponse({'error': '"queries" must be a list of strings'}, status=400)
+    if len(queries) > max_queries:
+        return JsonResponse({'error': f'At most {max_queries} queries per request'}, status=400)
+    limit = max(1, min(limit, 50))
+    
+    results = []
+    for query, documents in zip(queries, search_documents_batch(queries, limit=limit)):
+        results.append({
+            'query': query,
+            'documents': [
+                {
+                    'id': doc.id,
+                    'title': doc.title,
+                    'subject': doc.subject,
+                    'unit': doc.unit,
+                    'doc_type': doc.doc_type,
+                    'download_url': signed_download_url(doc),
+                }
+                for doc in documents
+            ],
+        })
+    return JsonResponse({'results': results})
 
 
 
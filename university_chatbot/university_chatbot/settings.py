@@ -154,4 +154,86 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
-FILE_UPLOAD_PERMISSIONS = 0o644
\ No newline at end of file
+FILE_UPLOAD_PERMISSIONS = 0o644
+
+# Document search backend used by the chatbot:
+# 'tfidf' - in-process TF-IDF index (any database)
+# 'lsa'   - in-process latent semantic index (TF-IDF reduced with TruncatedSVD)
+# 'fts5'  - SQLite FTS5 table ranked with BM25 inside the database
+DOCUMENT_SEARCH_BACKEND = 'tfidf'
+
+# Latent dimensions of the 'lsa' index, and where rebuild_semantic_index saves it
+SEMANTIC_SEARCH_COMPONENTS = 200
+SEMANTIC_INDEX_PATH = os.path.join(BASE_DIR, 'search_index', 'semantic_index.joblib')
+
+# Where train_intent_classifier saves the intent model (it is trained in
+# memory from chatbot/data/intent_samples.json when missing), and the
+# confidence below which a message is treated as a general question
+INTENT_MODEL_PATH = os.path.join(BASE_DIR, 'search_index', 'intent_model.joblib')
+INTENT_MIN_CONFIDENCE = 0.25
+
+# Number of chat messages whose intent is remembered per worker
+INTENT_CACHE_SIZE = 4096
+
+# Number of chat queries whose extracted entities are remembered per worker
+ENTITY_CACHE_SIZE = 4096
+
+# Number of normalized queries whose search results are kept per worker
+SEARCH_CACHE_SIZE = 1024
+
+# Set to False to translate offline with translation_dict only (strings
+# already in the translation cache are still used)
+TRANSLATION_API_ENABLED = True
+
+# Number of chat messages whose detected language is remembered per worker
+LANGUAGE_DETECTION_CACHE_SIZE = 4096
+
+# Number of translated strings kept in memory per worker, in front of the
+# CachedTranslation table
+TRANSLATION_CACHE_SIZE = 4096
+
+# Days a translation fetched from the API stays in the CachedTranslation
+# table before run_background_jobs purges it (None keeps them forever);
+# users' own messages are never stored there
+TRANSLATION_CACHE_MAX_AGE = 90
+
+# Largest number of queries accepted by the batched /search-documents/ endpoint
+SEARCH_BATCH_MAX_QUERIES = 1000
+
+# Bearer token analytics jobs send to /search-documents/ (no session or CSRF
+# token needed); unset, only logged-in staff can call the endpoint
+SEARCH_API_TOKEN = os.environ.get('SEARCH_API_TOKEN')
+
+# Extract text from uploaded documents in the run_background_jobs worker
+# instead of during the upload request
+EXTRACT_TEXT_IN_BACKGROUND = True
+
+# Seconds after which a job still marked running is assumed abandoned by a
+# stopped worker and queued again
+BACKGROUND_JOB_TIMEOUT = 600
+
+# Budgets for extracting the text of one uploaded file, so a huge or
+# scanned document cannot tie up a worker or its memory (None = no limit)
+EXTRACTION_MAX_PAGES = 1000
+EXTRACTION_MAX_CHARS = 5000000
+EXTRACTION_MAX_SECONDS = 120
+# Cap on the UTF-8 bytes of joined text stored per document for search
+EXTRACTION_MAX_STORED_BYTES = 2000000
+
+# How document downloads are sent: None streams them from Django, 'nginx'
+# returns an X-Accel-Redirect to DOWNLOAD_ACCEL_PREFIX + file name (an
+# internal nginx location aliased to MEDIA_ROOT), 'sendfile' returns an
+# X-Sendfile header for Apache/lighttpd
+DOWNLOAD_ACCEL = None
+DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
+
+# Seconds browsers may reuse a downloaded document before revalidating it
+DOWNLOAD_CACHE_MAX_AGE = 3600
+
+# Seconds a signed download link handed out by the chatbot stays valid
+DOWNLOAD_URL_MAX_AGE = 86400
+
+# Seconds each worker reuses its list of active documents when checking
+# signed download links, so a deactivated document stops downloading
+# within this time without a query per download
+DOWNLOAD_ACTIVE_IDS_MAX_AGE = 60